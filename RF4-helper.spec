@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('assets', 'assets'),('config', 'config')],
-    hiddenimports=["PyQt5.sip"],
+    hiddenimports=["PyQt5.sip", "numpy"],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,67 @@
+"""分块OCR一致性校验
+
+对样例截图分别以整图OCR和分块OCR运行 ImageProcessor，比较识别出的鱼类信息是否一致，
+并输出两种方式的耗时。需要 dev 目录下的检测和OCR模块。
+
+用法:
+    python benchmarks/compare_tiling.py fixtures/ --tile-size 1600x1600 --overlap 160
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# 允许直接以脚本方式运行
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.image_processor import ImageProcessor
+from src.core.tiling import OcrTiler, DEFAULT_TILING_CONFIG
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较整图OCR与分块OCR的处理结果")
+    parser.add_argument("fixtures", help="样例截图目录")
+    parser.add_argument("--tile-size", default="x".join(str(v) for v in DEFAULT_TILING_CONFIG["tile_size"]),
+                        help="图块最大尺寸，如 1600x1600")
+    parser.add_argument("--overlap", type=int, default=DEFAULT_TILING_CONFIG["overlap"], help="图块重叠像素")
+    parser.add_argument("--workers", type=int, default=DEFAULT_TILING_CONFIG["workers"], help="分块OCR并发数")
+    args = parser.parse_args()
+
+    tile_size = [int(v) for v in args.tile_size.lower().split("x")]
+    single = ImageProcessor("serial", OcrTiler({"enabled": False}))
+    tiled = ImageProcessor("serial", OcrTiler({"min_pixels": 0, "tile_size": tile_size,
+                                               "overlap": args.overlap, "workers": args.workers}))
+    single.roi_selector.enabled = tiled.roi_selector.enabled = False
+
+    paths = sorted(os.path.join(args.fixtures, name) for name in os.listdir(args.fixtures)
+                   if name.lower().endswith(IMAGE_EXTENSIONS))
+    mismatches = 0
+    try:
+        for path in paths:
+            start = time.perf_counter()
+            expected = single.process(path)
+            single_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            actual = tiled.process(path)
+            tiled_ms = (time.perf_counter() - start) * 1000
+
+            same = expected.get("fishes") == actual.get("fishes")
+            mismatches += not same
+            print(f"{'一致' if same else '不一致'}  {os.path.basename(path)}  "
+                  f"整图 {single_ms:.0f} ms  分块 {tiled_ms:.0f} ms")
+            if not same:
+                print(f"  整图: {expected.get('fishes', expected.get('error'))}")
+                print(f"  分块: {actual.get('fishes', actual.get('error'))}")
+    finally:
+        single.close()
+        tiled.close()
+
+    print(f"\n共 {len(paths)} 张，不一致 {mismatches} 张")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
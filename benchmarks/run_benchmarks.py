@@ -0,0 +1,320 @@
+"""基准测试入口
+
+启动本地模拟后端，分别测量API客户端、本地处理流程、结果表格更新和渔获归一化的性能，
+输出吞吐量、延迟分位数和峰值内存，并写入JSON文件以便不同版本之间对比。
+
+用法:
+    python -m benchmarks.run_benchmarks --iterations 50 --output bench.json
+    python -m benchmarks.run_benchmarks --compare old.json --output new.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import argparse
+import platform
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
+
+# 允许直接以脚本方式运行
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_server import StubServer, StubSettings
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程的峰值常驻内存（MB），平台不支持时返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux单位为KB，macOS为字节
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """已排序数据的分位数（线性插值）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def measure(name: str, func: Callable[[int], Any], iterations: int, concurrency: int = 1) -> Dict[str, Any]:
+    """重复执行 func 并统计吞吐量、延迟分位数和错误数"""
+    latencies = []
+    errors = 0
+
+    def run_one(i):
+        start = time.perf_counter()
+        try:
+            func(i)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, e
+
+    wall_start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(run_one, range(iterations)))
+    else:
+        outcomes = [run_one(i) for i in range(iterations)]
+    wall = time.perf_counter() - wall_start
+
+    for latency, error in outcomes:
+        latencies.append(latency)
+        if error is not None:
+            errors += 1
+    latencies.sort()
+    result = {
+        "name": name,
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_per_s": round(iterations / wall, 2) if wall > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "peak_rss_mb": peak_rss_mb()
+    }
+    print(f"{name:<32} {result['throughput_per_s']:>9.2f}/s  p50 {result['p50_ms']:>9.2f} ms  "
+          f"p95 {result['p95_ms']:>9.2f} ms  p99 {result['p99_ms']:>9.2f} ms  errors {errors}")
+    return result
+
+
+def make_test_images(directory: str, count: int, width: int, height: int) -> List[str]:
+    """生成测试截图，未安装Pillow时写入随机字节"""
+    paths = []
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+    for i in range(count):
+        path = os.path.join(directory, f"bench_{i}.png")
+        if Image is not None:
+            # 低熵图片编码较快，同时尺寸接近真实截图
+            image = Image.new("RGB", (width, height), (random.randint(0, 255), 90, 120))
+            image.save(path, format="PNG")
+        else:
+            with open(path, 'wb') as f:
+                f.write(os.urandom(width * height // 4))
+        paths.append(path)
+    return paths
+
+
+def bench_api_client(base_url: str, images: List[str], iterations: int, concurrency: int) -> List[Dict[str, Any]]:
+    """RF4APIClient.process_image 与 upload_custom_image"""
+    from src.api.client import RF4APIClient
+
+    client = RF4APIClient()
+    client.base_url = base_url
+    # 关闭缓存和去重，确保每次都真实请求
+    client.result_cache.enabled = False
+    client.duplicate_detector.enabled = False
+    client._ensure_pool_size(concurrency)
+    client.config.endpoints.setdefault("upload_image", {"path": "/upload_image", "method": "POST"})
+
+    results = [
+        measure("api.process_image", lambda i: client.process_image(images[i % len(images)]), iterations),
+        measure(f"api.process_image x{concurrency}", lambda i: client.process_image(images[i % len(images)]),
+                iterations, concurrency),
+        measure("api.upload_custom_image", lambda i: client.upload_custom_image(images[i % len(images)], "bench"),
+                iterations)
+    ]
+    return results
+
+
+def bench_image_processor(iterations: int, words: int, cards: int) -> List[Dict[str, Any]]:
+    """ImageProcessor.process，检测和OCR使用模拟函数"""
+    import src.core.image_processor as image_processor
+    from src.core.box_matcher import match_words_to_cards, match_words_to_cards_naive, rects_intersect
+
+    class MockBox:
+        def __init__(self, left, top, width, height, *args):
+            self.rect = (left, top, width, height)
+
+        def is_overlapping(self, other):
+            return rects_intersect(self.rect, other.rect)
+
+    rng = random.Random(0)
+    card_items = [{"location": {"left": (i % 8) * 300, "top": (i // 8) * 320, "width": 280, "height": 300}}
+                  for i in range(cards)]
+    word_items = [{"location": {"left": rng.randint(0, 2400), "top": rng.randint(0, 1400),
+                                "width": rng.randint(20, 120), "height": 24},
+                   "words": f"词{i}"} for i in range(words)]
+
+    def mock_detection(image):
+        time.sleep(0.02)
+        return card_items
+
+    def mock_ocr(image):
+        time.sleep(0.03)
+        return {"words_result": [dict(item) for item in word_items]}
+
+    originals = {name: getattr(image_processor, name, None)
+                 for name in ("get_fish_cards_result", "convert_yolo_to_standard", "get_ocr_result", "BoundingBox")}
+    image_processor.get_fish_cards_result = mock_detection
+    image_processor.convert_yolo_to_standard = lambda data: {"result": data}
+    image_processor.get_ocr_result = mock_ocr
+    image_processor.BoundingBox = MockBox
+
+    from src.core.tiling import OcrTiler
+    try:
+        import numpy as np
+        from src.core.image_buffer import ImageBuffer
+        # 预先解码的截图，各阶段共用同一块像素
+        buffer = ImageBuffer(np.zeros((1440, 2560, 3), dtype=np.uint8))
+    except ImportError:
+        print("未安装NumPy，跳过处理流程基准")
+        buffer = None
+
+    results = []
+    try:
+        for executor_type in (("serial", "thread") if buffer is not None else ()):
+            processor = image_processor.ImageProcessor(executor_type, OcrTiler({"enabled": False}))
+            processor.roi_selector.enabled = False
+            processor.render_overlay = False
+
+            def run_processor(i):
+                result = processor.process(buffer)
+                if not result["success"]:
+                    raise RuntimeError(result["error"])
+
+            try:
+                results.append(measure(f"processor.process [{executor_type}]", run_processor, iterations))
+            finally:
+                processor.close()
+
+        # 匹配算法单独对比，并校验结果一致
+        def make_inputs():
+            items = [dict(item, BoundingBox=MockBox(*[item["location"][k] for k in ("left", "top", "width", "height")]))
+                     for item in word_items]
+            boxes = [MockBox(*[c["location"][k] for k in ("left", "top", "width", "height")]) for c in card_items]
+            rects = [box.rect for box in boxes]
+            return items, boxes, rects
+
+        items, boxes, rects = make_inputs()
+        indexed = match_words_to_cards(items, boxes, rects)
+        items, boxes, rects = make_inputs()
+        naive = match_words_to_cards_naive(items, boxes)
+        if indexed != naive:
+            raise AssertionError("网格索引匹配结果与逐对比较不一致")
+        results.append(measure("matcher.indexed", lambda i: match_words_to_cards(*make_inputs()), iterations))
+        results.append(measure("matcher.naive", lambda i: match_words_to_cards_naive(*make_inputs()[:2]), iterations))
+    finally:
+        for name, value in originals.items():
+            if value is not None:
+                setattr(image_processor, name, value)
+    return results
+
+
+def bench_table_update(iterations: int, rows_per_batch: int) -> List[Dict[str, Any]]:
+    """结果表格模型追加数据，未安装PyQt5时跳过"""
+    try:
+        from PyQt5.QtCore import QCoreApplication
+        from src.ui.results_model import CatchTableModel
+    except ImportError:
+        print("未安装PyQt5，跳过表格更新基准")
+        return []
+
+    # 保持对应用对象的引用，测量期间 QCoreApplication 不能被回收
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    model = CatchTableModel()
+    batch = [["新鲜", f"鱼{i % 40}", f"{i % 97 / 10:.3f} кг", str(i % 500)] for i in range(rows_per_batch)]
+    return [measure(f"table.append x{rows_per_batch}", lambda i: model.append_fishes(batch), iterations)]
+
+
+def bench_normalizer(iterations: int, records: int) -> List[Dict[str, Any]]:
+    """渔获文本归一化，鱼种名称带随机OCR误差"""
+    from src.core.normalizer import CatchNormalizer
+
+    rng = random.Random(0)
+    letters = "абвгдежзиклмнопрстуфхцчшщэюя"
+    species = ["".join(rng.choice(letters) for _ in range(rng.randint(4, 16))) for _ in range(400)]
+
+    def misread(name):
+        chars = list(name)
+        chars[rng.randrange(len(chars))] = rng.choice(letters)
+        return "".join(chars)
+
+    batch = [["新鲜", misread(rng.choice(species)), f"{rng.uniform(0.05, 30):.3f} кг", str(rng.randint(1, 5000))]
+             for _ in range(records)]
+    cached = CatchNormalizer(species, {})
+    uncached = CatchNormalizer(species, {"cache_size": 0})
+    return [
+        measure(f"normalizer x{records}", lambda i: cached.normalize_all(batch), iterations),
+        measure(f"normalizer x{records} [no cache]", lambda i: uncached.normalize_all(batch), max(1, iterations // 10))
+    ]
+
+
+def compare(baseline_path: str, current: Dict[str, Any]) -> None:
+    """与基线结果对比并打印变化"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {item["name"]: item for item in json.load(f)["results"]}
+    print(f"\n与基线对比: {baseline_path}")
+    for item in current["results"]:
+        old = baseline.get(item["name"])
+        if old is None:
+            continue
+        for key in ("throughput_per_s", "p50_ms", "p95_ms", "p99_ms"):
+            if old[key]:
+                change = (item[key] - old[key]) / old[key] * 100
+                print(f"  {item['name']:<32} {key:<16} {old[key]:>10} -> {item[key]:>10} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RF4助手性能基准测试")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟后端基础延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.01, help="模拟后端延迟抖动（秒）")
+    parser.add_argument("--payload-bytes", type=int, default=200 * 1024, help="模拟结果图片字节数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟后端错误率")
+    parser.add_argument("--image-size", default="2560x1440", help="测试截图尺寸")
+    parser.add_argument("--words", type=int, default=400, help="模拟OCR文字框数量")
+    parser.add_argument("--cards", type=int, default=40, help="模拟鱼卡数量")
+    parser.add_argument("--table-rows", type=int, default=1000, help="每次追加的表格行数")
+    parser.add_argument("--normalize-records", type=int, default=1000, help="每批归一化的渔获记录数")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["api", "processor", "table", "normalizer"])
+    parser.add_argument("--output", default="bench_results.json", help="结果JSON路径")
+    parser.add_argument("--compare", help="基线结果JSON路径")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.image_size.lower().split("x"))
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "results": []
+    }
+
+    if "api" not in args.skip:
+        settings = StubSettings(args.latency, args.jitter, args.payload_bytes, args.error_rate)
+        with tempfile.TemporaryDirectory() as directory, StubServer(settings) as server:
+            images = make_test_images(directory, 4, width, height)
+            report["results"] += bench_api_client(server.base_url, images, args.iterations, args.concurrency)
+    if "processor" not in args.skip:
+        report["results"] += bench_image_processor(args.iterations, args.words, args.cards)
+    if "table" not in args.skip:
+        report["results"] += bench_table_update(args.iterations, args.table_rows)
+    if "normalizer" not in args.skip:
+        report["results"] += bench_normalizer(args.iterations, args.normalize_records)
+
+    report["peak_rss_mb"] = peak_rss_mb()
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    print(f"\n结果已写入 {args.output}，峰值内存 {report['peak_rss_mb']} MB")
+
+    if args.compare:
+        compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""本地模拟后端，用于基准测试和联调
+
+模拟 /catch_from_image 和 /upload_image 接口以及探测用的 /health，
+可配置延迟、抖动、结果图片大小、错误率和断开连接的概率。可同时启动多个实例，用于验证多后端选择和故障转移。
+"""
+
+import os
+import json
+import time
+import base64
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubSettings:
+    """模拟后端的行为参数"""
+
+    def __init__(self, latency=0.05, jitter=0.02, payload_bytes=200 * 1024, error_rate=0.0, fishes=8,
+                 drop_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.payload_bytes = payload_bytes
+        self.error_rate = error_rate
+        self.fishes = fishes
+        # 读完请求后不响应、直接断开连接的概率
+        self.drop_rate = drop_rate
+
+
+class StubStats:
+    """模拟后端收到的请求数和同时处理的最大请求数"""
+
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def enter(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def leave(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+
+def _make_handler(settings: StubSettings, stats: StubStats):
+    image_b64 = base64.b64encode(os.urandom(settings.payload_bytes))
+    fishes = [["新鲜", f"鱼{i}", f"{random.uniform(0.1, 10):.3f} кг", str(random.randint(10, 500))]
+              for i in range(settings.fishes)]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _delay_or_fail(self):
+            """模拟延迟，按概率断开连接或返回500；返回False表示不再发送正常响应"""
+            delay = max(0.0, settings.latency + random.uniform(-settings.jitter, settings.jitter))
+            stats.enter()
+            try:
+                time.sleep(delay)
+            finally:
+                stats.leave()
+            if random.random() < settings.drop_rate:
+                # 请求体已全部读取，服务端可能已处理该请求
+                self.close_connection = True
+                return False
+            if random.random() < settings.error_rate:
+                self._send_json(500, {"error": "模拟服务端错误"})
+                return False
+            return True
+
+        def do_GET(self):
+            if not self._delay_or_fail():
+                return
+            if self.path.endswith("/health"):
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": f"未知接口: {self.path}"})
+
+        def do_POST(self):
+            # 读取完整请求体，模拟真实上传
+            length = int(self.headers.get("Content-Length", 0))
+            remaining = length
+            while remaining > 0:
+                chunk = self.rfile.read(min(remaining, 64 * 1024))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+
+            if not self._delay_or_fail():
+                return
+            if self.path.endswith("/catch_from_image"):
+                self._send_json(200, {"fishes": fishes, "image": image_b64.decode('ascii')})
+            elif self.path.endswith("/upload_image"):
+                self._send_json(200, {"success": True, "received_bytes": length})
+            else:
+                self._send_json(404, {"error": f"未知接口: {self.path}"})
+
+    return Handler
+
+
+class StubServer:
+    """在后台线程中运行的模拟后端"""
+
+    def __init__(self, settings: StubSettings = None, host="127.0.0.1", port=0):
+        self.settings = settings or StubSettings()
+        self.stats = StubStats()
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self.settings, self.stats))
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """停止服务，重复调用无效"""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RF4助手本地模拟后端")
+    parser.add_argument("--port", type=int, default=9999, help="起始端口，多个实例依次递增")
+    parser.add_argument("--instances", type=int, default=1, help="启动的实例数")
+    parser.add_argument("--latency", type=float, nargs="+", default=[0.05],
+                        help="基础延迟（秒），可为每个实例分别指定，不足时沿用最后一个")
+    parser.add_argument("--jitter", type=float, default=0.02, help="延迟抖动（秒）")
+    parser.add_argument("--payload-bytes", type=int, default=200 * 1024, help="结果图片字节数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回500的概率")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="读完请求后直接断开连接的概率")
+    args = parser.parse_args()
+
+    servers = []
+    for i in range(max(1, args.instances, len(args.latency))):
+        latency = args.latency[min(i, len(args.latency) - 1)]
+        settings = StubSettings(latency, args.jitter, args.payload_bytes, args.error_rate, drop_rate=args.drop_rate)
+        servers.append(StubServer(settings, port=args.port + i).start())
+        print(f"模拟后端已启动: {servers[-1].base_url}（延迟 {latency}s）")
+    if len(servers) > 1:
+        print("RF4_API_BASE_URL=" + ",".join(server.base_url for server in servers))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        for server in servers:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 """俄罗斯钓鱼4助手应用入口"""
 
+# 尽早导入以便从进程启动开始计时
+from src.utils.startup_profiler import startup_profiler
+
 import sys
 import logging
-from PyQt5.QtWidgets import QApplication
-from src.ui.main_window import MainWindow
+import multiprocessing
 from src.utils.config_loader import config_loader
 
 # 配置日志
@@ -20,20 +22,34 @@ def setup_logging():
     logging.info("日志系统初始化完成")
 
 def main():
-    # 初始化日志
+    # 初始化日志（各模块在首次使用时才读取各自的配置项）
     setup_logging()
+    startup_profiler.mark("日志与配置")
     
-    # 加载配置
-    config = config_loader.get_all()
-    logging.info(f"应用程序配置加载完成: {config}")
+    # 延迟导入PyQt5和界面模块
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QTimer
+    from src.ui.main_window import MainWindow
+    startup_profiler.mark("导入界面模块")
     
     # 创建应用
     app = QApplication(sys.argv)
+    startup_profiler.mark("创建QApplication")
     window = MainWindow()
+    startup_profiler.mark("创建主窗口")
     window.show()
+    startup_profiler.mark("显示主窗口")
+    
+    # 事件循环开始后（首次绘制完成）输出启动耗时
+    def report_startup():
+        startup_profiler.mark("首次事件循环")
+        startup_profiler.report()
+    QTimer.singleShot(0, report_startup)
     
     # 运行应用
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    # 打包后的exe中，进程池的子进程会重新执行入口，需在此处接管
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,255 @@
+"""异步API客户端模块，基于asyncio和aiohttp在单线程内并发处理多个请求"""
+
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, Coroutine
+
+import aiohttp
+
+from src.api.client import APIConfig, RF4APIClient
+from src.api.exceptions import APIException
+from src.api.backends import BackendPool
+from src.api.upload_prep import UploadPreparer
+from src.api.cache import ResultCache
+from src.core.roi import RoiSelector
+from src.utils.config_loader import config_loader
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认异步客户端配置
+DEFAULT_ASYNC_CONFIG = {
+    "max_connections": 16,
+    "max_connections_per_host": 8,
+    "keepalive_timeout": 30,
+    "max_concurrency": 8,
+    "timeouts": {
+        "total": 120,
+        "connect": 10,
+        "sock_read": 60
+    }
+}
+
+
+class AsyncRF4APIClient:
+    """俄罗斯钓鱼4异步API客户端
+
+    接口与 RF4APIClient 保持一致（get/post/process_image/upload_custom_image），
+    所有方法均为协程。连接池上限、保活时间、分阶段超时和并发上限从配置项
+    async_client 读取，并发通过信号量控制。
+    """
+
+    def __init__(self, base_url: Optional[str] = None, config: Optional[Dict[str, Any]] = None):
+        settings = dict(DEFAULT_ASYNC_CONFIG)
+        settings.update(config if config is not None else config_loader.get('async_client', {}))
+        timeouts = dict(DEFAULT_ASYNC_CONFIG["timeouts"])
+        timeouts.update(settings.get("timeouts", {}))
+
+        self.config = APIConfig()
+        # 指定地址时只使用该后端，否则与同步客户端共用后端池
+        self.backends = BackendPool([base_url]) if base_url else self.config.get_backend_pool()
+        self.max_connections = int(settings["max_connections"])
+        self.max_connections_per_host = int(settings["max_connections_per_host"])
+        self.keepalive_timeout = float(settings["keepalive_timeout"])
+        self.timeout = aiohttp.ClientTimeout(
+            total=timeouts.get("total"),
+            connect=timeouts.get("connect"),
+            sock_read=timeouts.get("sock_read")
+        )
+        self.max_concurrency = int(settings["max_concurrency"])
+
+        self.upload_preparer = UploadPreparer(roi_selector=RoiSelector())
+        self.result_cache = ResultCache()
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """在当前事件循环中创建（或复用）会话"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def close(self) -> None:
+        """关闭会话和连接池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @property
+    def base_url(self) -> str:
+        """首选后端的API基础URL"""
+        return self.backends.primary
+
+    def _get_endpoint_url(self, endpoint_name: str, base_url: Optional[str] = None) -> str:
+        """获取完整的端点URL，未指定后端时使用首选后端"""
+        endpoint_config = self.config.get_endpoint(endpoint_name)
+        if not endpoint_config:
+            raise APIException(f"未找到端点配置: {endpoint_name}")
+
+        endpoint_path = endpoint_config.get("path", endpoint_name)
+        return (base_url or self.base_url) + endpoint_path
+
+    async def _handle_response(self, response: aiohttp.ClientResponse) -> Dict[str, Any]:
+        """处理API响应"""
+        if response.status == 200:
+            return await response.json(content_type=None)
+
+        error_msg = f"API响应错误: {response.status}"
+        try:
+            error_data = await response.json(content_type=None)
+            if "error" in error_data:
+                error_msg = f"API错误: {error_data['error']}"
+        except Exception:
+            pass
+
+        logger.error(error_msg)
+        raise APIException(error_msg, response.status)
+
+    async def _request(self, method: str, endpoint_name: str, **kwargs) -> Dict[str, Any]:
+        # 表单请求体只能发送一次，这里不做故障转移，只把结果反馈给后端池
+        base_url = self.backends.select()
+        url = self._get_endpoint_url(endpoint_name, base_url)
+        session = await self._get_session()
+        async with self._semaphore:
+            try:
+                async with session.request(method, url, **kwargs) as response:
+                    self.backends.report(base_url, response.status < 500,
+                                         None if response.status < 500 else f"HTTP {response.status}")
+                    return await self._handle_response(response)
+            except asyncio.TimeoutError:
+                self.backends.report(base_url, False, "timeout")
+                raise APIException(f"请求超时: {url}")
+            except aiohttp.ClientError as e:
+                self.backends.report(base_url, False, str(e))
+                raise APIException(f"请求失败: {e}")
+
+    async def get(self, endpoint_name: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """发送GET请求"""
+        return await self._request("GET", endpoint_name, params=params)
+
+    async def post(self, endpoint_name: str, data: Optional[Dict[str, Any]] = None,
+                   json_data: Optional[Dict[str, Any]] = None,
+                   files: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """发送POST请求
+
+        files 与 requests 的格式一致：{字段名: (文件名, 字节, MIME类型)}
+        """
+        if files:
+            form = aiohttp.FormData()
+            for key, value in (data or {}).items():
+                form.add_field(key, str(value))
+            for field, (filename, content, mime_type) in files.items():
+                form.add_field(field, content, filename=filename, content_type=mime_type)
+            return await self._request("POST", endpoint_name, data=form)
+        return await self._request("POST", endpoint_name, data=data, json=json_data)
+
+    def _get_cache_context(self, endpoint_name: str) -> Dict[str, Any]:
+        """获取影响处理结果的配置，作为缓存键的一部分"""
+        return {
+            "base_urls": self.backends.urls,
+            "endpoint": self.config.get_endpoint(endpoint_name),
+            "upload_prep": self.upload_preparer.get_settings()
+        }
+
+    async def process_image(self, image_path: str) -> Dict[str, Any]:
+        """处理图像识别鱼类
+
+        Args:
+            image_path: 图像文件路径
+
+        Returns:
+            包含处理结果的字典
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            mime_type = RF4APIClient.get_file_mime_type(image_path)
+            raw = await loop.run_in_executor(None, _read_file, image_path)
+
+            cache_key = self.result_cache.make_key(raw, self._get_cache_context("process_image"))
+            cached = await loop.run_in_executor(None, self.result_cache.get, cache_key)
+            if cached is not None:
+                return cached
+
+            # 图片缩放和编码为CPU密集操作，放到线程池中执行
+            upload = await loop.run_in_executor(
+                None, self.upload_preparer.prepare_bytes, raw, os.path.basename(image_path), mime_type
+            )
+            result = await self.post("process_image", files={'image': upload.as_file_tuple()})
+            upload.restore_coordinates(result)
+            await loop.run_in_executor(None, self.result_cache.put, cache_key, result)
+            return result
+        except APIException:
+            raise
+        except Exception as e:
+            logger.error(f"处理图片失败: {str(e)}")
+            raise APIException(f"处理图片失败: {str(e)}")
+
+    async def upload_custom_image(self, image_path: str, image_type: str) -> Dict[str, Any]:
+        """上传自定义图像
+
+        Args:
+            image_path: 图像文件路径
+            image_type: 图像类型
+
+        Returns:
+            上传结果
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            mime_type = RF4APIClient.get_file_mime_type(image_path)
+            raw = await loop.run_in_executor(None, _read_file, image_path)
+            files = {'image': (os.path.basename(image_path), raw, mime_type)}
+            return await self.post("upload_image", data={"type": image_type}, files=files)
+        except APIException:
+            raise
+        except Exception as e:
+            logger.error(f"上传图片失败: {str(e)}")
+            raise APIException(f"上传图片失败: {str(e)}")
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class AsyncLoopThread:
+    """在专用线程中运行的asyncio事件循环
+
+    供Qt等同步代码提交协程，返回 concurrent.futures.Future，
+    可通过 add_done_callback 配合Qt信号把结果送回GUI线程。
+    """
+
+    def __init__(self, name: str = "rf4-async-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """提交协程到事件循环线程执行"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self) -> None:
+        """停止事件循环并等待线程退出"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
@@ -0,0 +1,244 @@
+"""多后端选择模块，后台探测各后端的延迟和错误率，把请求路由到最快的健康后端"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Iterable, List, Optional, Union
+from src.utils.config_loader import config_loader
+from src.utils.metrics import MetricsRegistry
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认多后端配置：connect_timeout / read_timeout 为每次请求建立连接和等待响应的超时（秒）
+DEFAULT_BACKENDS_CONFIG = {
+    "connect_timeout": 10.0,
+    "read_timeout": 60.0,
+    "probe_interval": 15.0,
+    "probe_timeout": 5.0,
+    "probe_path": "/health",
+    "rtt_smoothing": 0.3,
+    "error_window": 20,
+    "max_error_rate": 0.5,
+    "failure_threshold": 3,
+    "cooldown": 10.0,
+    "max_cooldown": 300.0,
+    "switch_margin": 0.2
+}
+
+
+def parse_base_urls(value: Union[str, Iterable[str], None]) -> List[str]:
+    """把配置中的 api_base_url（字符串、逗号分隔字符串或列表）转换为URL列表"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    urls = []
+    for url in value:
+        url = url.strip().rstrip('/')
+        if url and url not in urls:
+            urls.append(url)
+    return urls
+
+
+class BackendStats:
+    """单个后端的延迟和错误统计"""
+
+    def __init__(self, url: str, error_window: int):
+        self.url = url
+        self.rtt: Optional[float] = None
+        self.results = deque(maxlen=error_window)
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def error_rate(self) -> float:
+        if not self.results:
+            return 0.0
+        return self.results.count(False) / len(self.results)
+
+    def to_dict(self, healthy: bool) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": healthy,
+            "rtt_ms": round(self.rtt * 1000, 1) if self.rtt is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "requests": self.requests,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error
+        }
+
+
+class BackendPool:
+    """后端池
+
+    探测线程定期请求每个后端的 probe_path，以指数滑动平均记录往返时间；
+    探测和真实请求的成败都计入最近 error_window 次的错误率。
+    连续失败 failure_threshold 次或错误率超过 max_error_rate 的后端暂时下线，
+    冷却时间随连续失败次数翻倍。select() 返回往返时间最短的健康后端，
+    新的后端需比当前后端快 switch_margin 以上才会切换，避免来回抖动。
+    只有一个后端时不启动探测线程。
+    """
+
+    def __init__(self, urls: Iterable[str], config: Optional[Dict[str, Any]] = None):
+        settings = dict(DEFAULT_BACKENDS_CONFIG)
+        settings.update(config if config is not None else config_loader.get('backends', {}))
+        self.urls = parse_base_urls(urls)
+        if not self.urls:
+            raise ValueError("至少需要一个后端地址")
+        self.request_timeout = (float(settings["connect_timeout"]), float(settings["read_timeout"]))
+        self.probe_interval = float(settings["probe_interval"])
+        self.probe_timeout = float(settings["probe_timeout"])
+        self.probe_path = settings["probe_path"]
+        self.rtt_smoothing = float(settings["rtt_smoothing"])
+        self.max_error_rate = float(settings["max_error_rate"])
+        self.failure_threshold = max(1, int(settings["failure_threshold"]))
+        self.cooldown = float(settings["cooldown"])
+        self.max_cooldown = float(settings["max_cooldown"])
+        self.switch_margin = float(settings["switch_margin"])
+
+        self._stats = {url: BackendStats(url, max(1, int(settings["error_window"]))) for url in self.urls}
+        self._current = self.urls[0]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    @property
+    def primary(self) -> str:
+        return self.urls[0]
+
+    def _is_healthy(self, stats: BackendStats, now: float) -> bool:
+        return stats.down_until <= now and stats.error_rate <= self.max_error_rate
+
+    def select(self, exclude: Iterable[str] = ()) -> str:
+        """选择处理下一个请求的后端
+
+        Args:
+            exclude: 本次请求已经失败过的后端
+
+        Returns:
+            后端基础URL；全部后端都不健康时返回最早结束冷却的那个
+        """
+        if len(self.urls) == 1:
+            return self.urls[0]
+        self.start()
+        exclude = set(exclude)
+        now = time.monotonic()
+        with self._lock:
+            candidates = [self._stats[url] for url in self.urls if url not in exclude]
+            if not candidates:
+                candidates = [self._stats[url] for url in self.urls]
+            healthy = [stats for stats in candidates if self._is_healthy(stats, now)]
+            if not healthy:
+                return min(candidates, key=lambda stats: stats.down_until).url
+
+            # 没有测得往返时间的后端排在已知后端之后，同等条件下按配置顺序
+            best = min(healthy, key=lambda stats: (stats.rtt is None, stats.rtt or 0.0, self.urls.index(stats.url)))
+            current = self._stats[self._current]
+            if current in healthy and current is not best and current.rtt is not None and best.rtt is not None \
+                    and best.rtt > current.rtt * (1 - self.switch_margin):
+                return current.url
+            if best.url != self._current:
+                logger.info(f"切换后端: {self._current} -> {best.url}")
+                self._current = best.url
+            return best.url
+
+    def report(self, url: str, ok: bool, error: Optional[str] = None, rtt: Optional[float] = None) -> None:
+        """记录一次请求或探测的结果
+
+        Args:
+            url: 后端基础URL
+            ok: 是否成功（连接失败、超时和5xx视为失败）
+            error: 失败原因
+            rtt: 往返时间（秒），仅探测时提供
+        """
+        stats = self._stats.get(url)
+        if stats is None:
+            return
+        with self._lock:
+            stats.requests += 1
+            stats.results.append(ok)
+            if rtt is not None:
+                stats.rtt = rtt if stats.rtt is None else \
+                    stats.rtt + self.rtt_smoothing * (rtt - stats.rtt)
+            if ok:
+                stats.consecutive_failures = 0
+                stats.down_until = 0.0
+                return
+            stats.failures += 1
+            stats.consecutive_failures += 1
+            stats.last_error = error
+            if stats.consecutive_failures >= self.failure_threshold:
+                backoff = self.cooldown * 2 ** (stats.consecutive_failures - self.failure_threshold)
+                stats.down_until = time.monotonic() + min(self.max_cooldown, backoff)
+                if stats.consecutive_failures == self.failure_threshold:
+                    logger.warning(f"后端 {url} 连续失败 {stats.consecutive_failures} 次，暂时停用: {error}")
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """获取各后端的统计信息"""
+        now = time.monotonic()
+        with self._lock:
+            return [dict(self._stats[url].to_dict(self._is_healthy(self._stats[url], now)),
+                         current=url == self._current)
+                    for url in self.urls]
+
+    def start(self) -> None:
+        """启动探测线程，只有一个后端或已启动时无效"""
+        if len(self.urls) == 1 or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._probe_loop, name="rf4-backend-prober", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """停止探测线程"""
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def probe_once(self, session=None) -> None:
+        """依次探测所有后端一次"""
+        import requests
+        session = session or requests.Session()
+        for url in self.urls:
+            start = time.perf_counter()
+            try:
+                response = session.get(url + self.probe_path, timeout=self.probe_timeout)
+                response.close()
+                elapsed = time.perf_counter() - start
+                # 服务端能正常应答（包括404）即视为可达
+                ok = response.status_code < 500
+                self.report(url, ok, None if ok else f"HTTP {response.status_code}", elapsed if ok else None)
+            except requests.RequestException as e:
+                self.report(url, False, str(e))
+        self._export_gauges()
+
+    def _probe_loop(self) -> None:
+        import requests
+        session = requests.Session()
+        try:
+            while not self._stop.is_set():
+                self.probe_once(session)
+                self._stop.wait(self.probe_interval)
+        finally:
+            session.close()
+
+    def _export_gauges(self) -> None:
+        metrics = MetricsRegistry()
+        for stats in self.get_stats():
+            metrics.set_gauge("backend_healthy", int(stats["healthy"]), backend=stats["url"])
+            metrics.set_gauge("backend_error_rate", stats["error_rate"], backend=stats["url"])
+            if stats["rtt_ms"] is not None:
+                metrics.set_gauge("backend_rtt_seconds", stats["rtt_ms"] / 1000, backend=stats["url"])
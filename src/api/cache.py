@@ -0,0 +1,206 @@
+"""结果缓存模块，按图片内容哈希在磁盘上缓存API处理结果"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from src.utils.config_loader import config_loader
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认结果缓存配置
+DEFAULT_CACHE_CONFIG = {
+    "enabled": True,
+    "max_entries": 500,
+    "max_bytes": 200 * 1024 * 1024,
+    "ttl_seconds": 7 * 24 * 3600
+}
+
+
+class ResultCache:
+    """基于内容寻址的磁盘结果缓存
+
+    每条结果保存为缓存目录下的一个JSON文件，文件名为缓存键。
+    使用文件修改时间记录最近访问顺序，超出条目数或字节预算时按LRU淘汰，
+    超过TTL的条目在读取时视为未命中并删除。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, config: Optional[Dict[str, Any]] = None):
+        settings = dict(DEFAULT_CACHE_CONFIG)
+        settings.update(config if config is not None else config_loader.get('result_cache', {}))
+        self.enabled = bool(settings["enabled"])
+        self.max_entries = int(settings["max_entries"])
+        self.max_bytes = int(settings["max_bytes"])
+        self.ttl_seconds = settings["ttl_seconds"]
+
+        self.cache_dir = cache_dir or os.path.join(config_loader.config_dir, 'cache')
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        # 缓存键 -> 文件字节数，按访问顺序排列（最早访问的在前）
+        self._index = None
+        self._total_bytes = 0
+
+    @staticmethod
+    def make_key(data: bytes, context: Dict[str, Any]) -> str:
+        """根据图片字节和端点配置生成缓存键
+
+        Args:
+            data: 原始图片字节
+            context: 影响结果的配置（基础URL、端点、预处理参数等）
+
+        Returns:
+            十六进制哈希字符串
+        """
+        digest = hashlib.sha256(data)
+        digest.update(json.dumps(context, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def _image_path(self, key: str) -> str:
+        # 二进制结果图片单独保存，避免写入JSON
+        return os.path.join(self.cache_dir, key + '.bin')
+
+    def _ensure_index(self) -> None:
+        """首次使用时扫描缓存目录建立索引"""
+        if self._index is not None:
+            return
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.json'):
+                    continue
+                key = name[:-5]
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                size = stat.st_size
+                if os.path.exists(self._image_path(key)):
+                    size += os.path.getsize(self._image_path(key))
+                entries.append((stat.st_mtime, key, size))
+            for _, key, size in sorted(entries):
+                self._index[key] = size
+                self._total_bytes += size
+        except Exception as e:
+            logger.error(f"加载结果缓存索引失败: {e}")
+
+    def _remove(self, key: str) -> None:
+        size = self._index.pop(key, 0)
+        self._total_bytes -= size
+        for path in (self._entry_path(key), self._image_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict(self) -> None:
+        """按LRU淘汰超出预算的条目"""
+        while self._index and (len(self._index) > self.max_entries
+                               or self._total_bytes > self.max_bytes):
+            key = next(iter(self._index))
+            self._remove(key)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存结果，未命中返回None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._ensure_index()
+            if key not in self._index:
+                self.misses += 1
+                return None
+
+            path = self._entry_path(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except Exception as e:
+                logger.warning(f"读取缓存条目失败: {e}")
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            if self.ttl_seconds and time.time() - entry.get("created", 0) > self.ttl_seconds:
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            result = entry.get("result")
+            if entry.get("has_image_bytes"):
+                try:
+                    with open(self._image_path(key), 'rb') as f:
+                        result["image_bytes"] = f.read()
+                except OSError as e:
+                    logger.warning(f"读取缓存图片失败: {e}")
+                    self._remove(key)
+                    self.misses += 1
+                    return None
+
+            # 更新访问顺序
+            self._index.move_to_end(key)
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+            self.hits += 1
+            return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """写入缓存结果"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._ensure_index()
+            path = self._entry_path(key)
+            tmp_path = path + '.tmp'
+            result = dict(result)
+            image_bytes = result.pop("image_bytes", None)
+            try:
+                size = 0
+                if image_bytes is not None:
+                    with open(self._image_path(key), 'wb') as f:
+                        f.write(image_bytes)
+                    size += len(image_bytes)
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({"created": time.time(), "result": result,
+                               "has_image_bytes": image_bytes is not None}, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+                size += os.path.getsize(path)
+            except Exception as e:
+                logger.error(f"写入结果缓存失败: {e}")
+                return
+
+            self._total_bytes += size - self._index.get(key, 0)
+            self._index[key] = size
+            self._index.move_to_end(key)
+            self._evict()
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._ensure_index()
+            for key in list(self._index):
+                self._remove(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            self._ensure_index()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": self._total_bytes
+            }
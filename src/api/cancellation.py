@@ -0,0 +1,53 @@
+"""请求取消支持，供界面中止已经过时的处理任务"""
+
+import logging
+import threading
+from typing import Callable, List
+from src.api.exceptions import RequestCancelled
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class CancelToken:
+    """取消标记
+
+    由发起任务的一方调用 cancel()，执行任务的线程在各个检查点调用
+    raise_if_cancelled()，上传过程中由请求体在每次读取时检查，
+    从而中止发送并关闭连接。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """标记为已取消并执行已注册的回调，重复调用无效"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"执行取消回调失败: {e}")
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """注册取消时执行的回调，已取消时立即执行"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def raise_if_cancelled(self) -> None:
+        """已取消时抛出 RequestCancelled"""
+        if self._event.is_set():
+            raise RequestCancelled()
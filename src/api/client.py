@@ -1,29 +1,50 @@
 """API客户端模块，用于处理与后端服务的通信"""
 
 import os
+import copy
 import json
+import time
 import base64
 import logging
 import mimetypes
 import requests
-from typing import Dict, Any, Optional, List, Union
+from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, Union, Iterable, Iterator, Tuple
 from pathlib import Path
 from src.utils.config_loader import config_loader
+from src.utils.helpers import iter_bounded
+from src.api.exceptions import APIException, RequestCancelled
+from src.api.cancellation import CancelToken
+
+if TYPE_CHECKING:
+    from src.api.backends import BackendPool
+    from src.utils.metrics import RequestTrace
+
+# 后端池、缓存、去重、预处理、传输和指标模块在首次使用时才导入，不拖慢启动
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
-# 确保mimetypes已初始化
-mimetypes.init()
+_mimetypes_ready = False
 
-# 添加一些常见的图片类型映射（如果系统中没有）
-if '.png' not in mimetypes.types_map:
-    mimetypes.add_type('image/png', '.png')
-if '.jpg' not in mimetypes.types_map and '.jpeg' not in mimetypes.types_map:
-    mimetypes.add_type('image/jpeg', '.jpg')
-    mimetypes.add_type('image/jpeg', '.jpeg')
-if '.bmp' not in mimetypes.types_map:
-    mimetypes.add_type('image/bmp', '.bmp')
+
+def _ensure_mimetypes() -> None:
+    """首次使用时初始化mimetypes，避免导入模块时读取系统MIME数据库"""
+    global _mimetypes_ready
+    if _mimetypes_ready:
+        return
+    mimetypes.init()
+    
+    # 添加一些常见的图片类型映射（如果系统中没有）
+    if '.png' not in mimetypes.types_map:
+        mimetypes.add_type('image/png', '.png')
+    if '.jpg' not in mimetypes.types_map and '.jpeg' not in mimetypes.types_map:
+        mimetypes.add_type('image/jpeg', '.jpg')
+        mimetypes.add_type('image/jpeg', '.jpeg')
+    if '.bmp' not in mimetypes.types_map:
+        mimetypes.add_type('image/bmp', '.bmp')
+    _mimetypes_ready = True
 
 class APIConfig:
     """API配置类，负责从配置加载器获取API配置"""
@@ -38,17 +59,20 @@ class APIConfig:
     
     def _load_config(self):
         """加载配置"""
-        # 从环境变量获取
-        self.base_url = os.environ.get('RF4_API_BASE_URL')
+        from src.api.backends import parse_base_urls
+        # 从环境变量获取，多个地址以逗号分隔
+        self.base_urls = parse_base_urls(os.environ.get('RF4_API_BASE_URL'))
         
-        # 如果环境变量没有配置，从配置加载器获取
-        if not self.base_url:
-            self.base_url = config_loader.get('api_base_url')
+        # 如果环境变量没有配置，从配置加载器获取（字符串或列表）
+        if not self.base_urls:
+            self.base_urls = parse_base_urls(config_loader.get('api_base_url'))
         
         # 如果仍然未配置，使用默认值
-        if not self.base_url:
-            self.base_url = "http://localhost:5000/api"
-            logger.warning(f"未找到API基础URL配置，使用默认值: {self.base_url}")
+        if not self.base_urls:
+            self.base_urls = ["http://localhost:5000/api"]
+            logger.warning(f"未找到API基础URL配置，使用默认值: {self.base_urls[0]}")
+        self.base_url = self.base_urls[0]
+        self._backend_pool = None
         
         # 加载API端点配置
         self.endpoints = config_loader.get('api_endpoints', {})
@@ -58,6 +82,7 @@ class APIConfig:
                 "process_image": {
                     "path": "process_image",
                     "method": "POST",
+                    "idempotent": True,
                     "description": "处理图像识别鱼类"
                 },
                 # 其他端点配置可在这里添加...
@@ -65,16 +90,35 @@ class APIConfig:
             logger.warning(f"未找到API端点配置，使用默认值")
     
     def get_base_url(self) -> str:
-        """获取API基础URL"""
+        """获取API基础URL（配置了多个后端时为第一个）"""
         return self.base_url
     
-    def set_base_url(self, url: str) -> None:
-        """设置API基础URL"""
-        self.base_url = url
+    def get_base_urls(self) -> List[str]:
+        """获取全部后端的API基础URL"""
+        return list(self.base_urls)
+    
+    def set_base_url(self, url: Union[str, List[str]]) -> None:
+        """设置API基础URL，可传入多个后端"""
+        from src.api.backends import parse_base_urls
+        urls = parse_base_urls(url)
+        if not urls:
+            raise APIException("API基础URL不能为空")
+        self.base_urls = urls
+        self.base_url = urls[0]
+        if self._backend_pool is not None:
+            self._backend_pool.stop()
+            self._backend_pool = None
         # 更新配置
-        config_loader.set('api_base_url', url)
+        config_loader.set('api_base_url', urls[0] if len(urls) == 1 else urls)
         config_loader.save_config()
     
+    def get_backend_pool(self) -> "BackendPool":
+        """获取所有客户端共享的后端池"""
+        if self._backend_pool is None:
+            from src.api.backends import BackendPool
+            self._backend_pool = BackendPool(self.base_urls)
+        return self._backend_pool
+    
     def get_endpoint(self, name: str) -> Optional[Dict[str, Any]]:
         """获取指定名称的API端点配置"""
         return self.endpoints.get(name)
@@ -88,26 +132,55 @@ class APIConfig:
         config_loader.set('api_endpoints', self.endpoints)
         config_loader.save_config()
 
-class APIException(Exception):
-    """API异常类"""
-    
-    def __init__(self, message: str, status_code: int = None):
-        self.message = message
-        self.status_code = status_code
-        super().__init__(self.message)
-
 class BaseAPIClient:
     """API客户端基类"""
     
     def __init__(self):
         self.config = APIConfig()
-        self.base_url = self.config.get_base_url()
+        self.backends = self.config.get_backend_pool()
         self.session = requests.Session()
+        self._pool_size = DEFAULT_POOLSIZE
+        from src.utils.metrics import MetricsRegistry
+        self.metrics = MetricsRegistry()
+    
+    @property
+    def base_url(self) -> str:
+        """首选后端的API基础URL"""
+        return self.backends.primary
     
-    def _handle_response(self, response: requests.Response) -> Dict[str, Any]:
-        """处理API响应"""
+    @base_url.setter
+    def base_url(self, url: str) -> None:
+        # 直接指定地址时只使用这一个后端，不做探测和故障转移
+        from src.api.backends import BackendPool
+        self.backends = BackendPool([url])
+    
+    def with_own_session(self) -> "BaseAPIClient":
+        """创建使用独立HTTP会话的副本，缓存、去重和配置等其余状态与原实例共享"""
+        client = copy.copy(self)
+        client.session = requests.Session()
+        client._pool_size = DEFAULT_POOLSIZE
+        return client
+    
+    def _ensure_pool_size(self, size: int) -> None:
+        """确保连接池足够容纳指定数量的并发请求"""
+        if size <= self._pool_size:
+            return
+        adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._pool_size = size
+    
+    def _handle_response(self, response: requests.Response, trace: Optional["RequestTrace"] = None,
+                         cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """处理API响应，按响应头解压并解码JSON或MessagePack"""
+        from src.api.transport import read_body, decode_payload
         if response.status_code == 200:
-            return response.json()
+            body = read_body(response, trace, cancel_token)
+            content_type = response.headers.get('Content-Type', '')
+            if trace is None:
+                return decode_payload(body, content_type)
+            with trace.phase("parse"):
+                return decode_payload(body, content_type)
         else:
             error_msg = f"API响应错误: {response.status_code}"
             try:
@@ -120,34 +193,245 @@ class BaseAPIClient:
             logger.error(error_msg)
             raise APIException(error_msg, response.status_code)
     
-    def _get_endpoint_url(self, endpoint_name: str) -> str:
-        """获取完整的端点URL"""
+    def _get_endpoint_url(self, endpoint_name: str, base_url: Optional[str] = None) -> str:
+        """获取完整的端点URL，未指定后端时使用首选后端"""
         endpoint_config = self.config.get_endpoint(endpoint_name)
         if not endpoint_config:
             raise APIException(f"未找到端点配置: {endpoint_name}")
         
         endpoint_path = endpoint_config.get("path", endpoint_name)
-        return self.base_url + endpoint_path
+        return (base_url or self.base_url) + endpoint_path
+    
+    def _send(self, method: str, url: str, trace: "RequestTrace",
+              cancel_token: Optional[CancelToken] = None, **kwargs) -> requests.Response:
+        """发送请求并记录连接、上传和等待服务端的耗时
+        
+        请求体包装为 TimedUploadBody，由其读取时间点划分阶段；
+        没有请求体时，连接和服务端处理合并记为 server。
+        响应以流式方式返回，响应体由调用方读取。
+        上传中取消时由请求体中止发送；等待服务端期间取消的，收到响应头后立即关闭连接。
+        """
+        from src.api.transport import TimedUploadBody
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        request = self.session.prepare_request(requests.Request(method, url, **kwargs))
+        body = request.body
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        timed_body = None
+        if body:
+            timed_body = TimedUploadBody(body, cancel_token)
+            request.body = timed_body
+            trace.add_bytes("upload", len(body))
+        settings = self.session.merge_environment_settings(request.url, {}, True, None, None)
+        
+        start = time.perf_counter()
+        try:
+            response = self.session.send(request, timeout=self.backends.request_timeout, **settings)
+        except requests.RequestException as e:
+            # 请求体一个字节都没有读取时请求肯定未送达服务端，故障转移时可以安全重发
+            e.request_unsent = timed_body is not None and timed_body.first_read_at is None
+            raise
+        headers_at = time.perf_counter()
+        if timed_body is not None and timed_body.sent_at is not None:
+            trace.add_phase("connect", timed_body.first_read_at - start)
+            trace.add_phase("upload", timed_body.sent_at - timed_body.first_read_at)
+            trace.add_phase("server", headers_at - timed_body.sent_at)
+        else:
+            trace.add_phase("server", headers_at - start)
+        if cancel_token is not None and cancel_token.cancelled:
+            # 响应体尚未读取，关闭时连接被丢弃而不是放回连接池
+            response.close()
+            cancel_token.raise_if_cancelled()
+        return response
     
-    def get(self, endpoint_name: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def _is_idempotent(self, endpoint_name: str, method: str) -> bool:
+        """端点能否安全地重复发送：GET默认可以，其余方法需在端点配置中声明 idempotent"""
+        endpoint_config = self.config.get_endpoint(endpoint_name) or {}
+        return bool(endpoint_config.get("idempotent", method == "GET"))
+    
+    def _send_with_failover(self, method: str, endpoint_name: str, trace: "RequestTrace",
+                            cancel_token: Optional[CancelToken] = None,
+                            **kwargs) -> Tuple[requests.Response, str]:
+        """向最快的健康后端发送请求，失败时依次换用其余后端
+        
+        幂等端点在连接失败、超时或服务端5xx时换用其他后端重发。非幂等端点只在请求体
+        尚未开始发送（如连接被拒绝、连接超时）时才换用其他后端：请求体发出后即使连接被断开，
+        服务端也可能已经处理，重发会造成重复上传等副作用。
+        每次尝试的结果都反馈给后端池；所有后端都失败时返回最后一个响应或抛出最后的异常。
+        
+        Returns:
+            (响应, 处理该请求的后端基础URL)
+        """
+        idempotent = self._is_idempotent(endpoint_name, method)
+        tried = []
+        while True:
+            base_url = self.backends.select(exclude=tried)
+            tried.append(base_url)
+            last_attempt = len(tried) >= len(self.backends)
+            url = self._get_endpoint_url(endpoint_name, base_url)
+            try:
+                response = self._send(method, url, trace, cancel_token, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.backends.report(base_url, False, str(e))
+                replayable = idempotent or getattr(e, "request_unsent", False)
+                if last_attempt or not replayable:
+                    raise
+                logger.warning(f"后端 {base_url} 连接失败或超时，切换到其他后端: {e}")
+                continue
+            
+            if response.status_code < 500:
+                self.backends.report(base_url, True)
+                return response, base_url
+            self.backends.report(base_url, False, f"HTTP {response.status_code}")
+            if last_attempt or not idempotent:
+                return response, base_url
+            logger.warning(f"后端 {base_url} 返回 {response.status_code}，切换到其他后端")
+            response.close()
+    
+    def _record(self, trace: "RequestTrace", owned: bool, error: Optional[str] = None) -> None:
+        """请求由本方法创建的trace记录时写入指标，调用方传入的trace由调用方记录"""
+        if owned:
+            self.metrics.record(trace.finish(error))
+    
+    def get(self, endpoint_name: str, params: Optional[Dict[str, Any]] = None,
+            trace: Optional["RequestTrace"] = None, cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
         """发送GET请求"""
-        url = self._get_endpoint_url(endpoint_name)
-        response = self.session.get(url, params=params)
-        return self._handle_response(response)
+        from src.api.transport import negotiation_headers
+        from src.utils.metrics import RequestTrace
+        owned = trace is None
+        trace = trace or RequestTrace(f"api.get.{endpoint_name}")
+        try:
+            if not self.config.get_endpoint(endpoint_name):
+                raise APIException(f"未找到端点配置: {endpoint_name}")
+            headers = negotiation_headers(self.config.get_endpoint(endpoint_name))
+            response, _ = self._send_with_failover("GET", endpoint_name, trace, cancel_token,
+                                                   params=params, headers=headers)
+            try:
+                result = self._handle_response(response, trace, cancel_token)
+            finally:
+                response.close()
+        except RequestCancelled:
+            raise
+        except Exception as e:
+            self._record(trace, owned, str(e))
+            raise
+        self._record(trace, owned)
+        return result
     
     def post(self, endpoint_name: str, data: Optional[Dict[str, Any]] = None, 
-             json_data: Optional[Dict[str, Any]] = None, files: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """发送POST请求"""
-        url = self._get_endpoint_url(endpoint_name)
-        print(url)
-        logger.debug(f"发送POST请求: {url}, 数据: {data}, JSON数据: {json_data}, 文件: {files}")
-        response = self.session.post(url, data=data, json=json_data, files=files)
-        return self._handle_response(response)
+             json_data: Optional[Dict[str, Any]] = None, files: Optional[Dict[str, Any]] = None,
+             trace: Optional["RequestTrace"] = None, cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """发送POST请求
+        
+        Args:
+            files: 上传的文件，内容需为字节以便故障转移时重新发送
+            trace: 记录阶段耗时的RequestTrace，未传入时本次请求单独记录到指标
+            cancel_token: 取消标记，取消后中止上传或下载并抛出 RequestCancelled
+        """
+        from src.api.transport import negotiation_headers
+        from src.utils.metrics import RequestTrace
+        owned = trace is None
+        trace = trace or RequestTrace(f"api.post.{endpoint_name}")
+        try:
+            if not self.config.get_endpoint(endpoint_name):
+                raise APIException(f"未找到端点配置: {endpoint_name}")
+            logger.debug(f"发送POST请求: {endpoint_name}, 数据: {data}, JSON数据: {json_data}, 文件: {files}")
+            binary = self._get_image_transport(endpoint_name) != "base64"
+            # 协商二进制结果图片和压缩/紧凑编码，旧服务端会忽略这些请求头并返回JSON
+            headers = negotiation_headers(self.config.get_endpoint(endpoint_name), binary)
+            response, base_url = self._send_with_failover("POST", endpoint_name, trace, cancel_token,
+                                                          data=data, json=json_data, files=files, headers=headers)
+            try:
+                if binary:
+                    result = self._handle_binary_response(response, trace, cancel_token, base_url)
+                else:
+                    result = self._handle_response(response, trace, cancel_token)
+            finally:
+                response.close()
+        except RequestCancelled:
+            raise
+        except Exception as e:
+            self._record(trace, owned, str(e))
+            raise
+        self._record(trace, owned)
+        return result
+    
+    def _get_image_transport(self, endpoint_name: str) -> str:
+        """获取端点的结果图片传输方式: base64 / multipart"""
+        endpoint_config = self.config.get_endpoint(endpoint_name) or {}
+        return endpoint_config.get("image_transport", "base64")
+    
+    def _handle_binary_response(self, response: requests.Response, trace: "RequestTrace",
+                                cancel_token: Optional[CancelToken] = None,
+                                base_url: Optional[str] = None) -> Dict[str, Any]:
+        """处理可能包含二进制结果图片的响应
+        
+        支持三种形式：multipart响应（JSON + 图片部分）、
+        JSON中只返回 image_id（再流式获取图片）、JSON中内嵌Base64图片（旧服务端）。
+        """
+        from src.api.transport import read_body, result_from_multipart
+        if response.status_code != 200:
+            return self._handle_response(response)
+        
+        content_type = response.headers.get('Content-Type', '')
+        if content_type.lower().startswith('multipart/'):
+            body = read_body(response, trace, cancel_token)
+            with trace.phase("parse"):
+                return result_from_multipart(body, content_type)
+        
+        result = self._handle_response(response, trace, cancel_token)
+        if "image_id" in result and "image" not in result:
+            # 结果图片只保存在生成它的后端上
+            result["image_bytes"] = self.fetch_result_image(result["image_id"], trace, cancel_token, base_url)
+        return result
+    
+    def fetch_result_image(self, image_id: str, trace: Optional["RequestTrace"] = None,
+                           cancel_token: Optional[CancelToken] = None,
+                           base_url: Optional[str] = None) -> bytearray:
+        """按ID流式下载结果图片
+        
+        Args:
+            image_id: 服务端返回的结果图片ID
+            trace: 记录下载耗时的RequestTrace
+            cancel_token: 取消标记
+            base_url: 返回该图片ID的后端，默认为首选后端
+            
+        Returns:
+            图片字节
+        """
+        from src.api.transport import read_body
+        url = self._get_endpoint_url("result_image", base_url) + "/" + str(image_id)
+        start = time.perf_counter()
+        response = self.session.get(url, stream=True, timeout=self.backends.request_timeout)
+        try:
+            if response.status_code != 200:
+                self._handle_response(response)
+            image = read_body(response, cancel_token=cancel_token)
+        finally:
+            response.close()
+        if trace is not None:
+            trace.add_phase("image_fetch", time.perf_counter() - start)
+            trace.add_bytes("download", len(image))
+        return image
 
 class RF4APIClient(BaseAPIClient):
     """俄罗斯钓鱼4 API客户端"""
     
-    def get_file_mime_type(self, file_path: str) -> str:
+    def __init__(self):
+        super().__init__()
+        from src.api.upload_prep import UploadPreparer
+        from src.api.cache import ResultCache
+        from src.api.dedup import DuplicateDetector
+        from src.core.roi import RoiSelector
+        self.upload_preparer = UploadPreparer(roi_selector=RoiSelector())
+        self.result_cache = ResultCache()
+        self.duplicate_detector = DuplicateDetector(roi_selector=self.upload_preparer.roi_selector)
+        # 最近一次上传的预处理统计（字节数变化），便于调整配置
+        self.last_upload_stats = None
+    
+    @staticmethod
+    def get_file_mime_type(file_path: str) -> str:
         """获取文件的MIME类型
         
         Args:
@@ -157,6 +441,7 @@ class RF4APIClient(BaseAPIClient):
             文件的MIME类型
         """
         # 使用文件扩展名猜测MIME类型
+        _ensure_mimetypes()
         mime_type, _ = mimetypes.guess_type(file_path)
         
         # 如果无法猜测，使用默认值
@@ -178,39 +463,122 @@ class RF4APIClient(BaseAPIClient):
                 
         return mime_type
     
-    def process_image(self, image_path: str) -> Dict[str, Any]:
+    def _get_cache_context(self, endpoint_name: str) -> Dict[str, Any]:
+        """获取影响处理结果的配置，作为缓存键的一部分"""
+        return {
+            "base_urls": self.backends.urls,
+            "endpoint": self.config.get_endpoint(endpoint_name),
+            "upload_prep": self.upload_preparer.get_settings()
+        }
+    
+    def process_image(self, image_path: str, cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
         """处理图像识别鱼类
         
         Args:
             image_path: 图像文件路径
+            cancel_token: 取消标记，取消后中止上传或下载并抛出 RequestCancelled
             
         Returns:
             包含处理结果的字典
         """
-        file_obj = None
+        from src.utils.metrics import RequestTrace
+        trace = RequestTrace("api.process_image")
         try:
             # 获取文件的MIME类型
             mime_type = self.get_file_mime_type(image_path)
             logger.debug(f"上传图片 {image_path} MIME类型: {mime_type}")
             
-            # 打开文件
-            file_obj = open(image_path, 'rb')
+            with trace.phase("read"):
+                with open(image_path, 'rb') as f:
+                    raw = f.read()
+            trace.add_bytes("file", len(raw))
+            
+            # 先查询结果缓存，相同图片和端点配置直接返回
+            with trace.phase("cache"):
+                context = self._get_cache_context("process_image")
+                cache_key = self.result_cache.make_key(raw, context)
+                cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"结果缓存命中: {os.path.basename(image_path)}")
+                return self._attach_metrics(cached, trace)
             
-            # 使用multipart/form-data直接上传文件
+            # 与最近处理过的截图（同一端点和配置）近似重复时直接复用其结果
+            with trace.phase("dedup"):
+                perceptual_hash = self.duplicate_detector.compute_hash(raw)
+                duplicate = self.duplicate_detector.lookup(perceptual_hash, context)
+            if duplicate is not None:
+                logger.info(f"近似重复截图，复用结果: {os.path.basename(image_path)}")
+                return self._attach_metrics(dict(duplicate), trace)
+            
+            # 缩放并重新编码，减小上传体积
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            with trace.phase("prepare"):
+                upload = self.upload_preparer.prepare_bytes(raw, os.path.basename(image_path), mime_type)
+            self.last_upload_stats = upload.get_stats()
+            logger.info(f"上传预处理 {os.path.basename(image_path)}: "
+                        f"{upload.original_bytes} -> {upload.upload_bytes} 字节")
+            
+            # 使用multipart/form-data上传文件
             files = {
-                'image': (os.path.basename(image_path), file_obj, mime_type)
+                'image': upload.as_file_tuple()
             }
             
             # 发送到后端API
-            return self.post("process_image", files=files)
+            result = self.post("process_image", files=files, trace=trace, cancel_token=cancel_token)
+            
+            # 结果坐标基于裁剪缩放后的上传图，映射回原图空间
+            upload.restore_coordinates(result)
+            
+            self.result_cache.put(cache_key, result)
+            self.duplicate_detector.add(perceptual_hash, result, context)
+            return self._attach_metrics(result, trace)
                 
+        except RequestCancelled:
+            logger.info(f"已取消处理: {os.path.basename(image_path)}")
+            raise
         except Exception as e:
             logger.error(f"处理图片失败: {str(e)}")
+            self.metrics.record(trace.finish(str(e)))
             raise APIException(f"处理图片失败: {str(e)}")
-        finally:
-            # 确保资源正确关闭
-            if file_obj is not None and not file_obj.closed:
-                file_obj.close()
+    
+    def _attach_metrics(self, result: Dict[str, Any], trace: "RequestTrace") -> Dict[str, Any]:
+        """结束计时并把本次请求的阶段耗时放入结果的 metrics 字段"""
+        self.metrics.record(trace.finish())
+        result["metrics"] = trace.to_dict()
+        return result
+    
+    def process_images(self, image_paths: Iterable[str], max_workers: Optional[int] = None,
+                       cancel_token: Optional[CancelToken] = None) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+        """批量处理图像，按完成顺序逐个返回结果
+        
+        Args:
+            image_paths: 图像文件路径序列
+            max_workers: 最大并发上传数，默认读取配置 batch.max_workers
+            cancel_token: 取消标记，取消后在途请求中止，不再提交新的图片
+            
+        Yields:
+            (图像路径, 处理结果, 错误信息) 元组，成功时错误信息为None，失败时结果为None
+        """
+        if max_workers is None:
+            max_workers = config_loader.get('batch', {}).get('max_workers', 4)
+        max_workers = max(1, int(max_workers))
+        self._ensure_pool_size(max_workers)
+        
+        def process(path):
+            return self.process_image(path, cancel_token)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # 只保持有限数量的任务在途，避免一次性提交全部路径
+            for path, result, error in iter_bounded(executor, process, image_paths, max_workers * 2):
+                if cancel_token is not None and cancel_token.cancelled:
+                    return
+                if error is None:
+                    yield path, result, None
+                elif isinstance(error, APIException):
+                    yield path, None, error.message
+                else:
+                    yield path, None, str(error)
     
     # def get_fish_database(self) -> List[Dict[str, Any]]:
     #     """获取鱼类数据库
@@ -249,17 +617,17 @@ class RF4APIClient(BaseAPIClient):
         Returns:
             上传结果
         """
-        file_obj = None
         try:
             # 获取文件的MIME类型
             mime_type = self.get_file_mime_type(image_path)
             logger.debug(f"上传自定义图片 {image_path} MIME类型: {mime_type}")
             
-            # 打开文件
-            file_obj = open(image_path, 'rb')
+            # 读入内存，故障转移到其他后端时可以重新发送
+            with open(image_path, 'rb') as f:
+                content = f.read()
             
             files = {
-                'image': (os.path.basename(image_path), file_obj, mime_type)
+                'image': (os.path.basename(image_path), content, mime_type)
             }
             data = {"type": image_type}
             
@@ -268,10 +636,21 @@ class RF4APIClient(BaseAPIClient):
         except Exception as e:
             logger.error(f"上传图片失败: {str(e)}")
             raise APIException(f"上传图片失败: {str(e)}")
-        finally:
-            # 确保资源正确关闭
-            if file_obj is not None and not file_obj.closed:
-                file_obj.close()
 
-# 为方便使用，创建默认实例
-rf4_api = RF4APIClient() 
\ No newline at end of file
+# 默认实例在首次使用时创建，避免导入模块时就建立会话
+_rf4_api = None
+
+
+def get_rf4_api() -> RF4APIClient:
+    """获取默认的API客户端实例"""
+    global _rf4_api
+    if _rf4_api is None:
+        _rf4_api = RF4APIClient()
+    return _rf4_api
+
+
+def __getattr__(name: str):
+    # 兼容 from src.api.client import rf4_api 的写法
+    if name == 'rf4_api':
+        return get_rf4_api()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
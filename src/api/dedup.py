@@ -0,0 +1,219 @@
+"""近似重复截图检测模块，使用感知哈希和BK树复用相似截图的处理结果"""
+
+import io
+import json
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, Tuple
+from src.utils.config_loader import config_loader
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认去重配置：鱼护截图之间只差一两张鱼卡时界面其余部分完全相同，
+# 整图低分辨率哈希会误判为重复而返回上一张截图的结果，因此默认关闭；
+# 启用后只对渔获面板区域（ROI）计算 16x16 哈希，并只接受极小的距离
+DEFAULT_DEDUP_CONFIG = {
+    "enabled": False,
+    "max_distance": 1,
+    "capacity": 256,
+    "hash_size": 16
+}
+
+
+def dhash(data: bytes, hash_size: int = 16, roi_selector=None) -> Optional[int]:
+    """计算图片的差值哈希(dHash)
+
+    Args:
+        data: 图片字节
+        hash_size: 哈希边长，结果为 hash_size * hash_size 位
+        roi_selector: 指定时只对其选出的渔获面板区域计算哈希
+
+    Returns:
+        整数形式的哈希值，无法解码或指定了 roi_selector 但截图分辨率没有对应区域时返回None
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+            box = None
+            if roi_selector is not None:
+                box = roi_selector.select(width, height)
+                if box is None:
+                    return None
+            target = hash_size * 8
+            if box is None:
+                # JPEG可直接以低分辨率解码，减少计算量
+                image.draft("L", (target, target))
+                region = image
+            else:
+                # 按裁剪区域占整图的比例放大解码尺寸，裁剪框随解码尺寸缩放
+                image.draft("L", (target * width // (box[2] - box[0]), target * height // (box[3] - box[1])))
+                scale_x, scale_y = image.width / width, image.height / height
+                region = image.crop((int(box[0] * scale_x), int(box[1] * scale_y),
+                                     int(box[2] * scale_x), int(box[3] * scale_y)))
+            small = region.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    except Exception as e:
+        logger.warning(f"计算感知哈希失败: {e}")
+        return None
+
+    pixels = small.tobytes()
+    value = 0
+    width = hash_size + 1
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个哈希值之间的汉明距离"""
+    return bin(a ^ b).count("1")
+
+
+class _BKNode:
+    __slots__ = ("value", "payload", "children", "removed")
+
+    def __init__(self, value: int, payload: Any):
+        self.value = value
+        self.payload = payload
+        self.children: Dict[int, "_BKNode"] = {}
+        self.removed = False
+
+
+class BKTree:
+    """以汉明距离为度量的BK树，查询时按三角不等式剪枝"""
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, value: int, payload: Any) -> _BKNode:
+        node = _BKNode(value, payload)
+        if self.root is None:
+            self.root = node
+            return node
+        current = self.root
+        while True:
+            distance = hamming_distance(value, current.value)
+            child = current.children.get(distance)
+            if child is None:
+                current.children[distance] = node
+                return node
+            current = child
+
+    def find_nearest(self, value: int, max_distance: int) -> Optional[Tuple[int, Any]]:
+        """查找距离不超过 max_distance 的最近节点，返回 (距离, 附带数据)"""
+        if self.root is None:
+            return None
+        best = None
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node.value)
+            if not node.removed and distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, node.payload)
+            low, high = distance - max_distance, distance + max_distance
+            for child_distance, child in node.children.items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+        return best
+
+
+def _context_key(context: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(context, sort_keys=True, ensure_ascii=False) if context else ""
+
+
+class DuplicateDetector:
+    """近似重复截图检测器
+
+    保留最近 capacity 张截图的哈希和结果，新截图与其中任一张的汉明距离
+    不超过 max_distance 时视为重复并复用结果。结果按端点和配置（与结果缓存键
+    相同的上下文）分别保存，不同端点或配置之间不会复用。
+    传入 roi_selector 时只对渔获面板区域计算哈希，没有对应ROI的截图不参与去重。
+    淘汰的节点仅做标记，标记数量过多时重建BK树。
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, roi_selector=None):
+        settings = dict(DEFAULT_DEDUP_CONFIG)
+        settings.update(config if config is not None else config_loader.get('dedup', {}))
+        self.enabled = bool(settings["enabled"])
+        self.max_distance = int(settings["max_distance"])
+        self.capacity = max(1, int(settings["capacity"]))
+        self.hash_size = int(settings["hash_size"])
+        self.roi_selector = roi_selector
+
+        # 上下文 -> BK树；_recent 按加入顺序保存 (上下文, 节点)
+        self._trees: Dict[str, BKTree] = {}
+        self._recent = deque()
+        self._removed = 0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self._hit_distance_total = 0
+
+    def compute_hash(self, data: bytes) -> Optional[int]:
+        """计算截图的感知哈希，未启用时返回None"""
+        if not self.enabled:
+            return None
+        return dhash(data, self.hash_size, self.roi_selector)
+
+    def lookup(self, image_hash: Optional[int],
+               context: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """查找同一上下文中近似重复截图的结果，未找到返回None"""
+        if image_hash is None:
+            return None
+        with self._lock:
+            self.lookups += 1
+            tree = self._trees.get(_context_key(context))
+            found = tree.find_nearest(image_hash, self.max_distance) if tree is not None else None
+            if found is None:
+                return None
+            distance, result = found
+            self.hits += 1
+            self._hit_distance_total += distance
+            return result
+
+    def add(self, image_hash: Optional[int], result: Dict[str, Any],
+            context: Optional[Dict[str, Any]] = None) -> None:
+        """记录截图哈希及其处理结果
+
+        结果图片不保留，避免最近结果常驻内存占用过大
+        """
+        if image_hash is None:
+            return
+        payload = {key: value for key, value in result.items() if key not in ("image", "image_bytes")}
+        key = _context_key(context)
+        with self._lock:
+            tree = self._trees.setdefault(key, BKTree())
+            self._recent.append((key, tree.add(image_hash, payload)))
+            while len(self._recent) > self.capacity:
+                self._recent.popleft()[1].removed = True
+                self._removed += 1
+            if self._removed > self.capacity:
+                self._rebuild()
+
+    def _rebuild(self) -> None:
+        trees = {}
+        recent = deque()
+        for key, node in self._recent:
+            recent.append((key, trees.setdefault(key, BKTree()).add(node.value, node.payload)))
+        self._trees = trees
+        self._recent = recent
+        self._removed = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取去重统计信息"""
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+                "avg_hit_distance": round(self._hit_distance_total / self.hits, 2) if self.hits else 0.0,
+                "tracked": len(self._recent)
+            }
@@ -0,0 +1,17 @@
+"""API异常定义，单独成模块以便在不加载requests的情况下导入"""
+
+
+class APIException(Exception):
+    """API异常类"""
+    
+    def __init__(self, message: str, status_code: int = None):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(self.message)
+
+
+class RequestCancelled(APIException):
+    """请求已被取消"""
+    
+    def __init__(self, message: str = "请求已取消"):
+        super().__init__(message)
@@ -0,0 +1,257 @@
+"""响应传输支持：二进制结果图片、压缩编码和MessagePack协商"""
+
+import io
+import json
+import time
+import zlib
+import importlib
+import logging
+from typing import Dict, Any, List, Tuple, Optional
+import requests
+from src.utils.metrics import RequestTrace
+from src.api.cancellation import CancelToken
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 协商二进制结果时发送的Accept头，旧服务端忽略后仍返回JSON
+BINARY_ACCEPT = "multipart/mixed, application/json;q=0.9"
+
+# 流式读取时的分块大小
+CHUNK_SIZE = 64 * 1024
+
+# MessagePack响应的Content-Type
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+# 可选依赖：zstd和brotli解压、MessagePack解码，未安装时不向服务端声明支持
+_optional_modules: Dict[str, Any] = {}
+
+
+def _optional_module(name: str):
+    """导入可选依赖，未安装时返回None，结果缓存"""
+    if name not in _optional_modules:
+        try:
+            _optional_modules[name] = importlib.import_module(name)
+        except ImportError:
+            _optional_modules[name] = None
+    return _optional_modules[name]
+
+
+def supported_encodings() -> List[str]:
+    """当前环境可以解码的Content-Encoding"""
+    encodings = []
+    if _optional_module("zstandard") is not None:
+        encodings.append("zstd")
+    if _optional_module("brotli") is not None:
+        encodings.append("br")
+    return encodings + ["gzip", "deflate"]
+
+
+def negotiation_headers(endpoint_config: Dict[str, Any], binary: bool = False) -> Dict[str, str]:
+    """按端点配置生成 Accept-Encoding 和 Accept 请求头
+
+    端点配置中的 compression 为按优先级排列的压缩算法列表（如 ["zstd", "gzip"]），
+    response_format 为 "msgpack" 时优先请求MessagePack。本地无法解码的算法和格式
+    不会声明；始终保留 identity 和 JSON，不支持的服务端按原样返回即可。
+
+    Args:
+        endpoint_config: 端点配置
+        binary: 是否同时协商multipart二进制结果图片
+    """
+    headers = {}
+    compression = endpoint_config.get("compression")
+    if compression is not None:
+        supported = supported_encodings()
+        accepted = [encoding for encoding in compression if encoding in supported]
+        headers["Accept-Encoding"] = ", ".join(accepted + ["identity"])
+
+    types = ["multipart/mixed"] if binary else []
+    if endpoint_config.get("response_format") == "msgpack" and _optional_module("msgpack") is not None:
+        types.append(MSGPACK_TYPES[0])
+    if types:
+        types.append("application/json")
+        headers["Accept"] = ", ".join(media_type if i == 0 else f"{media_type};q={1 - i / 10:.1f}"
+                                      for i, media_type in enumerate(types))
+    return headers
+
+
+def read_raw_body(response: requests.Response, cancel_token: Optional[CancelToken] = None) -> bytearray:
+    """将流式响应体按传输时的原样（不解压）读入缓冲区
+
+    已知长度时预分配缓冲区，由底层连接直接 readinto，不产生中间副本；
+    否则按块追加到可增长的缓冲区。每读一块检查一次是否已取消。
+    """
+    length = response.headers.get('Content-Length')
+    if length:
+        buffer = bytearray(int(length))
+        view = memoryview(buffer)
+        pos = 0
+        try:
+            while pos < len(buffer):
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                read = response.raw.readinto(view[pos:pos + CHUNK_SIZE])
+                if not read:
+                    break
+                pos += read
+        finally:
+            view.release()
+        if pos < len(buffer):
+            logger.warning(f"响应体不完整: {pos}/{len(buffer)} 字节")
+            del buffer[pos:]
+        return buffer
+
+    buffer = bytearray()
+    while True:
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        chunk = response.raw.read(CHUNK_SIZE, decode_content=False)
+        if not chunk:
+            break
+        buffer += chunk
+    return buffer
+
+
+def decompress(data: bytes, content_encoding: str) -> bytes:
+    """按 Content-Encoding 解压响应体，多重编码按逆序解码"""
+    encodings = [encoding.strip().lower() for encoding in content_encoding.split(',')]
+    for encoding in reversed(encodings):
+        if encoding in ("", "identity"):
+            continue
+        if encoding in ("gzip", "x-gzip"):
+            data = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(data)
+        elif encoding == "deflate":
+            try:
+                data = zlib.decompress(data)
+            except zlib.error:
+                # 部分服务端发送不带zlib头的原始deflate数据
+                data = zlib.decompress(data, -zlib.MAX_WBITS)
+        elif encoding == "zstd" and _optional_module("zstandard") is not None:
+            data = _optional_module("zstandard").ZstdDecompressor().decompressobj().decompress(data)
+        elif encoding == "br" and _optional_module("brotli") is not None:
+            data = _optional_module("brotli").decompress(data)
+        else:
+            raise ValueError(f"不支持的响应编码: {encoding}")
+    return data
+
+
+def read_body(response: requests.Response, trace: Optional[RequestTrace] = None,
+              cancel_token: Optional[CancelToken] = None) -> bytes:
+    """读取并解压响应体
+
+    trace 不为None时记录 download / decompress 阶段耗时，
+    以及传输字节数（wire）和解压后字节数（download）。
+    """
+    start = time.perf_counter()
+    body = read_raw_body(response, cancel_token)
+    downloaded = time.perf_counter()
+    content_encoding = response.headers.get('Content-Encoding', '')
+    wire_bytes = len(body)
+    if content_encoding:
+        body = decompress(body, content_encoding)
+    if trace is not None:
+        trace.add_phase("download", downloaded - start)
+        if content_encoding:
+            trace.add_phase("decompress", time.perf_counter() - downloaded)
+        trace.add_bytes("wire", wire_bytes)
+        trace.add_bytes("download", len(body))
+    if content_encoding:
+        logger.debug(f"响应体 {content_encoding}: {wire_bytes} -> {len(body)} 字节")
+    return body
+
+
+def decode_payload(body: bytes, content_type: str) -> Any:
+    """按 Content-Type 解码JSON或MessagePack数据"""
+    media_type = content_type.split(';')[0].strip().lower()
+    if media_type in MSGPACK_TYPES:
+        msgpack = _optional_module("msgpack")
+        if msgpack is None:
+            raise ValueError("收到MessagePack响应，但未安装msgpack")
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body)
+
+
+def _get_boundary(content_type: str) -> bytes:
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.strip().partition('=')
+        if key.lower() == 'boundary':
+            return value.strip('"').encode('ascii')
+    raise ValueError(f"multipart响应缺少boundary: {content_type}")
+
+
+def parse_multipart(body: bytearray, content_type: str) -> List[Tuple[Dict[str, str], memoryview]]:
+    """解析multipart响应体
+
+    Args:
+        body: 完整响应体
+        content_type: 响应的Content-Type头
+
+    Returns:
+        (小写头部字典, 内容视图) 列表，内容为指向 body 的 memoryview，不复制数据
+    """
+    delimiter = b'--' + _get_boundary(content_type)
+    view = memoryview(body)
+    parts = []
+
+    pos = body.find(delimiter)
+    while pos != -1:
+        pos += len(delimiter)
+        if body[pos:pos + 2] == b'--':
+            break
+        header_end = body.find(b'\r\n\r\n', pos)
+        if header_end == -1:
+            break
+        next_delimiter = body.find(b'\r\n' + delimiter, header_end)
+        if next_delimiter == -1:
+            break
+
+        headers = {}
+        for line in body[pos:header_end].decode('latin-1').split('\r\n'):
+            key, sep, value = line.partition(':')
+            if sep:
+                headers[key.strip().lower()] = value.strip()
+        parts.append((headers, view[header_end + 4:next_delimiter]))
+        pos = next_delimiter + 2
+    return parts
+
+
+def result_from_multipart(body: bytearray, content_type: str) -> Dict[str, Any]:
+    """由multipart响应构造结果字典
+
+    JSON（或MessagePack）部分作为结果主体，图片部分以 image_bytes（bytes-like）放入结果。
+    """
+    result = {}
+    for headers, content in parse_multipart(body, content_type):
+        part_type = headers.get('content-type', '').split(';')[0].strip().lower()
+        if part_type == 'application/json' or part_type in MSGPACK_TYPES:
+            result.update(decode_payload(bytes(content), part_type))
+        elif part_type.startswith('image/'):
+            result["image_bytes"] = content
+            result["image_mime_type"] = part_type
+    return result
+
+
+class TimedUploadBody(io.BytesIO):
+    """记录读取时间点的请求体
+
+    http.client / urllib3 按块读取文件类请求体发送，首次读取时连接已建立，
+    读到末尾时请求体已全部写入套接字，据此区分连接、上传和服务端处理时间。
+    任务取消后下一次读取抛出 RequestCancelled，连接库会中止发送并丢弃该连接。
+    """
+
+    def __init__(self, data: bytes, cancel_token: Optional[CancelToken] = None):
+        super().__init__(data)
+        self.cancel_token = cancel_token
+        self.first_read_at: Optional[float] = None
+        self.sent_at: Optional[float] = None
+
+    def read(self, size: int = -1) -> bytes:
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+        now = time.perf_counter()
+        if self.first_read_at is None:
+            self.first_read_at = now
+        chunk = super().read(size)
+        if not chunk:
+            self.sent_at = now
+        return chunk
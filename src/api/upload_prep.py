@@ -0,0 +1,161 @@
+"""上传预处理模块，在上传前对截图进行缩放和重新编码"""
+
+import io
+import os
+import logging
+from typing import Dict, Any, Optional
+from src.core.roi import restore_result_coordinates
+from src.utils.config_loader import config_loader
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认上传预处理配置
+DEFAULT_UPLOAD_CONFIG = {
+    "enabled": True,
+    "max_width": 1920,
+    "max_height": 1080,
+    "format": "JPEG",
+    "quality": 85
+}
+
+# 编码格式对应的MIME类型和扩展名
+FORMAT_INFO = {
+    "JPEG": ("image/jpeg", ".jpg"),
+    "PNG": ("image/png", ".png"),
+    "WEBP": ("image/webp", ".webp")
+}
+
+
+class PreparedUpload:
+    """预处理后的上传数据"""
+
+    def __init__(self, filename: str, data: bytes, mime_type: str,
+                 original_bytes: int, processed: bool = False,
+                 roi: Optional[tuple] = None, scale: float = 1.0):
+        self.filename = filename
+        self.data = data
+        self.mime_type = mime_type
+        self.original_bytes = original_bytes
+        self.processed = processed
+        # 裁剪区域 (left, top, right, bottom) 及上传图相对裁剪区域的缩放比例，
+        # 用于把结果坐标映射回原图
+        self.roi = roi
+        self.scale = scale
+
+    @property
+    def upload_bytes(self) -> int:
+        """实际上传的字节数"""
+        return len(self.data)
+
+    def as_file_tuple(self) -> tuple:
+        """转换为requests multipart所需的文件元组"""
+        return (self.filename, self.data, self.mime_type)
+
+    def restore_coordinates(self, result: Dict[str, Any]) -> None:
+        """把基于上传图得到的结果坐标（原地）映射回原图空间"""
+        restore_result_coordinates(result, self.roi, self.scale)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取预处理前后的字节数统计"""
+        ratio = self.upload_bytes / self.original_bytes if self.original_bytes else 1.0
+        return {
+            "original_bytes": self.original_bytes,
+            "upload_bytes": self.upload_bytes,
+            "ratio": round(ratio, 4),
+            "processed": self.processed,
+            "roi": list(self.roi) if self.roi else None
+        }
+
+
+class UploadPreparer:
+    """上传预处理器
+
+    按配置的最大分辨率缩放图片，并按配置的格式和质量重新编码。
+    配置项从 config_loader 的 upload_prep 读取。
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, roi_selector=None):
+        self.roi_selector = roi_selector
+        settings = dict(DEFAULT_UPLOAD_CONFIG)
+        settings.update(config if config is not None else config_loader.get('upload_prep', {}))
+        self.enabled = bool(settings["enabled"])
+        self.max_width = int(settings["max_width"])
+        self.max_height = int(settings["max_height"])
+        self.format = str(settings["format"]).upper()
+        self.quality = int(settings["quality"])
+
+        if self.format not in FORMAT_INFO:
+            logger.warning(f"不支持的上传编码格式: {self.format}，使用JPEG")
+            self.format = "JPEG"
+
+    def get_settings(self) -> Dict[str, Any]:
+        """获取当前生效的预处理配置"""
+        return {
+            "enabled": self.enabled,
+            "max_width": self.max_width,
+            "max_height": self.max_height,
+            "format": self.format,
+            "quality": self.quality,
+            "roi": self.roi_selector.get_settings() if self.roi_selector else None
+        }
+
+    def prepare_bytes(self, raw: bytes, filename: str, mime_type: str) -> PreparedUpload:
+        """对内存中的图片数据进行预处理
+
+        Args:
+            raw: 原始图片字节
+            filename: 原始文件名
+            mime_type: 原始MIME类型
+
+        Returns:
+            预处理后的上传数据
+        """
+        original = PreparedUpload(filename, raw, mime_type, len(raw))
+        if not self.enabled and self.roi_selector is None:
+            return original
+
+        try:
+            from PIL import Image
+        except ImportError:
+            logger.warning("未安装Pillow，跳过上传预处理")
+            return original
+
+        try:
+            with Image.open(io.BytesIO(raw)) as image:
+                image.load()
+                # 只保留渔获面板区域
+                roi = self.roi_selector.select(image.width, image.height) if self.roi_selector else None
+                if roi is None and not self.enabled:
+                    return original
+                if roi is not None:
+                    image = image.crop(roi)
+                crop_width = image.width
+
+                if self.enabled and (image.width > self.max_width or image.height > self.max_height):
+                    image.thumbnail((self.max_width, self.max_height), Image.LANCZOS)
+                scale = image.width / crop_width
+
+                if self.format == "JPEG" and image.mode not in ("RGB", "L"):
+                    image = image.convert("RGB")
+
+                buffer = io.BytesIO()
+                save_kwargs = {}
+                if self.format in ("JPEG", "WEBP"):
+                    save_kwargs["quality"] = self.quality
+                if self.format == "PNG":
+                    save_kwargs["optimize"] = True
+                image.save(buffer, format=self.format, **save_kwargs)
+        except Exception as e:
+            logger.warning(f"上传预处理失败，使用原始图片: {e}")
+            return original
+
+        data = buffer.getvalue()
+        if len(data) >= len(raw):
+            logger.debug(f"预处理未减小体积({len(raw)} -> {len(data)} 字节)，使用原始图片")
+            return original
+
+        new_mime, new_ext = FORMAT_INFO[self.format]
+        new_filename = os.path.splitext(filename)[0] + new_ext
+        return PreparedUpload(new_filename, data, new_mime, len(raw), processed=True,
+                              roi=roi, scale=scale)
@@ -0,0 +1,183 @@
+"""命令行批量处理入口，不导入PyQt5，可在无界面的服务器或定时任务中运行
+
+用法:
+    python -m src.cli screenshots/ -o results.jsonl
+    find shots -name '*.png' | python -m src.cli --format csv --workers 8 > results.csv
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+from typing import Dict, Any, Iterable, Iterator, List, Optional, TextIO
+from src.utils.config_loader import config_loader
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认处理的图片扩展名
+DEFAULT_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+# CSV输出列，每条鱼一行（归一化后的鱼种、千克重量、售价和OCR原文鱼种），失败的图片只填路径和错误信息
+CSV_COLUMNS = ["path", "freshness", "fish", "weight_kg", "price", "ocr_fish", "error"]
+
+
+def iter_image_paths(sources: Iterable[str], extensions: Iterable[str]) -> Iterator[str]:
+    """逐个产生待处理的图片路径
+
+    目录按字母顺序递归遍历，只返回指定扩展名的文件；直接给出的文件不做过滤。
+    不预先收集完整列表，输入数量再大内存占用也不变。
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    for source in sources:
+        source = source.strip()
+        if not source:
+            continue
+        if not os.path.isdir(source):
+            yield source
+            continue
+        stack = [source]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = sorted(os.scandir(directory), key=lambda entry: entry.name, reverse=True)
+            except OSError as e:
+                logger.error(f"无法读取目录 {directory}: {e}")
+                continue
+            # 逆序入栈、顺序出栈，使输出保持字母顺序
+            files = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in extensions:
+                    files.append(entry.path)
+            yield from reversed(files)
+
+
+def to_record(path: str, result: Optional[Dict[str, Any]], error: Optional[str]) -> Dict[str, Any]:
+    """构造一条输出记录，不包含结果图片"""
+    record = {"path": path, "ok": error is None}
+    if error is not None:
+        record["error"] = error
+        return record
+    record["fishes"] = result.get("fishes", [])
+    # 结构化字段：标准鱼种名、千克重量和售价
+    from src.core.normalizer import get_normalizer
+    record["catches"] = [catch.to_dict() for catch in get_normalizer().normalize_all(record["fishes"])]
+    for key in ("roi", "metrics"):
+        if key in result:
+            record[key] = result[key]
+    return record
+
+
+class JsonlWriter:
+    """每张图片一行JSON"""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+
+class CsvWriter:
+    """每条鱼一行CSV"""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.writer = csv.writer(stream)
+        self.writer.writerow(CSV_COLUMNS)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if not record["ok"]:
+            self.writer.writerow([record["path"], "", "", "", "", "", record["error"]])
+        for catch in record.get("catches", []):
+            self.writer.writerow([record["path"], catch["freshness"] or "", catch["species"],
+                                  "" if catch["weight"] is None else catch["weight"],
+                                  "" if catch["price"] is None else catch["price"],
+                                  catch["species_raw"], ""])
+        self.stream.flush()
+
+
+def create_backend(name: str, workers: int):
+    """创建处理后端，只在此时导入相应模块"""
+    if name == "local":
+        from src.core.local_backend import LocalInferenceBackend
+        return LocalInferenceBackend(workers)
+    from src.api.client import RF4APIClient
+    return RF4APIClient()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="俄罗斯钓鱼4助手 - 命令行批量处理截图")
+    parser.add_argument("paths", nargs="*",
+                        help="图片文件或目录；省略或为 - 时从标准输入逐行读取路径")
+    parser.add_argument("-o", "--output", help="输出文件，默认写到标准输出")
+    parser.add_argument("-f", "--format", choices=["jsonl", "csv"], default="jsonl", help="输出格式")
+    parser.add_argument("-w", "--workers", type=int,
+                        help="并发数，默认读取配置 batch.max_workers")
+    parser.add_argument("-b", "--backend", choices=["remote", "local"],
+                        help="处理后端，默认读取配置 processing_backend")
+    parser.add_argument("--ext", nargs="+",
+                        help="遍历目录时处理的扩展名，默认读取配置 watch.extensions")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出详细日志")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    # 日志写到标准错误，标准输出只包含结果
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        stream=sys.stderr
+    )
+
+    workers = args.workers or config_loader.get('batch', {}).get('max_workers', 4)
+    workers = max(1, int(workers))
+    backend_name = args.backend or config_loader.get('processing_backend', 'remote')
+    extensions = args.ext or config_loader.get('watch', {}).get('extensions', DEFAULT_EXTENSIONS)
+
+    if not args.paths or args.paths == ["-"]:
+        sources = (line.rstrip("\n") for line in sys.stdin)
+    else:
+        sources = args.paths
+    image_paths = iter_image_paths(sources, extensions)
+
+    stream = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    writer = CsvWriter(stream) if args.format == "csv" else JsonlWriter(stream)
+    backend = create_backend(backend_name, workers)
+
+    done = failed = 0
+    start = time.perf_counter()
+    try:
+        for path, result, error in backend.process_images(image_paths, workers):
+            writer.write(to_record(path, result, error))
+            done += 1
+            if error is not None:
+                failed += 1
+                logger.warning(f"处理失败 {path}: {error}")
+    except KeyboardInterrupt:
+        logger.warning("已中断")
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+        if backend_name == "local":
+            backend.shutdown()
+        from src.utils.metrics import MetricsRegistry
+        MetricsRegistry().export()
+
+    elapsed = time.perf_counter() - start
+    print(f"已处理 {done} 张，失败 {failed} 张，耗时 {elapsed:.1f} 秒"
+          f"（{done / elapsed if elapsed > 0 else 0.0:.2f} 张/秒）", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
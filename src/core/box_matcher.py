@@ -0,0 +1,110 @@
+"""OCR文字框与鱼卡框的匹配模块，使用网格索引代替逐对比较"""
+
+from collections import defaultdict
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# (left, top, width, height)
+Rect = Tuple[float, float, float, float]
+
+
+def location_to_rect(location: Dict[str, float]) -> Rect:
+    """将结果中的location字典转为矩形元组"""
+    return (location['left'], location['top'], location['width'], location['height'])
+
+
+def rects_intersect(a: Rect, b: Rect) -> bool:
+    """判断两个闭区间矩形是否相交（边界相接也算相交）"""
+    return (a[0] <= b[0] + b[2] and b[0] <= a[0] + a[2]
+            and a[1] <= b[1] + b[3] and b[1] <= a[1] + a[3])
+
+
+class CardGridIndex:
+    """鱼卡矩形的均匀网格索引
+
+    每个鱼卡登记到它覆盖的所有网格单元中，查询时只检查文字框覆盖的单元，
+    候选结果按鱼卡序号升序返回，保证与顺序遍历时"第一个重叠的鱼卡"一致。
+    """
+
+    def __init__(self, rects: Sequence[Rect], cell_size: float = 0):
+        self.rects = list(rects)
+        if cell_size <= 0:
+            # 以鱼卡平均尺寸作为网格大小，单个鱼卡通常只占少量单元
+            if self.rects:
+                cell_size = sum(max(r[2], r[3]) for r in self.rects) / len(self.rects)
+            cell_size = max(cell_size, 1.0)
+        self.cell_size = cell_size
+        self._cells = defaultdict(list)
+        for index, rect in enumerate(self.rects):
+            for cell in self._cells_for(rect):
+                self._cells[cell].append(index)
+
+    def _cells_for(self, rect: Rect):
+        size = self.cell_size
+        x0, y0 = int(rect[0] // size), int(rect[1] // size)
+        x1, y1 = int((rect[0] + rect[2]) // size), int((rect[1] + rect[3]) // size)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                yield (cx, cy)
+
+    def candidates(self, rect: Rect) -> List[int]:
+        """返回与给定矩形相交的鱼卡序号（升序）"""
+        found = set()
+        for cell in self._cells_for(rect):
+            found.update(self._cells.get(cell, ()))
+        return sorted(i for i in found if rects_intersect(rect, self.rects[i]))
+
+
+def match_words_to_cards(words_cards: List[Dict], fish_cards: Sequence,
+                         card_rects: Sequence[Rect],
+                         is_overlapping: Callable = None) -> List[List[str]]:
+    """为每个OCR文字框分配所属鱼卡，并在同一遍中按鱼卡分组
+
+    Args:
+        words_cards: OCR结果项列表，需包含 location、words 和 BoundingBox
+        fish_cards: 鱼卡BoundingBox列表
+        card_rects: 与 fish_cards 一一对应的矩形
+        is_overlapping: 精确重叠判断，默认调用 BoundingBox.is_overlapping；
+            该判断为真时两矩形必然相交，网格索引只用于缩小候选范围
+
+    Returns:
+        按鱼卡顺序排列的文字分组，跳过没有有效文字的鱼卡
+    """
+    if is_overlapping is None:
+        is_overlapping = lambda word_box, card_box: word_box.is_overlapping(card_box)
+
+    index = CardGridIndex(card_rects)
+    groups = [[] for _ in fish_cards]
+    for word_card in words_cards:
+        rect = location_to_rect(word_card['location'])
+        for j in index.candidates(rect):
+            if is_overlapping(word_card['BoundingBox'], fish_cards[j]):
+                word_card['fish_card_index'] = j
+                if len(word_card['words']) >= 2:
+                    groups[j].append(word_card['words'])
+                break
+    return [group for group in groups if group]
+
+
+def match_words_to_cards_naive(words_cards: List[Dict], fish_cards: Sequence,
+                               is_overlapping: Callable = None) -> List[List[str]]:
+    """逐对比较的参考实现，用于回归对比"""
+    if is_overlapping is None:
+        is_overlapping = lambda word_box, card_box: word_box.is_overlapping(card_box)
+
+    for word_card in words_cards:
+        for j, fish_card in enumerate(fish_cards):
+            if is_overlapping(word_card['BoundingBox'], fish_card):
+                word_card['fish_card_index'] = j
+                break
+
+    fishes = []
+    for i in range(len(fish_cards)):
+        fish = []
+        for word_card in words_cards:
+            if len(word_card['words']) < 2:
+                continue
+            if word_card.get('fish_card_index', None) == i:
+                fish.append(word_card['words'])
+        if len(fish) > 0:
+            fishes.append(fish)
+    return fishes
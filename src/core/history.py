@@ -0,0 +1,235 @@
+"""渔获历史记录模块，使用SQLite持久化每次识别的结果并提供汇总查询"""
+
+import os
+import time
+import queue
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Sequence
+from src.utils.config_loader import config_loader
+from src.core.normalizer import get_normalizer
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catches (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    image_hash TEXT,
+    image_path TEXT,
+    created_at REAL NOT NULL,
+    freshness TEXT,
+    species TEXT,
+    weight REAL,
+    price REAL
+);
+CREATE INDEX IF NOT EXISTS idx_catches_species ON catches(species, weight, price);
+CREATE INDEX IF NOT EXISTS idx_catches_created_at ON catches(created_at);
+CREATE INDEX IF NOT EXISTS idx_catches_image_hash ON catches(image_hash);
+CREATE INDEX IF NOT EXISTS idx_catches_session ON catches(session_id, created_at, price);
+CREATE INDEX IF NOT EXISTS idx_catches_weight ON catches(weight);
+CREATE INDEX IF NOT EXISTS idx_catches_price ON catches(price);
+"""
+
+_INSERT = """
+INSERT INTO catches (session_id, image_hash, image_path, created_at, freshness, species, weight, price)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def hash_file(path: str) -> Optional[str]:
+    """计算图片文件的SHA-256，文件不可读时返回None"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class CatchHistory:
+    """渔获历史数据库
+
+    数据库位于配置目录下，使用WAL模式以便写入时仍可并发读取。
+    每个线程使用独立的连接。
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.path.join(config_loader.config_dir, 'catch_history.db')
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add_catches(self, session_id: str, fishes: Sequence[Sequence[str]],
+                    image_path: Optional[str] = None, image_hash: Optional[str] = None,
+                    created_at: Optional[float] = None) -> int:
+        """批量写入一张截图的渔获记录
+
+        Args:
+            session_id: 会话ID
+            fishes: 渔获列表，每条为 [新鲜度, 鱼类名称, 重量, 售价] 的OCR文本
+            image_path: 来源图片路径
+            image_hash: 来源图片哈希
+            created_at: 记录时间戳，默认当前时间
+
+        Returns:
+            写入的记录数
+        """
+        return self.add_catches_batch([(session_id, fishes, image_path, image_hash, created_at)])
+
+    def add_catches_batch(self, entries: Sequence[tuple]) -> int:
+        """在一个事务中写入多张截图的渔获记录
+
+        同一张截图（图片哈希相同）只记录一次：缓存命中、近似重复复用、重复打开或
+        同时被监控和手动打开的截图不会重复计入汇总。没有哈希的记录无法判断，照常写入。
+
+        Args:
+            entries: (会话ID, 渔获列表, 图片路径, 图片哈希, 时间戳) 元组序列
+
+        Returns:
+            写入的记录数
+        """
+        normalizer = get_normalizer()
+        conn = self._connect()
+        with conn:
+            # 立即取得写锁，检查和写入之间不会有其他连接插入同一张截图
+            conn.execute("BEGIN IMMEDIATE")
+            rows = []
+            seen = set()
+            for session_id, fishes, image_path, image_hash, created_at in entries:
+                if image_hash is not None:
+                    if image_hash in seen or self.has_image(image_hash):
+                        logger.debug(f"截图已记录过，跳过: {image_path}")
+                        continue
+                    seen.add(image_hash)
+                created_at = created_at or time.time()
+                # 鱼种归一化为标准名，重量统一为千克，按鱼种汇总时不会因OCR误差分散
+                for record in normalizer.normalize_all(fishes):
+                    rows.append((session_id, image_hash, image_path, created_at, record.freshness,
+                                 record.species, record.weight, record.price))
+            if rows:
+                conn.executemany(_INSERT, rows)
+        return len(rows)
+
+    def species_totals(self, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """按鱼种汇总条数、总重量和总售价"""
+        sql = "SELECT species, COUNT(*), SUM(weight), SUM(price) FROM catches"
+        params = ()
+        if since is not None:
+            sql += " WHERE created_at >= ?"
+            params = (since,)
+        sql += " GROUP BY species ORDER BY SUM(price) DESC"
+        return [
+            {"species": row[0], "count": row[1], "total_weight": row[2] or 0.0, "total_price": row[3] or 0.0}
+            for row in self._connect().execute(sql, params)
+        ]
+
+    def session_revenue(self) -> List[Dict[str, Any]]:
+        """按会话汇总收入"""
+        sql = """
+            SELECT session_id, COUNT(*), SUM(price), MIN(created_at), MAX(created_at)
+            FROM catches GROUP BY session_id ORDER BY MIN(created_at)
+        """
+        return [
+            {"session_id": row[0], "count": row[1], "revenue": row[2] or 0.0,
+             "started_at": row[3], "ended_at": row[4]}
+            for row in self._connect().execute(sql)
+        ]
+
+    def top_catches(self, n: int = 10, by: str = "weight",
+                    species: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按重量或售价返回前N条渔获"""
+        if by not in ("weight", "price"):
+            raise ValueError(f"不支持的排序字段: {by}")
+        sql = "SELECT created_at, freshness, species, weight, price, image_path FROM catches"
+        params = []
+        if species is not None:
+            sql += " WHERE species = ?"
+            params.append(species)
+        sql += f" ORDER BY {by} DESC LIMIT ?"
+        params.append(n)
+        return [
+            {"created_at": row[0], "freshness": row[1], "species": row[2],
+             "weight": row[3], "price": row[4], "image_path": row[5]}
+            for row in self._connect().execute(sql, params)
+        ]
+
+    def has_image(self, image_hash: str) -> bool:
+        """判断某张截图是否已经记录过"""
+        row = self._connect().execute(
+            "SELECT 1 FROM catches WHERE image_hash = ? LIMIT 1", (image_hash,)
+        ).fetchone()
+        return row is not None
+
+
+class HistoryWriter:
+    """后台历史写入器
+
+    GUI线程只把记录放入队列，由后台线程计算图片哈希并批量写入数据库，
+    不会在GUI线程上等待磁盘。
+    """
+
+    def __init__(self, session_id: str, history: Optional[CatchHistory] = None,
+                 batch_size: int = 200, flush_interval: float = 0.5):
+        self.session_id = session_id
+        self._history = history
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="rf4-history-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, image_path: Optional[str], fishes: Sequence[Sequence[str]]) -> None:
+        """提交一张截图的渔获记录"""
+        if fishes:
+            self._queue.put((image_path, list(fishes), time.time()))
+
+    def close(self) -> None:
+        """写入剩余记录并停止后台线程"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        history = self._history or CatchHistory()
+        stopping = False
+        while not stopping:
+            items = [self._queue.get()]
+            # 在短时间内尽量收集更多记录，合并为一个事务写入
+            deadline = time.monotonic() + self.flush_interval
+            while len(items) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if None in items:
+                stopping = True
+                items = [item for item in items if item is not None]
+            try:
+                self._write(history, items)
+            except Exception as e:
+                logger.error(f"写入渔获历史失败: {e}")
+
+    def _write(self, history: CatchHistory, items) -> None:
+        entries = [
+            (self.session_id, fishes, image_path, hash_file(image_path) if image_path else None, created_at)
+            for image_path, fishes, created_at in items
+        ]
+        history.add_catches_batch(entries)
@@ -0,0 +1,137 @@
+"""图像缓冲区模块，截图只解码一次，各处理阶段共享同一块像素内存"""
+
+import io
+import os
+import time
+import tempfile
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# (left, top, right, bottom)
+Box = Tuple[int, int, int, int]
+
+
+class ImageBuffer:
+    """解码后的RGB像素（H×W×3 uint8 的NumPy数组）
+
+    region() 返回原数组的切片视图，不复制像素；跨进程传递时通过 share()
+    放入共享内存，子进程按名称挂载同一块内存，同样不复制。
+    """
+
+    def __init__(self, array, source: Optional[str] = None):
+        self.array = array
+        # 解码来源的文件路径，只接受路径的处理函数可直接使用
+        self.source = source
+
+    @classmethod
+    def from_path(cls, image_path: str) -> "ImageBuffer":
+        """读取并解码图片文件"""
+        with open(image_path, 'rb') as f:
+            return cls.from_bytes(f.read(), image_path)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, source: Optional[str] = None) -> "ImageBuffer":
+        """解码内存中的图片"""
+        import numpy as np
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as image:
+            rgb = image.convert("RGB") if image.mode != "RGB" else image
+            return cls(np.asarray(rgb), source)
+
+    @property
+    def width(self) -> int:
+        return self.array.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.array.shape[0]
+
+    def region(self, box: Box) -> "ImageBuffer":
+        """裁剪区域的视图，视图不再对应源文件"""
+        left, top, right, bottom = box
+        return ImageBuffer(self.array[top:bottom, left:right])
+
+    def to_pil(self):
+        """转换为PIL图像（复制像素，可在其上绘制）"""
+        import numpy as np
+        from PIL import Image
+        return Image.fromarray(np.ascontiguousarray(self.array)).copy()
+
+    def encode(self, format: str = "PNG", **params) -> bytes:
+        """编码为图片字节"""
+        output = io.BytesIO()
+        self.to_pil().save(output, format=format, **params)
+        return output.getvalue()
+
+    def to_temp_file(self, suffix: str = ".png") -> str:
+        """写入唯一的临时文件并返回路径，供只接受文件路径的处理函数使用，调用方负责删除"""
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix="rf4-")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.encode("PNG", compress_level=1))
+        return path
+
+    @contextmanager
+    def share(self):
+        """把像素复制到共享内存，with 块内返回可传给子进程的 SharedImage，退出时释放"""
+        import numpy as np
+        from multiprocessing import shared_memory
+        array = np.ascontiguousarray(self.array)
+        memory = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        try:
+            np.ndarray(array.shape, array.dtype, buffer=memory.buf)[...] = array
+            yield SharedImage(memory.name, array.shape, array.dtype.str)
+        finally:
+            memory.close()
+            memory.unlink()
+
+
+class SharedImage:
+    """共享内存中图像的句柄，可序列化后传给子进程"""
+
+    def __init__(self, name: str, shape: Tuple[int, ...], dtype: str, box: Optional[Box] = None):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+        self.box = box
+
+    def region(self, box: Box) -> "SharedImage":
+        """同一块共享内存中裁剪区域的句柄"""
+        return SharedImage(self.name, self.shape, self.dtype, box)
+
+    @contextmanager
+    def attach(self):
+        """在当前进程中挂载共享内存，with 块内返回数组视图"""
+        import numpy as np
+        from multiprocessing import shared_memory
+        # 进程池的子进程与创建方共用资源跟踪器，共享内存只由创建方释放
+        memory = shared_memory.SharedMemory(name=self.name)
+        try:
+            array = np.ndarray(self.shape, np.dtype(self.dtype), buffer=memory.buf)
+            if self.box is not None:
+                left, top, right, bottom = self.box
+                array = array[top:bottom, left:right]
+            yield array
+            del array
+        finally:
+            memory.close()
+
+
+# 处理阶段的输入：数组视图、共享内存句柄或图片文件路径
+StageInput = Union[Any, SharedImage, str]
+
+
+def run_stage(func: Callable[[Any], Dict[str, Any]], image: StageInput) -> Tuple[Dict[str, Any], float]:
+    """执行检测或OCR阶段，返回 (结果, 耗时秒数)，可在子进程中调用"""
+    start = time.perf_counter()
+    if isinstance(image, SharedImage):
+        with image.attach() as array:
+            result = func(array)
+            # 释放引用后共享内存才能关闭
+            del array
+    else:
+        result = func(image)
+    return result, time.perf_counter() - start
@@ -1,6 +1,15 @@
+import io
 import os
 import sys
 import json
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from src.core.box_matcher import location_to_rect, match_words_to_cards
+from src.core.image_buffer import ImageBuffer, run_stage
+from src.core.roi import RoiSelector, restore_result_coordinates
+from src.core.tiling import OcrTiler
+from src.utils.config_loader import config_loader
 
 # 获取项目根目录路径
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
@@ -16,39 +25,171 @@ try:
 except ImportError as e:
     print(f"导入后端模块失败: {e}")
     # 如果导入失败，可以创建模拟函数进行测试
-    def get_fish_cards_result(image_path):
+    def get_fish_cards_result(image):
         return {"mock": "data"}
     
     def convert_yolo_to_standard(data):
         return {"result": []}
     
-    def get_ocr_result(image_path):
+    def get_ocr_result(image):
         return {"words_result": []}
 
+# 叠加图中鱼卡框和文字框的颜色
+CARD_COLOR = (0, 200, 0)
+WORD_COLOR = (230, 40, 40)
+
 
 class ImageProcessor:
-    def __init__(self):
-        self.temp_dir = os.path.join(project_root, "temp")
-        os.makedirs(self.temp_dir, exist_ok=True)
+    """本地图像处理流程
+    
+    截图只解码一次为 ImageBuffer，ROI裁剪和分块均为同一块像素的视图，
+    检测和OCR直接接收数组（进程池模式下经共享内存传递），不再写临时文件。
+    结果叠加图在内存中绘制并编码，只有指定 overlay_path 时才写入磁盘。
+    检测/OCR模块只接受文件路径时可将 local_pipeline.stage_input 设为 "path"，
+    此时每次调用写入唯一的临时文件，并发处理互不影响。
+    """
+    
+    def __init__(self, executor_type=None, tiler=None):
+        # 检测与OCR的并行方式: thread / process / serial
+        pipeline_config = config_loader.get('local_pipeline', {})
+        self.executor_type = executor_type or pipeline_config.get('executor', 'thread')
+        # 传给检测和OCR的输入: array / path
+        self.stage_input = pipeline_config.get('stage_input', 'array')
+        # 是否绘制结果叠加图
+        self.render_overlay = bool(pipeline_config.get('render_overlay', True))
+        self._executor = None
+        self.roi_selector = RoiSelector()
+        # 超宽/高分辨率截图的分块OCR
+        self.tiler = tiler or OcrTiler()
+    
+    def _get_executor(self):
+        """按配置创建（或复用）用于并行执行检测和OCR的执行器"""
+        if self._executor is None:
+            if self.executor_type == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=2)
+            elif self.executor_type == 'thread':
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rf4-pipeline")
+        return self._executor
+    
+    def close(self):
+        """关闭执行器"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.tiler.close()
+    
+    @contextmanager
+    def _stage_input(self, buffer):
+        """按配置把图像转换为检测/OCR的输入，with 块结束后释放共享内存或临时文件"""
+        if self.stage_input == 'path':
+            if buffer.source is not None:
+                # 未裁剪的原图直接使用源文件
+                yield buffer.source
+                return
+            path = buffer.to_temp_file()
+            try:
+                yield path
+            finally:
+                os.remove(path)
+        elif self.executor_type == 'process':
+            with buffer.share() as shared:
+                yield shared
+        else:
+            yield buffer.array
+    
+    def _run_detection_and_ocr(self, buffer):
+        """并行执行目标检测和OCR，两者都完成后返回结果和各自耗时
+        
+        超大截图的OCR按图块在分块执行器中并行识别，检测仍对整图进行（检测模型自身会缩放输入）；
+        检测完成后，跨图块接缝的鱼卡再整块识别一次，保证字段顺序与整图OCR一致。
+        """
+        executor = self._get_executor()
+        tiles = self.tiler.plan(buffer.width, buffer.height)
+        with self._stage_input(buffer) as image:
+            if tiles is not None:
+                detection_future = executor.submit(run_stage, get_fish_cards_result, image) \
+                    if executor is not None else None
+                start = time.perf_counter()
+                ocr_result = self.tiler.run(buffer, tiles, get_ocr_result, self.stage_input)
+                ocr_elapsed = time.perf_counter() - start
+                detection = detection_future.result() if detection_future is not None \
+                    else run_stage(get_fish_cards_result, image)
+                start = time.perf_counter()
+                card_rects = [location_to_rect(item['location'])
+                              for item in convert_yolo_to_standard(detection[0])['result']]
+                ocr_result = self.tiler.refine_cards(buffer, tiles, ocr_result, card_rects,
+                                                     get_ocr_result, self.stage_input)
+                return detection, (ocr_result, ocr_elapsed + time.perf_counter() - start)
+            
+            if executor is None:
+                return run_stage(get_fish_cards_result, image), run_stage(get_ocr_result, image)
+            
+            detection_future = executor.submit(run_stage, get_fish_cards_result, image)
+            ocr_future = executor.submit(run_stage, get_ocr_result, image)
+            return detection_future.result(), ocr_future.result()
     
-    def process(self, image_path):
-        """处理图像并返回结果"""
+    def _draw_overlay(self, buffer, card_rects, words_cards):
+        """在原图副本上绘制鱼卡框和文字框，返回PNG字节"""
+        from PIL import ImageDraw
+        image = buffer.to_pil()
+        draw = ImageDraw.Draw(image)
+        for left, top, width, height in card_rects:
+            draw.rectangle([left, top, left + width, top + height], outline=CARD_COLOR, width=3)
+        for item in words_cards:
+            left, top, width, height = location_to_rect(item['location'])
+            draw.rectangle([left, top, left + width, top + height], outline=WORD_COLOR, width=1)
+        output = io.BytesIO()
+        image.save(output, format="PNG", compress_level=1)
+        return output.getvalue()
+    
+    def process(self, image, overlay_path=None):
+        """处理图像并返回结果
+        
+        Args:
+            image: 图像文件路径、图片字节或已解码的 ImageBuffer
+            overlay_path: 叠加图的保存路径，默认只在结果中返回图片字节
+        """
         try:
-            # 1. 调用目标检测
-            fish_cards_result = get_fish_cards_result(image_path)
+            timings = {}
+            start = time.perf_counter()
+            
+            # 只解码一次，之后各阶段共用
+            if isinstance(image, ImageBuffer):
+                buffer = image
+            elif isinstance(image, (bytes, bytearray, memoryview)):
+                buffer = ImageBuffer.from_bytes(bytes(image))
+            else:
+                buffer = ImageBuffer.from_path(image)
+            timings["decode"] = time.perf_counter() - start
+            
+            # 0. 只保留渔获面板区域（视图，不复制像素）
+            roi_start = time.perf_counter()
+            roi = self.roi_selector.select(buffer.width, buffer.height)
+            work = buffer.region(roi) if roi is not None else buffer
+            timings["roi"] = time.perf_counter() - roi_start
             
+            # 1+4. 目标检测与OCR相互独立，并行执行
+            detect_start = time.perf_counter()
+            (fish_cards_result, timings["detection"]), (ocr_result, timings["ocr"]) = \
+                self._run_detection_and_ocr(work)
+            timings["detection_ocr_wall"] = time.perf_counter() - detect_start
+            
+            match_start = time.perf_counter()
             # 2. 转换格式
             standard_results = convert_yolo_to_standard(fish_cards_result)
             
+            # 坐标映射回原图空间（仅平移，不影响匹配结果）
+            restore_result_coordinates(standard_results, roi)
+            restore_result_coordinates(ocr_result, roi)
+            
             # 3. 转为BoundingBox列表
             fish_cards = []
+            card_rects = []
             for item in standard_results['result']:
                 location = item['location']
                 left, top, width, height = location['left'], location['top'], location['width'], location['height']
                 fish_cards.append(BoundingBox(left, top, width, height, False))
-            
-            # 4. OCR识别
-            ocr_result = get_ocr_result(image_path)
+                card_rects.append(location_to_rect(location))
             
             # 5. 解析OCR结果
             words_cards = []
@@ -58,35 +199,31 @@ class ImageProcessor:
                 item['BoundingBox'] = BoundingBox(left, top, width, height, False, item['words'])
                 words_cards.append(item)
             
-            # 6-7. 匹配并整理鱼类信息
-            for i, word_card in enumerate(words_cards):
-                for j, fish_card in enumerate(fish_cards):
-                    if word_card['BoundingBox'].is_overlapping(fish_card):
-                        words_cards[i]['fish_card_index'] = j
-                        break
-            
-            fishes = []
-            for i in range(len(fish_cards)):
-                fish = []
-                for word_card in words_cards:
-                    if len(word_card['words']) < 2:
-                        continue
-                    fish_card_index = word_card.get('fish_card_index', None)
-                    if fish_card_index is not None and fish_card_index == i:
-                        fish.append(word_card['words'])
-                if len(fish) > 0:
-                    fishes.append(fish)
+            # 6-7. 匹配并整理鱼类信息（网格索引，一遍完成分配和分组）
+            fishes = match_words_to_cards(words_cards, fish_cards, card_rects)
+            timings["matching"] = time.perf_counter() - match_start
             
-            # 保存处理后的图片
-            result_image_path = os.path.join(self.temp_dir, "processed_image.png")
+            # 叠加图保留在内存中，指定路径时才写入文件
+            image_bytes = None
+            if self.render_overlay or overlay_path:
+                overlay_start = time.perf_counter()
+                image_bytes = self._draw_overlay(buffer, card_rects, words_cards)
+                if overlay_path:
+                    with open(overlay_path, 'wb') as f:
+                        f.write(image_bytes)
+                timings["overlay"] = time.perf_counter() - overlay_start
             
-            # 省略绘制边界框的步骤，具体项目中可以添加
-            
-            return {
+            timings["total"] = time.perf_counter() - start
+            result = {
                 "success": True,
                 "fishes": fishes,
-                "result_image": result_image_path
+                "timings": timings
             }
+            if image_bytes is not None and self.render_overlay:
+                result["image_bytes"] = image_bytes
+            if roi is not None:
+                result["roi"] = list(roi)
+            return result
             
         except Exception as e:
             print(f"处理图像时出错: {e}")
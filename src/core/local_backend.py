@@ -0,0 +1,176 @@
+"""本地推理后端模块，在常驻进程池中运行ImageProcessor"""
+
+import os
+import logging
+import threading
+from typing import Dict, Any, Optional, Iterable, Iterator, Tuple
+from concurrent.futures import wait
+from src.api.exceptions import APIException
+from src.api.cancellation import CancelToken
+from src.utils.config_loader import config_loader
+from src.utils.helpers import iter_bounded
+from src.utils.metrics import MetricsRegistry, RequestTrace
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 工作进程内常驻的图像处理器
+_worker_processor = None
+
+
+def _init_worker():
+    """工作进程初始化：导入检测/OCR模块并创建处理器，之后的任务复用
+
+    工作进程本身已由进程池管理，处理器内部的检测/OCR并行和分块OCR改用线程，
+    避免在每个工作进程中再创建嵌套的进程池。
+    """
+    global _worker_processor
+    from src.core.image_processor import ImageProcessor
+    from src.core.tiling import OcrTiler, DEFAULT_TILING_CONFIG
+    pipeline_config = config_loader.get('local_pipeline', {})
+    executor_type = pipeline_config.get('executor', 'thread')
+    tiling_config = dict(DEFAULT_TILING_CONFIG)
+    tiling_config.update(config_loader.get('tiling', {}))
+    if tiling_config["executor"] == 'process':
+        tiling_config["executor"] = 'thread'
+    _worker_processor = ImageProcessor('thread' if executor_type == 'process' else executor_type,
+                                       OcrTiler(tiling_config))
+
+
+def _warm_up():
+    """空任务，用于确保工作进程已启动并完成初始化"""
+    return os.getpid()
+
+
+def _process_in_worker(image_path: str) -> Dict[str, Any]:
+    """在工作进程中处理图像"""
+    return _worker_processor.process(image_path)
+
+
+def to_api_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """将ImageProcessor的结果转换为与 RF4APIClient.process_image 相同的结构"""
+    if not result.get("success"):
+        raise APIException(f"本地处理失败: {result.get('error', '未知错误')}")
+
+    api_result = {"fishes": result.get("fishes", [])}
+    for key in ("timings", "roi"):
+        if key in result:
+            api_result[key] = result[key]
+    # 工作进程内的阶段耗时记录到主进程的指标中
+    timings = dict(result.get("timings", {}))
+    trace = RequestTrace("local.process_image")
+    total = timings.pop("total", None)
+    for phase, seconds in timings.items():
+        trace.add_phase(phase, seconds)
+    if "image_bytes" in result:
+        # 叠加图在工作进程内存中编码，直接传递字节，无需Base64编码或临时文件
+        api_result["image_bytes"] = result["image_bytes"]
+    MetricsRegistry().record(trace.finish(total=total))
+    api_result["metrics"] = trace.to_dict()
+    return api_result
+
+
+class LocalInferenceBackend:
+    """本地推理后端
+
+    使用常驻进程池运行 ImageProcessor，每个工作进程只加载一次检测和OCR模块，
+    在多张图片之间保持预热状态。接口与 RF4APIClient 一致。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        if max_workers is None:
+            max_workers = config_loader.get('local_pipeline', {}).get('workers', 1)
+        self.max_workers = max(1, int(max_workers))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """启动进程池并预热所有工作进程"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            # 进程池相关模块较重，仅在启用本地推理时导入
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+            warm_ups = [executor.submit(_warm_up) for _ in range(self.max_workers)]
+            for future in warm_ups:
+                future.result()
+            self._executor = executor
+            logger.info(f"本地推理进程池已启动，工作进程数: {self.max_workers}")
+
+    def start_in_background(self) -> None:
+        """在后台线程中启动进程池，避免阻塞GUI线程"""
+        threading.Thread(target=self.start, name="rf4-local-warmup", daemon=True).start()
+
+    def shutdown(self) -> None:
+        """关闭进程池"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def process_image(self, image_path: str, cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """处理图像识别鱼类
+
+        Args:
+            image_path: 图像文件路径
+            cancel_token: 取消标记，尚未开始的任务会从进程池队列中撤回，
+                已经开始的任务在工作进程中完成，但结果被丢弃
+
+        Returns:
+            包含处理结果的字典，结构与 RF4APIClient.process_image 相同
+        """
+        self.start()
+        future = self._executor.submit(_process_in_worker, image_path)
+        if cancel_token is None:
+            return to_api_result(future.result())
+        cancel_token.add_callback(future.cancel)
+        while True:
+            cancel_token.raise_if_cancelled()
+            done, _ = wait([future], timeout=0.1)
+            if done:
+                cancel_token.raise_if_cancelled()
+                return to_api_result(future.result())
+
+    def process_images(self, image_paths: Iterable[str], max_workers: Optional[int] = None,
+                       cancel_token: Optional[CancelToken] = None) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+        """批量处理图像，按完成顺序逐个返回 (图像路径, 处理结果, 错误信息)
+
+        max_workers 仅为与 RF4APIClient 保持接口一致，并发数由进程池大小决定；
+        cancel_token 取消后不再提交新的图片
+        """
+        self.start()
+        for path, result, error in iter_bounded(self._executor, _process_in_worker, image_paths,
+                                                self.max_workers * 2):
+            if cancel_token is not None and cancel_token.cancelled:
+                return
+            if error is not None:
+                yield path, None, error.message if isinstance(error, APIException) else str(error)
+                continue
+            try:
+                yield path, to_api_result(result), None
+            except APIException as e:
+                yield path, None, e.message
+
+
+_local_backend = None
+
+
+def get_local_backend() -> Optional[LocalInferenceBackend]:
+    """配置为本地推理时返回本地后端实例，否则返回None"""
+    global _local_backend
+    if config_loader.get('processing_backend', 'remote') != 'local':
+        return None
+    if _local_backend is None:
+        _local_backend = LocalInferenceBackend()
+    return _local_backend
+
+
+def get_processing_backend():
+    """按配置 processing_backend 返回图像处理后端（remote 或 local）"""
+    local_backend = get_local_backend()
+    if local_backend is not None:
+        return local_backend
+
+    from src.api.client import get_rf4_api
+    return get_rf4_api()
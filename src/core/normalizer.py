@@ -0,0 +1,327 @@
+"""渔获文本归一化模块，把OCR识别的鱼种名称模糊匹配到标准鱼种词典，并解析新鲜度、重量和售价"""
+
+import os
+import re
+import json
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+from src.utils.config_loader import config_loader
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认归一化配置：species 为标准鱼种列表或 {标准名: [别名, ...]}，
+# dictionary_file 为同格式的JSON词典文件，随程序附带的词典和配置目录下的同名文件都会读取；
+# 编辑距离不超过 max_distance 且不超过名称长度的 max_ratio 时视为匹配，
+# 两个字以上的名称至少允许一个字的误差
+DEFAULT_NORMALIZER_CONFIG = {
+    "species": [],
+    "dictionary_file": "fish_dictionary.json",
+    "freshness": ["新鲜", "不新鲜"],
+    "max_distance": 2,
+    "max_ratio": 0.34,
+    "cache_size": 4096
+}
+
+# OCR常把西里尔字母识别为形近的拉丁字母，统一到西里尔字母后再比较
+_HOMOGLYPHS = str.maketrans({
+    "a": "а", "b": "в", "c": "с", "e": "е", "h": "н", "k": "к", "m": "м",
+    "o": "о", "p": "р", "r": "г", "t": "т", "x": "х", "y": "у"
+})
+_NOISE_PATTERN = re.compile(r"[\W_]+", re.UNICODE)
+# 数值，允许空格作千位分隔（NFKC后不换行空格也是普通空格）、逗号作小数点
+_NUMBER_PATTERN = re.compile(r"\d{1,3}(?: \d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?")
+# 数值后的重量单位（含OCR常见误识别）
+_WEIGHT_PATTERN = re.compile(r"(\d[\d ]*(?:[.,]\d+)?)\s*(кг|kg|kr|公斤|千克|г|g|r|克)(?![a-zа-я])",
+                             re.IGNORECASE)
+_GRAM_UNITS = {"г", "g", "r", "克"}
+# 随程序附带的配置目录，与默认配置文件在同一位置
+_BUNDLED_CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config')
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """比较用的规范形式：全半角统一、小写、去掉空白和标点，拉丁形近字母转为西里尔字母"""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = _NOISE_PATTERN.sub("", text)
+    if any("Ѐ" <= ch <= "ӿ" for ch in text):
+        text = text.translate(_HOMOGLYPHS)
+    return text
+
+
+def edit_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """Levenshtein编辑距离；指定 limit 时只计算对角带，超过 limit 后提前返回 limit + 1"""
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def parse_amount(text: Optional[str]) -> Optional[float]:
+    """解析数值，支持千位空格分隔和逗号小数点，无法解析时返回None"""
+    match = _NUMBER_PATTERN.search(unicodedata.normalize("NFKC", text or ""))
+    if match is None:
+        return None
+    return float(re.sub(r"\s", "", match.group()).replace(",", "."))
+
+
+def parse_weight(text: Optional[str]) -> Optional[float]:
+    """解析重量并统一为千克，没有单位时按千克处理，无法解析时返回None"""
+    text = unicodedata.normalize("NFKC", text or "")
+    match = _WEIGHT_PATTERN.search(text)
+    if match is None:
+        return parse_amount(text)
+    value = parse_amount(match.group(1))
+    if value is None:
+        return None
+    return value / 1000 if match.group(2).lower() in _GRAM_UNITS else value
+
+
+class QGramIndex:
+    """二元组（bigram）倒排索引
+
+    词两端加边界符后切成二元组，每个二元组记录包含它的词。查询时先统计候选词与查询词
+    共有的不同二元组数：一次编辑最多破坏两个二元组，编辑距离不超过k时双方各自的
+    不同二元组中至少有 (该词的不同二元组数 - 2k) 个是共有的，不满足的候选和长度相差
+    超过k的候选直接跳过，只对少量候选计算带限编辑距离。
+    中文鱼名多为二三个字，二元组比三元组更有区分度。
+    """
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.words: List[str] = []
+        # 每个词的不同二元组数
+        self._gram_counts: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+        for word in words:
+            self.add(word)
+
+    @staticmethod
+    def _grams(word: str) -> set:
+        padded = f"\x02{word}\x03"
+        return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+    def add(self, word: str) -> None:
+        index = len(self.words)
+        grams = self._grams(word)
+        self.words.append(word)
+        self._gram_counts.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(index)
+
+    def search(self, word: str, max_distance: int) -> Optional[Tuple[str, int]]:
+        """返回距离最近且不超过 max_distance 的词及其距离，没有时返回None"""
+        grams = self._grams(word)
+        counts: Dict[int, int] = {}
+        for gram in grams:
+            for index in self._postings.get(gram, ()):
+                counts[index] = counts.get(index, 0) + 1
+
+        best = None
+        limit = max_distance
+        # 共有二元组多的候选更可能接近，优先计算以尽早收紧上限
+        for index, shared in sorted(counts.items(), key=lambda item: -item[1]):
+            candidate = self.words[index]
+            if abs(len(candidate) - len(word)) > limit:
+                continue
+            if shared < max(self._gram_counts[index], len(grams)) - 2 * limit:
+                continue
+            distance = edit_distance(word, candidate, limit)
+            if distance <= limit:
+                best = (candidate, distance)
+                if distance == 0:
+                    break
+                limit = distance - 1
+                if limit < 0:
+                    break
+        return best
+
+
+class CatchRecord:
+    """归一化后的一条渔获记录"""
+
+    __slots__ = ("freshness", "species", "species_raw", "weight", "price", "matched", "distance")
+
+    def __init__(self, freshness: Optional[str], species: str, species_raw: str,
+                 weight: Optional[float], price: Optional[float], matched: bool, distance: int):
+        self.freshness = freshness
+        self.species = species
+        self.species_raw = species_raw
+        self.weight = weight  # 千克
+        self.price = price
+        self.matched = matched
+        self.distance = distance
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class CatchNormalizer:
+    """渔获文本归一化
+
+    标准鱼种及其别名以规范形式建立精确索引和二元组倒排索引：规范形式完全相同时直接命中，
+    否则通过二元组索引筛选候选，再找出编辑距离最近的词。查询结果按OCR原文缓存（LRU），
+    批量结果中重复出现的名称只计算一次。
+    未匹配到词典的名称保留OCR原文（去掉首尾空白），不会丢弃记录。
+    """
+
+    def __init__(self, species: Optional[Any] = None, config: Optional[Dict[str, Any]] = None):
+        settings = dict(DEFAULT_NORMALIZER_CONFIG)
+        settings.update(config if config is not None else config_loader.get('normalizer', {}))
+        self.max_distance = max(0, int(settings["max_distance"]))
+        self.max_ratio = float(settings["max_ratio"])
+        self.cache_size = max(0, int(settings["cache_size"]))
+
+        if species is None:
+            species = self._load_dictionary(settings)
+        self._species_index, self._species_grams = self._build_index(species)
+        self._freshness_index, self._freshness_grams = self._build_index(settings["freshness"])
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[Optional[str], int]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @staticmethod
+    def _load_dictionary(settings: Dict[str, Any]) -> Dict[str, List[str]]:
+        """合并配置中的鱼种、随程序附带的词典和配置目录下的词典文件"""
+        species = {}
+        sources = [settings["species"]]
+        filename = settings.get("dictionary_file")
+        paths = []
+        if filename:
+            paths = [os.path.join(directory, filename) for directory in (_BUNDLED_CONFIG_DIR, config_loader.config_dir)]
+        for path in dict.fromkeys(paths):
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        sources.append(json.load(f))
+                except (OSError, ValueError) as e:
+                    logger.error(f"读取鱼种词典失败 {path}: {e}")
+        for source in sources:
+            if isinstance(source, dict):
+                for name, aliases in source.items():
+                    species.setdefault(name, []).extend(aliases or [])
+            else:
+                for name in source or []:
+                    species.setdefault(name, [])
+        return species
+
+    @staticmethod
+    def _build_index(names: Any) -> Tuple[Dict[str, str], QGramIndex]:
+        """建立 规范形式 -> 标准名 的精确索引和对应的二元组索引"""
+        if not isinstance(names, dict):
+            names = {name: [] for name in names}
+        index = {}
+        for name, aliases in names.items():
+            for text in [name, *aliases]:
+                key = normalize_text(text)
+                if key:
+                    index.setdefault(key, name)
+        return index, QGramIndex(index)
+
+    @property
+    def species_count(self) -> int:
+        return len(set(self._species_index.values()))
+
+    def _lookup(self, kind: str, text: str) -> Tuple[Optional[str], int]:
+        """在词典中查找标准名，返回 (标准名, 编辑距离)，未匹配时标准名为None"""
+        cache_key = (kind, text)
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                return cached
+
+        index, grams = (self._species_index, self._species_grams) if kind == "species" \
+            else (self._freshness_index, self._freshness_grams)
+        key = normalize_text(text)
+        result = (None, -1)
+        if key in index:
+            result = (index[key], 0)
+        elif key:
+            limit = int(len(key) * self.max_ratio)
+            if len(key) > 1:
+                # 两三个字的鱼名按比例不允许任何误差，至少放宽到一个字
+                limit = max(limit, 1)
+            limit = min(self.max_distance, limit)
+            if kind == "freshness":
+                # 新鲜度标签很少且很短，允许一个字的误差（如繁简体）
+                limit = max(limit, 1)
+            found = grams.search(key, limit) if limit > 0 else None
+            if found is not None:
+                result = (index[found[0]], found[1])
+
+        if self.cache_size:
+            with self._cache_lock:
+                self._cache[cache_key] = result
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    def normalize_species(self, text: Optional[str]) -> Tuple[str, bool, int]:
+        """归一化鱼种名称，返回 (名称, 是否匹配到词典, 编辑距离)"""
+        text = (text or "").strip()
+        name, distance = self._lookup("species", text)
+        if name is None:
+            return text, False, -1
+        return name, True, distance
+
+    def normalize_freshness(self, text: Optional[str]) -> Optional[str]:
+        """归一化新鲜度，未匹配时返回原文，空文本返回None"""
+        text = (text or "").strip()
+        if not text:
+            return None
+        name, _ = self._lookup("freshness", text)
+        return name or text
+
+    def _split_fields(self, fish: Sequence[str]) -> Tuple[str, str, str, str]:
+        """取出 (新鲜度, 鱼种, 重量, 售价) 文本
+
+        四项齐全时按 [新鲜度, 鱼类名称, 重量, 售价] 的顺序；OCR漏掉部分文字框时按内容判断：
+        带重量单位的是重量，能匹配新鲜度的是新鲜度，纯数字是售价，其余第一项为鱼种。
+        """
+        if len(fish) >= 4:
+            return fish[0], fish[1], fish[2], fish[3]
+        freshness = species = weight = price = ""
+        for text in fish:
+            text = text or ""
+            if not weight and _WEIGHT_PATTERN.search(unicodedata.normalize("NFKC", text)):
+                weight = text
+            elif not freshness and self._lookup("freshness", text)[0] is not None:
+                freshness = text
+            elif not price and normalize_text(text).replace(".", "").isdigit():
+                price = text
+            elif not species:
+                species = text
+        return freshness, species, weight, price
+
+    def normalize(self, fish: Sequence[str]) -> CatchRecord:
+        """归一化一条渔获（OCR文本列表）"""
+        freshness, species_raw, weight, price = self._split_fields(fish)
+        species, matched, distance = self.normalize_species(species_raw)
+        return CatchRecord(self.normalize_freshness(freshness), species, species_raw.strip(),
+                           parse_weight(weight), parse_amount(price), matched, distance)
+
+    def normalize_all(self, fishes: Iterable[Sequence[str]]) -> List[CatchRecord]:
+        """归一化一批渔获"""
+        return [self.normalize(fish) for fish in fishes]
+
+
+_normalizer = None
+
+
+def get_normalizer() -> CatchNormalizer:
+    """获取全局渔获归一化器，首次使用时加载词典并建立索引"""
+    global _normalizer
+    if _normalizer is None:
+        _normalizer = CatchNormalizer()
+        logger.info(f"鱼种词典已加载: {_normalizer.species_count} 种")
+    return _normalizer
@@ -0,0 +1,100 @@
+"""感兴趣区域(ROI)模块，只保留截图中的渔获面板区域"""
+
+import logging
+from typing import Dict, Any, Optional, Tuple
+from src.utils.config_loader import config_loader
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认ROI配置，presets 键为 "宽x高"，值为像素坐标 [left, top, width, height]；
+# default 为比例坐标，适用于没有对应分辨率预设的截图
+DEFAULT_ROI_CONFIG = {
+    "enabled": True,
+    "presets": {},
+    "default": None,
+    "margin": 16
+}
+
+# (left, top, right, bottom)
+Box = Tuple[int, int, int, int]
+
+
+class RoiSelector:
+    """按截图分辨率选择渔获面板区域"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        settings = dict(DEFAULT_ROI_CONFIG)
+        settings.update(config if config is not None else config_loader.get('roi', {}))
+        self.enabled = bool(settings["enabled"])
+        self.presets = settings["presets"] or {}
+        self.default = settings["default"]
+        self.margin = int(settings["margin"])
+
+    def get_settings(self) -> Dict[str, Any]:
+        """获取当前生效的ROI配置"""
+        return {"enabled": self.enabled, "presets": self.presets,
+                "default": self.default, "margin": self.margin}
+
+    def select(self, width: int, height: int) -> Optional[Box]:
+        """返回给定分辨率截图的裁剪区域，没有匹配的预设时返回None"""
+        if not self.enabled:
+            return None
+        preset = self.presets.get(f"{width}x{height}")
+        if preset is not None:
+            left, top, box_width, box_height = preset
+        elif self.default:
+            left, top = self.default[0] * width, self.default[1] * height
+            box_width, box_height = self.default[2] * width, self.default[3] * height
+        else:
+            return None
+
+        box = (
+            max(0, int(left) - self.margin),
+            max(0, int(top) - self.margin),
+            min(width, int(left + box_width) + self.margin),
+            min(height, int(top + box_height) + self.margin)
+        )
+        if box[2] <= box[0] or box[3] <= box[1]:
+            logger.warning(f"ROI预设超出截图范围: {width}x{height}")
+            return None
+        if box == (0, 0, width, height):
+            return None
+        return box
+
+
+def map_locations(obj: Any, offset_x: float, offset_y: float, scale: float = 1.0) -> None:
+    """将结果中所有 location 坐标从裁剪/缩放后的空间映射回原图空间（原地修改）
+
+    Args:
+        obj: 结果字典或列表
+        offset_x: 裁剪区域左上角在原图中的x坐标
+        offset_y: 裁剪区域左上角在原图中的y坐标
+        scale: 处理图相对裁剪区域的缩放比例
+    """
+    if isinstance(obj, list):
+        for item in obj:
+            map_locations(item, offset_x, offset_y, scale)
+        return
+    if not isinstance(obj, dict):
+        return
+    for key, value in obj.items():
+        if key == "location" and isinstance(value, dict) and "left" in value and "top" in value:
+            value["left"] = value["left"] / scale + offset_x
+            value["top"] = value["top"] / scale + offset_y
+            if "width" in value:
+                value["width"] = value["width"] / scale
+            if "height" in value:
+                value["height"] = value["height"] / scale
+        elif isinstance(value, (dict, list)):
+            map_locations(value, offset_x, offset_y, scale)
+
+
+def restore_result_coordinates(result: Dict[str, Any], roi: Optional[Box], scale: float = 1.0) -> None:
+    """把基于裁剪/缩放图片得到的结果坐标还原到原图空间，并记录裁剪区域"""
+    if roi is None and scale == 1.0:
+        return
+    offset_x, offset_y = roi[:2] if roi else (0, 0)
+    map_locations(result, offset_x, offset_y, scale)
+    if roi is not None:
+        result["roi"] = list(roi)
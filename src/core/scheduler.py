@@ -0,0 +1,351 @@
+"""处理任务调度模块，固定数量的工作线程按优先级处理界面、监控和批量任务"""
+
+import heapq
+import queue
+import logging
+import threading
+import time
+from typing import Callable, Dict, Any, Iterable, Iterator, Optional, Tuple
+from src.api.exceptions import APIException, RequestCancelled
+from src.api.cancellation import CancelToken
+from src.utils.config_loader import config_loader
+from src.utils.metrics import MetricsRegistry, RequestTrace
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 任务优先级，数值越小越先处理
+PRIORITY_INTERACTIVE = 0
+PRIORITY_WATCH = 1
+PRIORITY_BATCH = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_WATCH: "watch", PRIORITY_BATCH: "batch"}
+
+# 默认调度配置：queue_size 为后台任务（监控、批量）的排队上限，
+# reserved_interactive 为只处理界面任务的工作线程数
+DEFAULT_SCHEDULER_CONFIG = {
+    "workers": 4,
+    "queue_size": 32,
+    "reserved_interactive": 1
+}
+
+# 任务完成回调：(任务, 处理结果, 错误信息)，在工作线程中调用
+JobCallback = Callable[["Job", Optional[Dict[str, Any]], Optional[str]], None]
+
+
+class Job:
+    """一个待处理的截图"""
+
+    def __init__(self, image_path: str, priority: int, callback: JobCallback,
+                 cancel_token: Optional[CancelToken] = None):
+        self.image_path = image_path
+        self.priority = priority
+        self.callback = callback
+        self.cancel_token = cancel_token or CancelToken()
+        self.enqueued_at = time.perf_counter()
+        self.started_at: Optional[float] = None
+
+    def cancel(self) -> None:
+        self.cancel_token.cancel()
+
+
+def _create_worker_backend():
+    """为工作线程创建处理后端：远程模式下每个线程使用独立的HTTP会话"""
+    from src.core.local_backend import get_local_backend
+    local_backend = get_local_backend()
+    if local_backend is not None:
+        # 进程池本身是线程安全的，所有工作线程共用
+        return local_backend
+    from src.api.client import get_rf4_api
+    return get_rf4_api().with_own_session()
+
+
+class JobScheduler:
+    """优先级任务调度器
+
+    固定数量的工作线程从优先级队列中取任务，界面任务总是排在监控和批量任务之前，
+    且保留 reserved_interactive 个线程只处理界面任务，后台任务占满其余线程时
+    新的界面截图也能立即开始。后台任务排队数达到 queue_size 时 submit 会阻塞，
+    对批量和监控形成背压；界面任务不受此限制。
+    队列深度和每个任务的等待、处理耗时记录到 MetricsRegistry。
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: Optional[int] = None,
+                 reserved_interactive: Optional[int] = None,
+                 backend_factory: Callable[[], Any] = _create_worker_backend):
+        settings = dict(DEFAULT_SCHEDULER_CONFIG)
+        settings.update(config_loader.get('scheduler', {}))
+        self.workers = max(1, int(workers if workers is not None else settings["workers"]))
+        self.queue_size = max(1, int(queue_size if queue_size is not None else settings["queue_size"]))
+        reserved = reserved_interactive if reserved_interactive is not None else settings["reserved_interactive"]
+        self.reserved_interactive = min(max(0, int(reserved)), self.workers - 1)
+        self.backend_factory = backend_factory
+        self.metrics = MetricsRegistry()
+
+        self._heap = []
+        self._sequence = 0
+        self._background_queued = 0
+        self._background_running = 0
+        self._running = 0
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._threads = []
+
+    def start(self) -> None:
+        """启动工作线程，重复调用无效"""
+        with self._condition:
+            if self._threads:
+                return
+            self._stopped = False
+            self._threads = [threading.Thread(target=self._worker_loop, name=f"rf4-scheduler-{i}", daemon=True)
+                             for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"任务调度器已启动，工作线程数: {self.workers}")
+
+    def shutdown(self, wait: bool = True) -> None:
+        """停止调度，排队中的任务被取消，正在处理的任务也会收到取消"""
+        with self._condition:
+            self._stopped = True
+            for _, _, job in self._heap:
+                job.cancel()
+            self._heap = []
+            self._background_queued = 0
+            self._condition.notify_all()
+            threads, self._threads = self._threads, []
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def submit(self, image_path: str, priority: int, callback: JobCallback,
+               cancel_token: Optional[CancelToken] = None, timeout: Optional[float] = None) -> Job:
+        """提交任务
+
+        Args:
+            image_path: 图像文件路径
+            priority: 任务优先级（PRIORITY_*）
+            callback: 完成回调，在工作线程中调用；任务被取消时不调用
+            cancel_token: 取消标记，未传入时新建
+            timeout: 后台任务排队已满时最多等待的秒数，None表示一直等待
+
+        Raises:
+            TimeoutError: 等待超时
+            RequestCancelled: 等待排队期间任务被取消
+            RuntimeError: 调度器已停止
+        """
+        self.start()
+        job = Job(image_path, priority, callback, cancel_token)
+        with self._condition:
+            if priority != PRIORITY_INTERACTIVE:
+                self._wait_for_slot(job, timeout)
+                self._background_queued += 1
+            if self._stopped:
+                raise RuntimeError("任务调度器已停止")
+            job.enqueued_at = time.perf_counter()
+            heapq.heappush(self._heap, (priority, self._sequence, job))
+            self._sequence += 1
+            self._condition.notify_all()
+            self._update_gauges()
+        return job
+
+    def _wait_for_slot(self, job: Job, timeout: Optional[float]) -> None:
+        """等待后台任务排队数低于上限（需持有锁），任务被取消时不再等待"""
+        def ready():
+            return self._stopped or job.cancel_token.cancelled or self._background_queued < self.queue_size
+
+        if not ready():
+            # 取消时唤醒等待中的提交
+            job.cancel_token.add_callback(self._notify_all)
+            if not self._condition.wait_for(ready, timeout):
+                raise TimeoutError("任务队列已满")
+        job.cancel_token.raise_if_cancelled()
+
+    def _notify_all(self) -> None:
+        with self._condition:
+            self._condition.notify_all()
+
+    def process_image(self, image_path: str, priority: int = PRIORITY_INTERACTIVE,
+                      cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """提交任务并等待结果，接口与 RF4APIClient.process_image 一致"""
+        done = threading.Event()
+        outcome = {}
+
+        def on_done(job, result, error):
+            outcome["result"], outcome["error"] = result, error
+            done.set()
+
+        job = self.submit(image_path, priority, on_done, cancel_token)
+        while not done.wait(0.1):
+            job.cancel_token.raise_if_cancelled()
+        if outcome["error"] is not None:
+            raise APIException(outcome["error"])
+        return outcome["result"]
+
+    def process_images(self, image_paths: Iterable[str], max_workers: Optional[int] = None,
+                       cancel_token: Optional[CancelToken] = None,
+                       priority: int = PRIORITY_BATCH) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+        """批量提交任务，按完成顺序逐个返回 (图像路径, 处理结果, 错误信息)
+
+        队列已满时提交会阻塞，在途任务数受 queue_size 和工作线程数限制；
+        阻塞期间 cancel_token 被取消时立即结束迭代。
+        max_workers 仅为与 RF4APIClient 保持接口一致，并发数由工作线程数决定。
+        """
+        completed = queue.Queue()
+        cancel_token = cancel_token or CancelToken()
+        pending = 0
+
+        def on_done(job, result, error):
+            completed.put((job.image_path, result, error))
+
+        try:
+            for path in image_paths:
+                while True:
+                    try:
+                        item = completed.get_nowait()
+                    except queue.Empty:
+                        break
+                    pending -= 1
+                    yield item
+                if cancel_token.cancelled:
+                    return
+                try:
+                    self.submit(path, priority, on_done, cancel_token)
+                except RequestCancelled:
+                    return
+                pending += 1
+            while pending and not cancel_token.cancelled:
+                try:
+                    item = completed.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                pending -= 1
+                yield item
+        finally:
+            # 调用方提前停止迭代时，取消尚未完成的任务
+            if pending:
+                cancel_token.cancel()
+
+    def backend_for(self, priority: int) -> "PriorityBackend":
+        """以指定优先级提交任务的处理后端，可传给 ScreenshotWatcher 等调用方"""
+        return PriorityBackend(self, priority)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取队列和线程状态"""
+        with self._condition:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _, _ in self._heap:
+                depth[PRIORITY_NAMES.get(priority, str(priority))] += 1
+            return {"workers": self.workers, "running": self._running, "queued": depth}
+
+    def _update_gauges(self) -> None:
+        """更新队列深度和忙碌线程数（需持有锁）"""
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, _ in self._heap:
+            depth[PRIORITY_NAMES.get(priority, str(priority))] += 1
+        for name, count in depth.items():
+            self.metrics.set_gauge("scheduler_queue_depth", count, priority=name)
+        self.metrics.set_gauge("scheduler_busy_workers", self._running)
+
+    def _take_job(self, interactive_only: bool) -> Optional[Job]:
+        """取出下一个可执行的任务（需持有锁），没有时返回None"""
+        if not self._heap:
+            return None
+        priority = self._heap[0][0]
+        if priority != PRIORITY_INTERACTIVE:
+            # 为界面任务保留的线程不处理后台任务
+            if interactive_only or self._background_running >= self.workers - self.reserved_interactive:
+                return None
+        _, _, job = heapq.heappop(self._heap)
+        if priority != PRIORITY_INTERACTIVE:
+            self._background_queued -= 1
+            self._background_running += 1
+        self._running += 1
+        return job
+
+    def _worker_loop(self) -> None:
+        index = int(threading.current_thread().name.rsplit("-", 1)[-1])
+        # 编号最大的若干线程只处理界面任务
+        interactive_only = index >= self.workers - self.reserved_interactive
+        backend = None
+        while True:
+            with self._condition:
+                job = None
+                while not self._stopped:
+                    job = self._take_job(interactive_only)
+                    if job is not None:
+                        break
+                    self._condition.wait()
+                if job is None:
+                    return
+                # 创建后端失败时回调中同样需要开始时间
+                job.started_at = time.perf_counter()
+                # 后台排队数减少，唤醒等待提交的生产者
+                self._condition.notify_all()
+                self._update_gauges()
+
+            try:
+                if backend is None:
+                    try:
+                        backend = self.backend_factory()
+                    except Exception as e:
+                        logger.error(f"创建处理后端失败: {e}")
+                        job.callback(job, None, str(e))
+                        continue
+                self._run_job(backend, job)
+            except Exception as e:
+                logger.error(f"处理任务回调失败 {job.image_path}: {e}")
+            finally:
+                with self._condition:
+                    self._running -= 1
+                    if job.priority != PRIORITY_INTERACTIVE:
+                        self._background_running -= 1
+                    self._condition.notify_all()
+                    self._update_gauges()
+
+    def _run_job(self, backend, job: Job) -> None:
+        trace = RequestTrace(f"scheduler.{PRIORITY_NAMES.get(job.priority, job.priority)}")
+        trace.add_phase("wait", job.started_at - job.enqueued_at)
+        if job.cancel_token.cancelled:
+            return
+        try:
+            result = backend.process_image(job.image_path, job.cancel_token)
+        except RequestCancelled:
+            return
+        except APIException as e:
+            trace.add_phase("run", time.perf_counter() - job.started_at)
+            self.metrics.record(trace.finish(e.message, time.perf_counter() - job.enqueued_at))
+            job.callback(job, None, e.message)
+            return
+        except Exception as e:
+            trace.add_phase("run", time.perf_counter() - job.started_at)
+            self.metrics.record(trace.finish(str(e), time.perf_counter() - job.enqueued_at))
+            job.callback(job, None, str(e))
+            return
+        trace.add_phase("run", time.perf_counter() - job.started_at)
+        self.metrics.record(trace.finish(total=time.perf_counter() - job.enqueued_at))
+        job.callback(job, result, None)
+
+
+class PriorityBackend:
+    """以固定优先级通过调度器处理图片的后端，接口与 RF4APIClient 一致"""
+
+    def __init__(self, scheduler: JobScheduler, priority: int):
+        self.scheduler = scheduler
+        self.priority = priority
+
+    def process_image(self, image_path: str, cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        return self.scheduler.process_image(image_path, self.priority, cancel_token)
+
+    def process_images(self, image_paths: Iterable[str], max_workers: Optional[int] = None,
+                       cancel_token: Optional[CancelToken] = None):
+        return self.scheduler.process_images(image_paths, max_workers, cancel_token, self.priority)
+
+
+_scheduler = None
+
+
+def get_scheduler() -> JobScheduler:
+    """获取全局任务调度器"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = JobScheduler()
+    return _scheduler
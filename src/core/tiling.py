@@ -0,0 +1,260 @@
+"""分块OCR模块，把超宽或高分辨率截图切成重叠的图块并行识别，再合并接缝处的重复文字框"""
+
+import os
+import logging
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
+from src.core.box_matcher import Rect, location_to_rect, rects_intersect
+from src.core.image_buffer import run_stage
+from src.utils.config_loader import config_loader
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认分块配置：像素数不少于 min_pixels 的图片才分块；tile_size 为图块最大 [宽, 高]，
+# overlap 为相邻图块的重叠像素，应大于最长文字框的宽度和高度
+DEFAULT_TILING_CONFIG = {
+    "enabled": True,
+    "min_pixels": 6000000,
+    "tile_size": [1600, 1600],
+    "overlap": 160,
+    "executor": "process",
+    "workers": 4
+}
+
+# 文字框距图块内侧边缘不超过该像素数时视为被截断
+EDGE_MARGIN = 2
+
+# (left, top, right, bottom)
+Box = Tuple[int, int, int, int]
+# (图块区域, 该图块负责的区域)，负责区域以接缝中线划分，所有图块的负责区域恰好覆盖整张图
+Tile = Tuple[Box, Tuple[float, float, float, float]]
+
+
+def _split_axis(length: int, tile: int, overlap: int) -> List[Tuple[int, int, float, float]]:
+    """沿一个方向切分，返回 [(起点, 终点, 负责区域起点, 负责区域终点)]，各图块等长"""
+    if length <= tile:
+        return [(0, length, float("-inf"), float("inf"))]
+    step = tile - overlap
+    count = -(-(length - overlap) // step)
+    size = -(-(length + (count - 1) * overlap) // count)
+    spans = []
+    for i in range(count):
+        start = min(i * (size - overlap), length - size)
+        spans.append([start, start + size])
+    result = []
+    for i, (start, end) in enumerate(spans):
+        # 相邻图块的接缝取重叠区的中线
+        core_start = float("-inf") if i == 0 else (start + spans[i - 1][1]) / 2
+        core_end = float("inf") if i == count - 1 else (spans[i + 1][0] + end) / 2
+        result.append((start, end, core_start, core_end))
+    return result
+
+
+def plan_tiles(width: int, height: int, tile_width: int, tile_height: int, overlap: int) -> List[Tile]:
+    """按图块大小和重叠切分图片，按行优先顺序返回图块"""
+    overlap = max(0, min(overlap, tile_width - 1, tile_height - 1))
+    tiles = []
+    for top, bottom, core_top, core_bottom in _split_axis(height, tile_height, overlap):
+        for left, right, core_left, core_right in _split_axis(width, tile_width, overlap):
+            tiles.append(((left, top, right, bottom), (core_left, core_top, core_right, core_bottom)))
+    return tiles
+
+
+def _is_truncated(rect: Rect, tile: Box, width: int, height: int) -> bool:
+    """文字框是否贴着图块的内侧边缘（图片本身的边缘除外），即可能被截断"""
+    left, top, right, bottom = tile
+    return ((left > 0 and rect[0] <= left + EDGE_MARGIN)
+            or (right < width and rect[0] + rect[2] >= right - EDGE_MARGIN)
+            or (top > 0 and rect[1] <= top + EDGE_MARGIN)
+            or (bottom < height and rect[1] + rect[3] >= bottom - EDGE_MARGIN))
+
+
+def crosses_seam(rect: Rect, tiles: Sequence[Tile]) -> bool:
+    """矩形是否跨越图块接缝，即不完整地落在任何一个图块的负责区域内"""
+    left, top, width, height = rect
+    return not any(core[0] <= left and left + width <= core[2] and core[1] <= top and top + height <= core[3]
+                   for _, core in tiles)
+
+
+def _center_in(word: Dict[str, Any], rect: Rect) -> bool:
+    left, top, width, height = location_to_rect(word['location'])
+    center_x, center_y = left + width / 2, top + height / 2
+    return rect[0] <= center_x <= rect[0] + rect[2] and rect[1] <= center_y <= rect[1] + rect[3]
+
+
+def merge_tile_words(tile_words: Sequence[Tuple[Tile, List[Dict[str, Any]]]],
+                     width: int, height: int) -> List[Dict[str, Any]]:
+    """合并各图块的文字框，去掉接缝处的重复
+
+    坐标已映射到整图。每个完整的文字框只保留在中心所在的负责区域对应的图块中；
+    贴着图块内侧边缘的文字框可能被截断，只在重叠区不足以容纳它、其他图块中
+    也没有完整版本时才保留其中最大的片段。
+    鱼卡字段按OCR输出顺序对应，因此不重新排序：按图块顺序、图块内保持OCR引擎的原始顺序。
+    跨接缝的鱼卡的字段分散在多个图块中，顺序与整图OCR不同，需再经 OcrTiler.refine_cards 修正。
+
+    Args:
+        tile_words: [(图块, 该图块的文字框列表)]
+        width: 整图宽度
+        height: 整图高度
+
+    Returns:
+        文字框列表
+    """
+    kept = []
+    truncated = []
+    for tile_index, ((tile, core), words) in enumerate(tile_words):
+        for word_index, word in enumerate(words):
+            rect = location_to_rect(word['location'])
+            order = (tile_index, word_index)
+            if _is_truncated(rect, tile, width, height):
+                truncated.append((order, rect, word))
+                continue
+            center_x, center_y = rect[0] + rect[2] / 2, rect[1] + rect[3] / 2
+            if core[0] <= center_x < core[2] and core[1] <= center_y < core[3]:
+                kept.append((order, rect, word))
+
+    if truncated:
+        kept_rects = [rect for _, rect, _ in kept]
+        for order, rect, word in sorted(truncated, key=lambda item: item[1][2] * item[1][3], reverse=True):
+            if not any(rects_intersect(rect, other) for other in kept_rects):
+                logger.debug(f"文字框跨越整个重叠区，保留截断片段: {word.get('words')}")
+                kept.append((order, rect, word))
+                kept_rects.append(rect)
+        # 截断片段按其所在图块和原始位置放回
+        kept.sort(key=lambda item: item[0])
+    return [word for _, _, word in kept]
+
+
+def _offset_words(words: List[Dict[str, Any]], dx: int, dy: int) -> List[Dict[str, Any]]:
+    for word in words:
+        location = word['location']
+        location['left'] += dx
+        location['top'] += dy
+    return words
+
+
+class OcrTiler:
+    """超大截图的分块OCR
+
+    图块为整图缓冲区的视图，在进程池（经共享内存）或线程池中分别识别，
+    坐标平移回整图后合并去重，输出与整图OCR相同结构的 {"words_result": [...]}。
+    鱼卡字段按文字顺序对应，跨接缝的鱼卡在检测完成后由 refine_cards 对鱼卡区域整块重新识别，
+    之后即可用于鱼卡匹配。
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        settings = dict(DEFAULT_TILING_CONFIG)
+        settings.update(config if config is not None else config_loader.get('tiling', {}))
+        self.enabled = bool(settings["enabled"])
+        self.min_pixels = int(settings["min_pixels"])
+        self.tile_width, self.tile_height = (int(v) for v in settings["tile_size"])
+        self.overlap = int(settings["overlap"])
+        self.executor_type = settings["executor"]
+        self.workers = max(1, int(settings["workers"]))
+        self._executor = None
+
+    def plan(self, width: int, height: int) -> Optional[List[Tile]]:
+        """返回图片的切分方案，不需要分块时返回None"""
+        if not self.enabled or width * height < self.min_pixels:
+            return None
+        tiles = plan_tiles(width, height, self.tile_width, self.tile_height, self.overlap)
+        return tiles if len(tiles) > 1 else None
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.executor_type == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            elif self.executor_type == 'thread':
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="rf4-ocr-tile")
+        return self._executor
+
+    def close(self) -> None:
+        """关闭执行器"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def run(self, buffer, tiles: List[Tile], ocr_func: Callable[[Any], Dict[str, Any]],
+            stage_input: str = "array") -> Dict[str, Any]:
+        """分块识别并合并
+
+        Args:
+            buffer: 已解码的 ImageBuffer，图块为其视图
+            tiles: plan() 返回的切分方案
+            ocr_func: 接收图像数组（stage_input 为 "path" 时为文件路径）、
+                返回 {"words_result": [...]} 的OCR函数，进程池模式下需可序列化
+            stage_input: 传给OCR函数的输入: array / path
+
+        Returns:
+            整图坐标下的OCR结果
+        """
+        results = self._recognize(buffer, [box for box, _ in tiles], ocr_func, stage_input)
+        tile_words = [(tile, _offset_words(result.get('words_result', []), tile[0][0], tile[0][1]))
+                      for tile, result in zip(tiles, results)]
+        return {"words_result": merge_tile_words(tile_words, buffer.width, buffer.height)}
+
+    def refine_cards(self, buffer, tiles: List[Tile], ocr_result: Dict[str, Any], card_rects: Sequence[Rect],
+                     ocr_func: Callable[[Any], Dict[str, Any]], stage_input: str = "array") -> Dict[str, Any]:
+        """对跨接缝的鱼卡整块重新识别，使其字段顺序与整图OCR一致
+
+        分块合并的文字按图块排序，跨接缝鱼卡的字段会被打乱（如右列字段排到左列之前），
+        而鱼卡字段按顺序对应新鲜度、名称、重量、售价。这类鱼卡的区域（向外扩展半个重叠区，
+        保证其中的文字框完整）作为一个图块重新识别，替换中心落在鱼卡内的文字框，
+        插入到原先第一个这样的文字框的位置。
+
+        Args:
+            buffer: run() 使用的 ImageBuffer
+            tiles: run() 使用的切分方案
+            ocr_result: run() 返回的结果
+            card_rects: 鱼卡矩形 (left, top, width, height)，与 buffer 同一坐标系
+            ocr_func: 与 run() 相同的OCR函数
+            stage_input: 与 run() 相同
+
+        Returns:
+            修正后的OCR结果
+        """
+        cards = [rect for rect in card_rects if crosses_seam(rect, tiles)]
+        if not cards:
+            return ocr_result
+        margin = self.overlap // 2
+        boxes = []
+        for left, top, width, height in cards:
+            boxes.append((max(0, int(left) - margin), max(0, int(top) - margin),
+                          min(buffer.width, int(left + width + 0.5) + margin),
+                          min(buffer.height, int(top + height + 0.5) + margin)))
+        results = self._recognize(buffer, boxes, ocr_func, stage_input)
+
+        words = list(ocr_result.get('words_result', []))
+        for rect, box, result in zip(cards, boxes, results):
+            card_words = [word for word in _offset_words(result.get('words_result', []), box[0], box[1])
+                          if _center_in(word, rect)]
+            position = next((i for i, word in enumerate(words) if _center_in(word, rect)), len(words))
+            rest = [word for word in words[position:] if not _center_in(word, rect)]
+            words = words[:position] + card_words + rest
+        logger.debug(f"重新识别跨接缝的鱼卡 {len(cards)} 张")
+        return dict(ocr_result, words_result=words)
+
+    def _recognize(self, buffer, boxes: List[Box], ocr_func: Callable[[Any], Dict[str, Any]],
+                   stage_input: str) -> List[Dict[str, Any]]:
+        """按执行器配置分别识别各区域，返回各区域的OCR结果（区域内坐标）"""
+        executor = self._get_executor()
+        map_stage = executor.map if executor is not None else map
+        if stage_input == 'path':
+            # 只接受文件路径的OCR函数，每个区域写入唯一的临时文件
+            paths = []
+            try:
+                for box in boxes:
+                    paths.append(buffer.region(box).to_temp_file())
+                results = list(map_stage(run_stage, repeat(ocr_func), paths))
+            finally:
+                for path in paths:
+                    os.remove(path)
+        elif self.executor_type == 'process':
+            # 整图放入共享内存一次，子进程按区域挂载
+            with buffer.share() as shared:
+                results = list(map_stage(run_stage, repeat(ocr_func), [shared.region(box) for box in boxes]))
+        else:
+            results = list(map_stage(run_stage, repeat(ocr_func), [buffer.region(box).array for box in boxes]))
+        return [result for result, _ in results]
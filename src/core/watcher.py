@@ -0,0 +1,251 @@
+"""截图文件夹监控模块，发现新截图后去抖并送入有界处理队列"""
+
+import os
+import sys
+import time
+import queue
+import struct
+import select
+import logging
+import threading
+from typing import Callable, Dict, Any, Optional, Tuple
+from src.api.exceptions import RequestCancelled
+from src.api.cancellation import CancelToken
+from src.utils.config_loader import config_loader
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认监控配置
+DEFAULT_WATCH_CONFIG = {
+    "directory": "",
+    "extensions": [".png", ".jpg", ".jpeg"],
+    "settle_seconds": 1.0,
+    "poll_interval": 1.0,
+    "queue_size": 16,
+    "workers": 2
+}
+
+# inotify事件掩码
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class _Inotify:
+    """通过ctypes调用Linux inotify，仅用于获知目录中有文件变化"""
+
+    def __init__(self, directory: str):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | getattr(os, 'O_CLOEXEC', 0))
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, "inotify_add_watch 失败")
+
+    def read_names(self, timeout: float):
+        """等待事件并返回变化的文件名列表，超时返回空列表"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ScreenshotWatcher:
+    """截图文件夹监控器
+
+    Linux上使用inotify获知新文件，其他平台或inotify不可用时定时扫描目录。
+    新文件在大小和修改时间保持 settle_seconds 不变后才视为写入完成，
+    然后放入有界队列，由固定数量的工作线程调用处理后端。
+    队列已满时监控线程会等待，避免截图突增时压垮后端。
+    每次启动使用新的停止标记、取消标记和队列，停止时未能及时退出的线程
+    不会被下一次启动重新唤醒。
+    """
+
+    def __init__(self, on_result: Callable[[str, Optional[Dict[str, Any]], Optional[str]], None],
+                 directory: Optional[str] = None, backend=None,
+                 config: Optional[Dict[str, Any]] = None):
+        settings = dict(DEFAULT_WATCH_CONFIG)
+        settings.update(config if config is not None else config_loader.get('watch', {}))
+        self.directory = directory or settings["directory"]
+        self.extensions = tuple(ext.lower() for ext in settings["extensions"])
+        self.settle_seconds = float(settings["settle_seconds"])
+        self.poll_interval = float(settings["poll_interval"])
+        self.workers = max(1, int(settings["workers"]))
+        self.queue_size = max(1, int(settings["queue_size"]))
+        self.on_result = on_result
+        self._backend = backend
+
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._stop = threading.Event()
+        self._cancel_token = CancelToken()
+        self._threads = []
+        # 待稳定的文件: 路径 -> (大小, 修改时间, 最近一次变化的时间)
+        self._pending: Dict[str, Tuple[int, float, float]] = {}
+        self._seen = set()
+
+    def _is_image(self, name: str) -> bool:
+        return os.path.splitext(name)[1].lower() in self.extensions
+
+    def start(self) -> None:
+        """开始监控，目录中已有的文件不会被处理"""
+        if not self.directory or not os.path.isdir(self.directory):
+            raise ValueError(f"监控目录不存在: {self.directory}")
+        self._stop = threading.Event()
+        self._cancel_token = CancelToken()
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._pending = {}
+        self._seen = {entry.path for entry in os.scandir(self.directory) if self._is_image(entry.name)}
+
+        self._threads = [threading.Thread(target=self._watch_loop, args=(self._stop, self._queue),
+                                          name="rf4-watcher", daemon=True)]
+        for i in range(self.workers):
+            self._threads.append(threading.Thread(target=self._worker_loop,
+                                                  args=(self._stop, self._queue, self._cancel_token),
+                                                  name=f"rf4-watch-worker-{i}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"开始监控截图目录: {self.directory}")
+
+    def stop(self, timeout: Optional[float] = 2.0) -> None:
+        """停止监控，队列中尚未处理的文件会被丢弃
+
+        正在处理的截图通过取消标记中止。最多等待 timeout 秒（None表示一直等待），
+        可在GUI线程中调用；届时仍未退出的线程（后端不响应取消时）留在后台结束，
+        结束后不再回调 on_result。
+        """
+        self._stop.set()
+        self._cancel_token.cancel()
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        alive = [thread.name for thread in self._threads if thread.is_alive()]
+        if alive:
+            logger.warning(f"监控线程未在 {timeout} 秒内退出，留在后台结束: {', '.join(alive)}")
+        self._threads = []
+        logger.info("截图目录监控已停止")
+
+    def _watch_loop(self, stop: threading.Event, jobs: queue.Queue) -> None:
+        inotify = None
+        if sys.platform.startswith('linux'):
+            try:
+                inotify = _Inotify(self.directory)
+            except Exception as e:
+                logger.warning(f"inotify不可用，改为定时扫描: {e}")
+        # 登记 start() 之后、开始监听之前新建的文件
+        self._scan()
+
+        try:
+            while not stop.is_set():
+                if inotify is not None:
+                    # 有待稳定的文件时缩短等待时间，以便及时检查
+                    timeout = min(self.poll_interval, self.settle_seconds) if self._pending else self.poll_interval
+                    for name in inotify.read_names(timeout):
+                        if self._is_image(name):
+                            self._track(os.path.join(self.directory, name))
+                else:
+                    stop.wait(self.poll_interval)
+                    self._scan()
+                self._check_pending(stop, jobs)
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def _scan(self) -> None:
+        """定时扫描模式：登记所有尚未处理的图片"""
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.path not in self._seen and self._is_image(entry.name):
+                    self._track(entry.path)
+        except OSError as e:
+            logger.error(f"扫描监控目录失败: {e}")
+
+    def _track(self, path: str) -> None:
+        if path in self._seen or path in self._pending:
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        self._pending[path] = (stat.st_size, stat.st_mtime, time.monotonic())
+
+    def _check_pending(self, stop: threading.Event, jobs: queue.Queue) -> None:
+        """文件大小和修改时间稳定后放入处理队列"""
+        now = time.monotonic()
+        for path, (size, mtime, changed_at) in list(self._pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self._pending[path]
+                continue
+            if (stat.st_size, stat.st_mtime) != (size, mtime):
+                self._pending[path] = (stat.st_size, stat.st_mtime, now)
+            elif stat.st_size > 0 and now - changed_at >= self.settle_seconds:
+                del self._pending[path]
+                self._seen.add(path)
+                self._enqueue(path, stop, jobs)
+
+    @staticmethod
+    def _enqueue(path: str, stop: threading.Event, jobs: queue.Queue) -> None:
+        # 队列满时等待，形成背压
+        while not stop.is_set():
+            try:
+                jobs.put(path, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _worker_loop(self, stop: threading.Event, jobs: queue.Queue, cancel_token: CancelToken) -> None:
+        backend = self._backend
+        if backend is None:
+            from src.core.local_backend import get_processing_backend
+            backend = get_processing_backend()
+        while not stop.is_set():
+            try:
+                path = jobs.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                result = backend.process_image(path, cancel_token)
+            except RequestCancelled:
+                continue
+            except Exception as e:
+                message = getattr(e, 'message', str(e))
+                logger.error(f"处理监控截图失败 {path}: {message}")
+                result, error = None, message
+            else:
+                error = None
+            # 停止后才完成的截图不再回调
+            if stop.is_set():
+                continue
+            try:
+                self.on_result(path, result, error)
+            except Exception as e:
+                logger.error(f"监控结果回调失败 {path}: {e}")
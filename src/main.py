@@ -1,13 +1,20 @@
 import sys
 import os
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtGui import QIcon
-
-from ui.main_window import MainWindow
 
 def main():
+    # 尽早开始启动计时
+    from src.utils.startup_profiler import startup_profiler
+    
+    # 延迟导入PyQt5和界面模块
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtGui import QIcon
+    from PyQt5.QtCore import QTimer
+    from ui.main_window import MainWindow
+    startup_profiler.mark("导入界面模块")
+    
     # 创建应用
     app = QApplication(sys.argv)
+    startup_profiler.mark("创建QApplication")
     
     # 设置应用图标
     icon_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 
@@ -17,7 +24,15 @@ def main():
     
     # 创建主窗口
     window = MainWindow()
+    startup_profiler.mark("创建主窗口")
     window.show()
+    startup_profiler.mark("显示主窗口")
+    
+    # 事件循环开始后（首次绘制完成）输出启动耗时
+    def report_startup():
+        startup_profiler.mark("首次事件循环")
+        startup_profiler.report()
+    QTimer.singleShot(0, report_startup)
     
     # 运行应用
     sys.exit(app.exec_())
@@ -0,0 +1,121 @@
+"""图片异步加载模块，在工作线程中按显示尺寸解码图片，并缓存缩放后的QPixmap"""
+
+import os
+import zlib
+import base64
+from collections import OrderedDict
+from PyQt5.QtGui import QImage, QImageReader, QPixmap
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QBuffer, QByteArray, QIODevice, QSize, pyqtSignal
+
+
+class ScaledPixmapCache:
+    """缩放后QPixmap的LRU缓存，键为(图片来源, 宽, 高)"""
+
+    def __init__(self, capacity=16):
+        self.capacity = capacity
+        self._items = OrderedDict()
+
+    def get(self, key):
+        pixmap = self._items.get(key)
+        if pixmap is not None:
+            self._items.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        self._items[key] = pixmap
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+
+class _LoaderSignals(QObject):
+    loaded = pyqtSignal(int, object, QImage)  # 请求序号、缓存键、解码后的图片
+
+
+class _ImageDecodeTask(QRunnable):
+    """在线程池中解码图片，直接按目标尺寸解码以减少计算量"""
+
+    def __init__(self, request_id, cache_key, source, source_type, target_size, signals):
+        super().__init__()
+        self.request_id = request_id
+        self.cache_key = cache_key
+        self.source = source
+        self.source_type = source_type  # file / base64 / bytes
+        self.target_size = target_size
+        self.signals = signals
+
+    def run(self):
+        buffer = None
+        if self.source_type == "file":
+            reader = QImageReader(self.source)
+        else:
+            data = base64.b64decode(self.source) if self.source_type == "base64" else bytes(self.source)
+            buffer = QBuffer()
+            buffer.setData(QByteArray(data))
+            buffer.open(QIODevice.ReadOnly)
+            reader = QImageReader(buffer)
+        reader.setAutoTransform(True)
+
+        size = reader.size()
+        if size.isValid():
+            # 保持宽高比缩放到目标尺寸内，由解码器直接输出该尺寸
+            size.scale(self.target_size, Qt.KeepAspectRatio)
+            reader.setScaledSize(size)
+        image = reader.read()
+        if buffer is not None:
+            buffer.close()
+        self.signals.loaded.emit(self.request_id, self.cache_key, image)
+
+
+class ImageLoader(QObject):
+    """异步图片加载器
+
+    请求在线程池中解码为QImage，回到GUI线程后转换为QPixmap并缓存。
+    只有最新一次请求的结果会通过 image_ready 发出，过期结果会被丢弃。
+    """
+
+    image_ready = pyqtSignal(QPixmap)
+
+    def __init__(self, cache_capacity=16, parent=None):
+        super().__init__(parent)
+        self.cache = ScaledPixmapCache(cache_capacity)
+        self.thread_pool = QThreadPool.globalInstance()
+        self._signals = _LoaderSignals()
+        self._signals.loaded.connect(self._on_loaded)
+        self._request_id = 0
+
+    def load_file(self, image_path, target_size: QSize):
+        """加载图片文件并缩放到目标尺寸"""
+        try:
+            mtime = os.path.getmtime(image_path)
+        except OSError:
+            mtime = 0
+        self._load(("file", image_path, mtime), image_path, "file", target_size)
+
+    def load_base64(self, base64_data, target_size: QSize):
+        """加载Base64编码的图片并缩放到目标尺寸"""
+        self._load(("base64", hash(base64_data)), base64_data, "base64", target_size)
+
+    def load_bytes(self, image_bytes, target_size: QSize):
+        """加载内存中的图片字节（bytes-like）并缩放到目标尺寸"""
+        key = ("bytes", len(image_bytes), zlib.crc32(image_bytes))
+        self._load(key, image_bytes, "bytes", target_size)
+
+    def _load(self, source_key, source, source_type, target_size):
+        self._request_id += 1
+        cache_key = (source_key, target_size.width(), target_size.height())
+        pixmap = self.cache.get(cache_key)
+        if pixmap is not None:
+            self.image_ready.emit(pixmap)
+            return
+        task = _ImageDecodeTask(self._request_id, cache_key, source, source_type,
+                                QSize(target_size), self._signals)
+        self.thread_pool.start(task)
+
+    def _on_loaded(self, request_id, cache_key, image):
+        if image.isNull():
+            return
+        pixmap = QPixmap.fromImage(image)
+        self.cache.put(cache_key, pixmap)
+        if request_id == self._request_id:
+            self.image_ready.emit(pixmap)
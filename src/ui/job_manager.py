@@ -0,0 +1,111 @@
+"""单图处理任务管理，保证只有最新提交的截图在处理，过时的任务被中止并丢弃结果"""
+
+import time
+import logging
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from src.core.scheduler import PRIORITY_INTERACTIVE, get_scheduler
+from src.utils.config_loader import config_loader
+from src.utils.metrics import MetricsRegistry, RequestTrace
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认任务配置：正在处理时再次提交，等待 coalesce_ms 毫秒内没有更新的提交后才开始
+DEFAULT_JOBS_CONFIG = {
+    "coalesce_ms": 150
+}
+
+
+class InteractiveJob:
+    """界面提交的一次截图处理"""
+
+    def __init__(self, image_path):
+        self.image_path = image_path
+        # 从提交到结果显示的整体耗时，GUI线程补充 dispatch/render 阶段后记录
+        self.trace = RequestTrace("ui.process_image")
+        self.emitted_at = None
+        self.job = None  # 调度器中的任务
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+
+
+class ImageJobManager(QObject):
+    """界面中单图处理任务的管理器（最新优先）
+
+    任务以最高优先级交给全局调度器，不再为每张截图创建线程。同一时间只有一个有效任务：
+    提交新截图时，正在处理的任务被取消（上传中的请求体停止发送并关闭连接），
+    已返回的结果被丢弃。连续快速提交时只处理最后一张，
+    等待 coalesce_ms 毫秒内没有新的提交后才开始。
+    """
+    result_ready = pyqtSignal(dict, object)  # 处理结果、InteractiveJob
+    error = pyqtSignal(str, object)          # 错误信息、InteractiveJob
+    # 工作线程完成任务后转发到GUI线程
+    _job_done = pyqtSignal(object, object, object)
+
+    def __init__(self, parent=None, coalesce_ms=None, scheduler=None):
+        super().__init__(parent)
+        settings = dict(DEFAULT_JOBS_CONFIG)
+        settings.update(config_loader.get('jobs', {}))
+        self.coalesce_ms = int(coalesce_ms if coalesce_ms is not None else settings["coalesce_ms"])
+        self.scheduler = scheduler or get_scheduler()
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._start_pending)
+        self._job_done.connect(self._handle_job_done)
+        self._current = None
+        self._pending = None
+
+    def submit(self, image_path):
+        """提交截图处理，取代尚未完成的任务"""
+        self._pending = image_path
+        if self._current is None and not self._timer.isActive():
+            self._start_pending()
+            return
+        self._cancel_current()
+        self._timer.start(self.coalesce_ms)
+
+    def cancel(self):
+        """取消正在处理和等待开始的任务"""
+        self._timer.stop()
+        self._pending = None
+        self._cancel_current()
+
+    def is_busy(self):
+        """是否有正在处理或等待开始的任务"""
+        return self._current is not None or self._pending is not None
+
+    def _cancel_current(self):
+        if self._current is not None:
+            self._current.cancel()
+            self._current = None
+
+    def _start_pending(self):
+        image_path, self._pending = self._pending, None
+        if image_path is None:
+            return
+        interactive_job = InteractiveJob(image_path)
+
+        def on_done(job, result, error_msg):
+            # 在调度器的工作线程中调用
+            interactive_job.emitted_at = time.perf_counter()
+            self._job_done.emit(interactive_job, result, error_msg)
+
+        self._current = interactive_job
+        interactive_job.job = self.scheduler.submit(image_path, PRIORITY_INTERACTIVE, on_done)
+
+    def _handle_job_done(self, interactive_job, result, error_msg):
+        if interactive_job is not self._current:
+            # 已被取代或取消的任务，丢弃结果
+            return
+        self._current = None
+        job = interactive_job.job
+        interactive_job.trace.add_phase("queue", job.started_at - job.enqueued_at)
+        interactive_job.trace.add_phase("backend", interactive_job.emitted_at - job.started_at)
+        if error_msg is not None:
+            MetricsRegistry().record(interactive_job.trace.finish(error_msg))
+            self.error.emit(error_msg, interactive_job)
+        else:
+            self.result_ready.emit(result, interactive_job)
@@ -1,34 +1,74 @@
 import sys
 import os
-import json
-import base64
-import requests
+import time
+import uuid
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QPushButton, QLabel, QFileDialog, QTableWidget, 
-                             QTableWidgetItem, QHeaderView, QSplitter, QProgressDialog)
-from PyQt5.QtGui import QPixmap, QIcon
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from src.api.client import rf4_api, APIException
-# from core.image_processor import ImageProcessor
+                             QPushButton, QLabel, QFileDialog, QTableView, QLineEdit,
+                             QHeaderView, QSplitter, QProgressDialog)
+from PyQt5.QtGui import QIcon
+from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal
+from src.api.cancellation import CancelToken
+from src.ui.image_loader import ImageLoader
+from src.ui.results_model import CatchTableModel, CatchFilterProxyModel
+from src.ui.job_manager import ImageJobManager
+from src.core.local_backend import get_local_backend
+from src.core.scheduler import PRIORITY_BATCH, PRIORITY_WATCH, get_scheduler
+from src.core.history import HistoryWriter
+from src.core.watcher import ScreenshotWatcher
+from src.utils.config_loader import config_loader
+from src.utils.metrics import MetricsRegistry
 
-class ImageProcessThread(QThread):
-    """处理图像的线程"""
-    finished = pyqtSignal(dict)
-    error = pyqtSignal(str)
+# 状态栏延迟读数中各阶段的显示名称
+PHASE_LABELS = {
+    "connect": "连接",
+    "upload": "上传",
+    "server": "服务端",
+    "download": "下载",
+    "decompress": "解压",
+    "parse": "解析",
+    "image_fetch": "取图",
+    "decode": "解码",
+    "detection_ocr_wall": "检测/OCR",
+    "matching": "匹配",
+    "overlay": "叠加图",
+    "render": "渲染"
+}
+
+class BatchProcessThread(QThread):
+    """批量处理图像的线程"""
+    item_finished = pyqtSignal(str, dict)
+    item_error = pyqtSignal(str, str)
+    progress = pyqtSignal(int, int, float)  # 已完成数、总数、吞吐量（张/秒）
     
-    def __init__(self, image_path):
+    def __init__(self, image_paths, max_workers=None):
         super().__init__()
-        self.image_path = image_path
+        self.image_paths = image_paths
+        self.max_workers = max_workers
+        self.cancel_token = CancelToken()
+        
+    def cancel(self):
+        """取消批量处理，在途请求中止，剩余图片不再处理"""
+        self.cancel_token.cancel()
         
     def run(self):
-        try:
-            # 使用API层处理图片
-            result = rf4_api.process_image(self.image_path)
-            self.finished.emit(result)
-        except APIException as e:
-            self.error.emit(e.message)
-        except Exception as e:
-            self.error.emit(str(e))
+        total = len(self.image_paths)
+        done = 0
+        start = time.perf_counter()
+        # 以批量优先级交给全局调度器，不占用为界面任务保留的工作线程
+        scheduler = get_scheduler()
+        for path, result, error in scheduler.process_images(self.image_paths, cancel_token=self.cancel_token,
+                                                            priority=PRIORITY_BATCH):
+            done += 1
+            if error is None:
+                self.item_finished.emit(path, result)
+            else:
+                self.item_error.emit(path, error)
+            elapsed = time.perf_counter() - start
+            self.progress.emit(done, total, done / elapsed if elapsed > 0 else 0.0)
+
+class WatchSignals(QObject):
+    """把监控工作线程中的结果转发到GUI线程"""
+    result = pyqtSignal(str, object, object)  # 图片路径、处理结果、错误信息
 
 class MainWindow(QMainWindow):
 
@@ -36,10 +76,48 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.setWindowTitle("俄罗斯钓鱼4助手")
         self.setMinimumSize(1920, 1080)  # 调大窗口尺寸
-        # self.image_processor = ImageProcessor()  # 添加图像处理器
+        # 图片在工作线程中解码，缩放结果缓存复用
+        self.image_loader = ImageLoader(parent=self)
+        self.image_loader.image_ready.connect(self.image_label_set_pixmap)
+        self.metrics = MetricsRegistry()
         self.setup_ui()
-        self.process_thread = None
+        # 单图处理只保留最新提交的任务，过时的任务被取消
+        self.job_manager = ImageJobManager(self)
+        self.job_manager.result_ready.connect(self.handle_process_result)
+        self.job_manager.error.connect(self.handle_process_error)
+        self.batch_thread = None
         self.progress_dialog = None
+        self.current_image_path = None
+        
+        # 渔获历史在后台线程中批量写入SQLite
+        self.history_writer = HistoryWriter(uuid.uuid4().hex)
+        
+        # 截图文件夹监控
+        self.watcher = None
+        self.watch_signals = WatchSignals()
+        self.watch_signals.result.connect(self.handle_watch_result)
+        
+        # 本地推理模式下提前预热进程池
+        local_backend = get_local_backend()
+        if local_backend is not None:
+            local_backend.start_in_background()
+    
+    def closeEvent(self, event):
+        """关闭窗口时取消处理任务、停止监控、写入剩余历史记录并释放本地推理进程池"""
+        self.job_manager.cancel()
+        if self.batch_thread is not None and self.batch_thread.isRunning():
+            self.batch_thread.cancel()
+            self.batch_thread.wait()
+        if self.watcher is not None:
+            self.watcher.stop()
+        # 工作线程可能仍在等待服务端响应，不等待其退出
+        get_scheduler().shutdown(wait=False)
+        self.history_writer.close()
+        local_backend = get_local_backend()
+        if local_backend is not None:
+            local_backend.shutdown()
+        self.metrics.export()
+        super().closeEvent(event)
         
     def setup_ui(self):
         # 创建中央部件
@@ -71,6 +149,19 @@ class MainWindow(QMainWindow):
         self.upload_btn.clicked.connect(self.upload_image)
         image_layout.addWidget(self.upload_btn)
         
+        # 批量处理文件夹按钮
+        self.folder_btn = QPushButton("处理文件夹")
+        self.folder_btn.setMinimumHeight(40)
+        self.folder_btn.clicked.connect(self.process_folder)
+        image_layout.addWidget(self.folder_btn)
+        
+        # 监控截图文件夹按钮
+        self.watch_btn = QPushButton("监控截图文件夹")
+        self.watch_btn.setMinimumHeight(40)
+        self.watch_btn.setCheckable(True)
+        self.watch_btn.toggled.connect(self.toggle_watch)
+        image_layout.addWidget(self.watch_btn)
+        
         # 限制图片显示区域宽度
         image_widget.setMaximumWidth(960)
         
@@ -93,9 +184,19 @@ class MainWindow(QMainWindow):
         results_label.setStyleSheet("font-size: 16px; font-weight: bold;")
         results_layout.addWidget(results_label)
         
-        # 表格显示结果
-        self.results_table = QTableWidget(0, 4)  # 修改为4列：新鲜度、鱼类、重量、售价
-        self.results_table.setHorizontalHeaderLabels(["新鲜度", "鱼类名称", "重量", "售价"])
+        # 按鱼种过滤
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("按鱼类名称过滤...")
+        results_layout.addWidget(self.filter_edit)
+        
+        # 表格显示结果（4列：新鲜度、鱼类、重量、售价），数据由模型按列存储
+        self.results_model = CatchTableModel(self)
+        self.results_proxy = CatchFilterProxyModel(self)
+        self.results_proxy.setSourceModel(self.results_model)
+        self.filter_edit.textChanged.connect(self.results_proxy.setFilterFixedString)
+        self.results_table = QTableView()
+        self.results_table.setModel(self.results_proxy)
+        self.results_table.setSortingEnabled(True)
         # 设置表格列宽
         header = self.results_table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Stretch)  # 所有列等宽拉伸
@@ -106,12 +207,21 @@ class MainWindow(QMainWindow):
         
         results_layout.addWidget(self.results_table)
         
+        # 汇总统计
+        self.totals_label = QLabel()
+        results_layout.addWidget(self.totals_label)
+        
         splitter.addWidget(results_widget)
         main_layout.addWidget(splitter)
         
-        # 底部状态区域
+        # 底部状态区域，右侧显示最近一次请求的延迟
+        status_layout = QHBoxLayout()
         self.status_label = QLabel("准备就绪")
-        main_layout.addWidget(self.status_label)
+        status_layout.addWidget(self.status_label)
+        status_layout.addStretch()
+        self.latency_label = QLabel()
+        status_layout.addWidget(self.latency_label)
+        main_layout.addLayout(status_layout)
 
         # 设置初始宽度比例 (左:右 = 2:3)
         # splitter.setSizes([2, 3])
@@ -121,77 +231,232 @@ class MainWindow(QMainWindow):
             self, "选择截图", "", "图片文件 (*.png *.jpg *.jpeg)"
         )
         if file_path:
+            self.current_image_path = file_path
             self.status_label.setText(f"正在处理图片: {os.path.basename(file_path)}")
             self.display_image(file_path)
             self.process_image(file_path)
     
-    def display_image(self, image_path):
-        pixmap = QPixmap(image_path)
-        scaled_pixmap = pixmap.scaled(
-            self.image_label.width(), 
-            self.image_label.height(),
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation
+    def process_folder(self):
+        """批量处理文件夹中的所有截图"""
+        folder = QFileDialog.getExistingDirectory(self, "选择截图文件夹")
+        if not folder:
+            return
+        image_paths = sorted(
+            os.path.join(folder, name) for name in os.listdir(folder)
+            if os.path.splitext(name)[1].lower() in ('.png', '.jpg', '.jpeg')
         )
-        self.image_label.setPixmap(scaled_pixmap)
+        if not image_paths:
+            self.status_label.setText("文件夹中没有图片")
+            return
+        
+        self.results_model.clear()
+        self.folder_btn.setEnabled(False)
+        
+        self.batch_thread = BatchProcessThread(image_paths)
+        self.show_progress_dialog("正在批量处理图片...", len(image_paths), self.cancel_batch)
+        self.batch_thread.item_finished.connect(self.handle_batch_item)
+        self.batch_thread.item_error.connect(self.handle_batch_error)
+        self.batch_thread.progress.connect(self.handle_batch_progress)
+        self.batch_thread.finished.connect(self.handle_batch_finished)
+        self.batch_thread.start()
+    
+    def handle_batch_item(self, image_path, result):
+        """处理批量任务中单张图片的结果"""
+        if "fishes" in result:
+            self.append_results_table(result["fishes"])
+            self.history_writer.submit(image_path, result["fishes"])
+        self.update_latency_label(result.get("metrics"))
+    
+    def handle_batch_error(self, image_path, error_msg):
+        """处理批量任务中单张图片的错误"""
+        self.status_label.setText(f"处理失败 {os.path.basename(image_path)}: {error_msg}")
+    
+    def handle_batch_progress(self, done, total, throughput):
+        """更新批量处理进度"""
+        if self.progress_dialog is not None:
+            self.progress_dialog.setValue(done)
+            self.progress_dialog.setLabelText(f"已处理 {done}/{total} 张 ({throughput:.2f} 张/秒)")
+        self.status_label.setText(f"批量处理中: {done}/{total}，吞吐量 {throughput:.2f} 张/秒")
+    
+    def cancel_batch(self):
+        """取消批量处理，在途请求中止后线程结束"""
+        self.close_progress_dialog()
+        self.batch_thread.cancel()
+        self.status_label.setText("正在取消批量处理...")
+    
+    def handle_batch_finished(self):
+        """批量处理结束"""
+        self.close_progress_dialog()
+        self.folder_btn.setEnabled(True)
+        if self.batch_thread.cancel_token.cancelled:
+            self.status_label.setText("批量处理已取消")
+        else:
+            self.status_label.setText(f"批量处理完成，共 {len(self.batch_thread.image_paths)} 张")
+    
+    def toggle_watch(self, checked):
+        """开始或停止监控截图文件夹"""
+        if not checked:
+            if self.watcher is not None:
+                self.watcher.stop()
+                self.watcher = None
+            self.watch_btn.setText("监控截图文件夹")
+            self.status_label.setText("已停止监控")
+            return
+        
+        directory = config_loader.get('watch', {}).get('directory') or \
+            QFileDialog.getExistingDirectory(self, "选择截图文件夹")
+        if not directory:
+            self.watch_btn.setChecked(False)
+            return
+        
+        self.watcher = ScreenshotWatcher(self.watch_signals.result.emit, directory,
+                                         backend=get_scheduler().backend_for(PRIORITY_WATCH))
+        try:
+            self.watcher.start()
+        except ValueError as e:
+            self.watcher = None
+            self.watch_btn.setChecked(False)
+            self.status_label.setText(str(e))
+            return
+        self.watch_btn.setText("停止监控")
+        self.status_label.setText(f"正在监控: {directory}")
+    
+    def handle_watch_result(self, image_path, result, error_msg):
+        """处理监控到的新截图的结果"""
+        if error_msg is not None:
+            self.status_label.setText(f"处理失败 {os.path.basename(image_path)}: {error_msg}")
+            return
+        if "fishes" in result:
+            self.append_results_table(result["fishes"])
+            self.history_writer.submit(image_path, result["fishes"])
+        self.update_latency_label(result.get("metrics"))
+        self.status_label.setText(f"已处理新截图: {os.path.basename(image_path)}")
+    
+    def display_image(self, image_path):
+        self.image_loader.load_file(image_path, self.image_label.size())
     
     def display_base64_image(self, base64_data):
         """显示Base64编码的图片"""
-        pixmap = QPixmap()
-        pixmap.loadFromData(base64.b64decode(base64_data))
-        scaled_pixmap = pixmap.scaled(
-            self.image_label.width(), 
-            self.image_label.height(),
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation
-        )
-        self.image_label.setPixmap(scaled_pixmap)
+        self.image_loader.load_base64(base64_data, self.image_label.size())
     
-    def process_image(self, image_path):
-        """调用后端处理图片"""
-        # 显示进度对话框
-        self.progress_dialog = QProgressDialog("正在处理图片...", "取消", 0, 0, self)
+    def image_label_set_pixmap(self, pixmap):
+        """显示加载完成的图片"""
+        self.image_label.setPixmap(pixmap)
+    
+    def show_progress_dialog(self, text, maximum, on_cancel):
+        """显示进度对话框，点击取消时调用 on_cancel"""
+        self.close_progress_dialog()
+        self.progress_dialog = QProgressDialog(text, "取消", 0, maximum, self)
         self.progress_dialog.setWindowTitle("请稍候")
         self.progress_dialog.setWindowModality(Qt.WindowModal)
         # 设置对话框尺寸
         self.progress_dialog.resize(400, 150)  # 宽400，高150
+        self.progress_dialog.canceled.connect(on_cancel)
         self.progress_dialog.show()
-        
-        # 创建并启动处理线程
-        self.process_thread = ImageProcessThread(image_path)
-        self.process_thread.finished.connect(self.handle_process_result)
-        self.process_thread.error.connect(self.handle_process_error)
-        self.process_thread.start()
     
-    def handle_process_result(self, result):
+    def close_progress_dialog(self):
+        """关闭进度对话框（关闭时会发出canceled信号，先断开以免误取消）"""
+        if self.progress_dialog is None:
+            return
+        self.progress_dialog.canceled.disconnect()
+        self.progress_dialog.close()
+        self.progress_dialog = None
+    
+    def process_image(self, image_path):
+        """调用后端处理图片，尚未完成的上一张截图会被取消"""
+        self.show_progress_dialog("正在处理图片...", 0, self.cancel_processing)
+        self.job_manager.submit(image_path)
+    
+    def cancel_processing(self):
+        """取消当前截图的处理"""
+        self.close_progress_dialog()
+        self.job_manager.cancel()
+        self.status_label.setText("已取消处理")
+    
+    def handle_process_result(self, result, job):
         """处理API返回的结果"""
-        if self.progress_dialog:
-            self.progress_dialog.close()
-        
-        # 显示处理后的图片
-        if "image" in result:
-            self.display_base64_image(result["image"])
+        trace = job.trace
+        trace.add_phase("dispatch", time.perf_counter() - job.emitted_at)
+        self.close_progress_dialog()
         
-        # 更新鱼类数据表格
-        if "fishes" in result:
-            self.update_results_table(result["fishes"])
+        with trace.phase("render"):
+            # 显示处理后的图片（优先使用二进制传输的图片）
+            if "image_bytes" in result:
+                self.image_loader.load_bytes(result["image_bytes"], self.image_label.size())
+            elif "image" in result:
+                self.display_base64_image(result["image"])
             
+            # 更新鱼类数据表格
+            if "fishes" in result:
+                self.update_results_table(result["fishes"])
+                self.history_writer.submit(job.image_path, result["fishes"])
+        
+        self.metrics.record(trace.finish())
+        self.update_latency_label(result.get("metrics"), trace)
         self.status_label.setText("处理完成")
     
-    def handle_process_error(self, error_msg):
+    def handle_process_error(self, error_msg, job=None):
         """处理API错误"""
-        if self.progress_dialog:
-            self.progress_dialog.close()
+        self.close_progress_dialog()
         self.status_label.setText(f"处理失败: {error_msg}")
     
+    def update_latency_label(self, metrics, ui_trace=None):
+        """在状态栏显示最近一次请求的总延迟、各阶段耗时和滚动分位数
+        
+        Args:
+            metrics: 处理结果中的 metrics 字段（后端各阶段耗时）
+            ui_trace: 界面侧的RequestTrace，包含从提交到显示的总耗时和渲染耗时
+        """
+        if not metrics and ui_trace is None:
+            return
+        phases = dict((metrics or {}).get("phases_ms", {}))
+        if ui_trace is not None:
+            total_ms = ui_trace.total * 1000
+            phases["render"] = ui_trace.phases.get("render", 0.0) * 1000
+            name = ui_trace.name
+        else:
+            total_ms = metrics.get("total_ms") or 0.0
+            name = metrics["name"]
+        parts = [f"{label} {phases[key]:.0f}" for key, label in PHASE_LABELS.items() if key in phases]
+        text = f"延迟 {total_ms:.0f} ms"
+        if parts:
+            text += f"（{' / '.join(parts)}）"
+        quantiles = self.metrics.get_quantiles(name)
+        if quantiles:
+            text += f"  p50 {quantiles['p50']:.0f} ms  p95 {quantiles['p95']:.0f} ms"
+        self.latency_label.setText(text)
+        self.latency_label.setToolTip(self.backend_stats_text())
+    
+    def backend_stats_text(self):
+        """远程模式下各后端的往返时间、错误率和健康状态，只有一个后端时返回空字符串"""
+        if get_local_backend() is not None:
+            return ""
+        from src.api.client import APIConfig
+        backends = APIConfig().get_backend_pool()
+        if len(backends) < 2:
+            return ""
+        lines = []
+        for stats in backends.get_stats():
+            rtt = f"{stats['rtt_ms']:.0f} ms" if stats["rtt_ms"] is not None else "未测"
+            state = "正常" if stats["healthy"] else "停用"
+            marker = "▶ " if stats["current"] else "   "
+            lines.append(f"{marker}{stats['url']}  {rtt}  错误率 {stats['error_rate']:.0%}  {state}")
+        return "\n".join(lines)
+    
     def update_results_table(self, fish_data):
         """更新结果表格"""
-        self.results_table.setRowCount(0)  # 清空表格
-        
-        for fish in fish_data:
-            row_position = self.results_table.rowCount()
-            self.results_table.insertRow(row_position)
-            
-            # 添加鱼的信息（新鲜度、鱼类名称、重量、售价）
-            for col, value in enumerate(fish):
-                self.results_table.setItem(row_position, col, QTableWidgetItem(value))
\ No newline at end of file
+        self.results_model.clear()  # 清空表格
+        self.append_results_table(fish_data)
+    
+    def append_results_table(self, fish_data):
+        """向结果表格追加数据"""
+        self.results_model.append_fishes(fish_data)
+        self.update_totals_label()
+    
+    def update_totals_label(self):
+        """更新汇总统计"""
+        model = self.results_model
+        self.totals_label.setText(
+            f"共 {model.rowCount()} 条，{len(model.species_totals)} 种鱼，"
+            f"总重量 {model.total_weight:g}，总售价 {model.total_price:g}"
+        )
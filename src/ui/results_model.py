@@ -0,0 +1,107 @@
+"""渔获结果表格模型，按列存储数据并支持增量追加、排序过滤和汇总统计"""
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QVariant
+from src.core.normalizer import get_normalizer
+
+# 表格列：新鲜度、鱼类名称、重量、售价
+COLUMNS = ["新鲜度", "鱼类名称", "重量", "售价"]
+SPECIES_COLUMN = 1
+WEIGHT_COLUMN = 2
+PRICE_COLUMN = 3
+
+# 排序使用的数值角色
+SortRole = Qt.UserRole + 1
+
+
+class CatchTableModel(QAbstractTableModel):
+    """渔获结果表格模型
+
+    每列数据保存在一个列表中，不为每个单元格创建对象；
+    新行通过 beginInsertRows 增量追加，每追加一行以O(1)更新各鱼种的汇总。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._columns = [[] for _ in COLUMNS]
+        self._weights = []
+        self._prices = []
+        # 鱼种 -> [条数, 总重量, 总售价]
+        self.species_totals = {}
+        self.total_weight = 0.0
+        self.total_price = 0.0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._weights)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        row, column = index.row(), index.column()
+        if role == Qt.DisplayRole:
+            return self._columns[column][row]
+        if role == SortRole:
+            if column == WEIGHT_COLUMN:
+                return self._weights[row] if self._weights[row] is not None else -1.0
+            if column == PRICE_COLUMN:
+                return self._prices[row] if self._prices[row] is not None else -1.0
+            return self._columns[column][row]
+        return QVariant()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section]
+        return QVariant()
+
+    def append_fishes(self, fish_data):
+        """追加一批渔获记录，每条记录为按列排列的OCR文本列表
+
+        鱼种名称归一化为词典中的标准名，重量（千克）和售价解析为数值用于排序和汇总，
+        重量和售价列仍显示OCR原文。
+        """
+        records = get_normalizer().normalize_all(fish_data)
+        if not records:
+            return
+        first = len(self._weights)
+        self.beginInsertRows(QModelIndex(), first, first + len(records) - 1)
+        for fish, record in zip(fish_data, records):
+            row = list(fish[:len(COLUMNS)]) + [""] * (len(COLUMNS) - len(fish))
+            row[0] = record.freshness or ""
+            row[SPECIES_COLUMN] = record.species
+            for column, value in enumerate(row):
+                self._columns[column].append(value)
+            self._weights.append(record.weight)
+            self._prices.append(record.price)
+            self._add_to_totals(record.species, record.weight, record.price)
+        self.endInsertRows()
+
+    def _add_to_totals(self, species, weight, price):
+        totals = self.species_totals.setdefault(species, [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += weight or 0.0
+        totals[2] += price or 0.0
+        self.total_weight += weight or 0.0
+        self.total_price += price or 0.0
+
+    def clear(self):
+        """清空所有记录和汇总"""
+        self.beginResetModel()
+        self._columns = [[] for _ in COLUMNS]
+        self._weights = []
+        self._prices = []
+        self.species_totals = {}
+        self.total_weight = 0.0
+        self.total_price = 0.0
+        self.endResetModel()
+
+
+class CatchFilterProxyModel(QSortFilterProxyModel):
+    """按鱼种名称过滤、按数值排序重量和售价的代理模型"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(SortRole)
+        self.setFilterKeyColumn(SPECIES_COLUMN)
+        self.setFilterCaseSensitivity(Qt.CaseInsensitive)
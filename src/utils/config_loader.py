@@ -110,5 +110,11 @@ class ConfigLoader:
         """获取所有配置"""
         return self.config.copy()
 
-# 创建全局配置加载器实例，方便导入使用
-config_loader = ConfigLoader() 
\ No newline at end of file
+class _LazyConfigLoader:
+    """配置加载器代理，首次访问属性时才创建目录并读取配置"""
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(ConfigLoader(), name)
+
+# 全局配置加载器，方便导入使用
+config_loader = _LazyConfigLoader()
@@ -0,0 +1,53 @@
+"""通用辅助函数"""
+
+import re
+from concurrent.futures import Executor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+_NUMBER_PATTERN = re.compile(r'\d+(?:[.,]\d+)?')
+
+
+def parse_number(text: Optional[str]) -> Optional[float]:
+    """从OCR文本中提取数值，无法解析时返回None"""
+    match = _NUMBER_PATTERN.search(text or "")
+    if match is None:
+        return None
+    return float(match.group().replace(',', '.'))
+
+
+def iter_bounded(executor: Executor, func: Callable, items: Iterable,
+                 max_in_flight: int) -> Iterator[Tuple[Any, Any, BaseException]]:
+    """在执行器中并发执行任务，按完成顺序返回结果
+
+    只保持至多 max_in_flight 个任务在途，输入可以是任意长度的迭代器，
+    内存占用与输入总数无关。
+
+    Args:
+        executor: 线程池或进程池
+        func: 对每个输入项调用的函数
+        items: 输入项
+        max_in_flight: 最大在途任务数
+
+    Yields:
+        (输入项, 结果, 异常) 元组，成功时异常为None
+    """
+    items = iter(items)
+    pending = {}
+
+    def submit_next() -> bool:
+        for item in items:
+            pending[executor.submit(func, item)] = item
+            return True
+        return False
+
+    for _ in range(max(1, max_in_flight)):
+        if not submit_next():
+            break
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            item = pending.pop(future)
+            error = future.exception()
+            yield item, (None if error else future.result()), error
+            submit_next()
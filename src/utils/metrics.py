@@ -0,0 +1,280 @@
+"""请求耗时指标模块，按阶段记录每次请求的耗时和字节数，并导出滚动直方图"""
+
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Tuple
+from src.utils.config_loader import config_loader
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认指标配置，buckets 为直方图桶上界（秒）
+DEFAULT_METRICS_CONFIG = {
+    "enabled": True,
+    "window": 512,
+    "export_interval": 30.0,
+    "buckets": [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+}
+
+# 窗口内统计的分位数
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class RequestTrace:
+    """单次请求的阶段耗时和字节数记录
+
+    同一阶段多次出现时耗时累加；finish() 之前 total 为None。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.bytes: Dict[str, int] = {}
+        self.total: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """记录 with 块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        """直接记录一个阶段的耗时（秒）"""
+        self.phases[name] = self.phases.get(name, 0.0) + max(0.0, seconds)
+
+    def add_bytes(self, kind: str, count: int) -> None:
+        """记录字节数，如 upload / download"""
+        self.bytes[kind] = self.bytes.get(kind, 0) + int(count)
+
+    def finish(self, error: Optional[str] = None, total: Optional[float] = None) -> "RequestTrace":
+        """结束计时，total 未指定时取从创建到现在的耗时"""
+        self.total = total if total is not None else time.perf_counter() - self.started
+        self.error = error
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典，耗时单位为毫秒"""
+        return {
+            "name": self.name,
+            "total_ms": round(self.total * 1000, 3) if self.total is not None else None,
+            "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+            "bytes": dict(self.bytes),
+            "error": self.error
+        }
+
+
+class RollingHistogram:
+    """累计直方图加最近 window 个样本的滑动窗口
+
+    桶计数、总数和总和单调递增，符合Prometheus直方图语义；
+    分位数只按滑动窗口计算，反映最近的延迟水平。
+    """
+
+    def __init__(self, buckets: List[float], window: int):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantiles(self) -> Dict[float, float]:
+        """滑动窗口内的分位数（秒）"""
+        values = sorted(self.recent)
+        if not values:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: values[min(len(values) - 1, int(q * len(values)))] for q in QUANTILES}
+
+    def snapshot(self) -> Dict[str, Any]:
+        quantiles = self.quantiles()
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum * 1000, 3),
+            "window": len(self.recent),
+            "window_max_ms": round(max(self.recent) * 1000, 3) if self.recent else 0.0,
+            **{f"p{int(q * 100)}_ms": round(value * 1000, 3) for q, value in quantiles.items()},
+            "buckets": buckets
+        }
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """请求指标汇总（单例）
+
+    每条 RequestTrace 按 (请求名, 阶段) 写入滚动直方图，字节数和错误数累计。
+    距上次导出超过 export_interval 秒时，把 metrics.json 和 metrics.prom
+    写入配置目录，供外部查看或由Prometheus的textfile采集器读取。
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(MetricsRegistry, cls).__new__(cls)
+            cls._instance._init_registry()
+        return cls._instance
+
+    def _init_registry(self):
+        settings = dict(DEFAULT_METRICS_CONFIG)
+        settings.update(config_loader.get('metrics', {}))
+        self.enabled = bool(settings["enabled"])
+        self.window = max(1, int(settings["window"]))
+        self.export_interval = float(settings["export_interval"])
+        self.buckets = sorted(float(bound) for bound in settings["buckets"])
+        self.export_dir = config_loader.config_dir
+
+        self._histograms: Dict[str, Dict[str, RollingHistogram]] = {}
+        self._bytes: Dict[str, Dict[str, int]] = {}
+        self._requests: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        # 瞬时值，如队列深度：名称 -> {标签: 值}
+        self._gauges: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+        self._lock = threading.Lock()
+        self._last_export = time.monotonic()
+        self._dirty = False
+
+    def record(self, trace: RequestTrace) -> None:
+        """记录一次已结束的请求"""
+        if not self.enabled:
+            return
+        if trace.total is None:
+            trace.finish()
+        with self._lock:
+            histograms = self._histograms.setdefault(trace.name, {})
+            for phase, seconds in (("total", trace.total), *trace.phases.items()):
+                histogram = histograms.get(phase)
+                if histogram is None:
+                    histogram = histograms[phase] = RollingHistogram(self.buckets, self.window)
+                histogram.observe(seconds)
+            byte_totals = self._bytes.setdefault(trace.name, {})
+            for kind, count in trace.bytes.items():
+                byte_totals[kind] = byte_totals.get(kind, 0) + count
+            self._requests[trace.name] = self._requests.get(trace.name, 0) + 1
+            if trace.error is not None:
+                self._errors[trace.name] = self._errors.get(trace.name, 0) + 1
+            self._dirty = True
+            due = time.monotonic() - self._last_export >= self.export_interval
+        if due:
+            self.export()
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        """设置瞬时指标的当前值"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+            self._dirty = True
+
+    def get_quantiles(self, name: str, phase: str = "total") -> Dict[str, float]:
+        """获取某个请求阶段在滑动窗口内的分位数（毫秒），没有数据时返回空字典"""
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(phase)
+            if histogram is None or not histogram.recent:
+                return {}
+            return {f"p{int(q * 100)}": value * 1000 for q, value in histogram.quantiles().items()}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """获取全部指标"""
+        with self._lock:
+            requests = {}
+            for name, histograms in self._histograms.items():
+                requests[name] = {
+                    "count": self._requests.get(name, 0),
+                    "errors": self._errors.get(name, 0),
+                    "bytes": dict(self._bytes.get(name, {})),
+                    "phases": {phase: histogram.snapshot() for phase, histogram in histograms.items()}
+                }
+            gauges = {name: [{"labels": dict(labels), "value": value} for labels, value in values.items()]
+                      for name, values in self._gauges.items()}
+            return {"generated_at": time.time(), "window": self.window, "requests": requests, "gauges": gauges}
+
+    def to_prometheus(self) -> str:
+        """Prometheus文本格式"""
+        lines = [
+            "# HELP rf4_request_phase_seconds 请求各阶段耗时",
+            "# TYPE rf4_request_phase_seconds histogram"
+        ]
+        quantile_lines = [
+            "# HELP rf4_request_phase_window_seconds 最近请求各阶段耗时的分位数",
+            "# TYPE rf4_request_phase_window_seconds gauge"
+        ]
+        with self._lock:
+            for name, histograms in sorted(self._histograms.items()):
+                for phase, histogram in sorted(histograms.items()):
+                    labels = f'request="{_escape_label(name)}",phase="{_escape_label(phase)}"'
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'rf4_request_phase_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f'rf4_request_phase_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                    lines.append(f'rf4_request_phase_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+                    lines.append(f'rf4_request_phase_seconds_count{{{labels}}} {histogram.count}')
+                    for q, value in histogram.quantiles().items():
+                        quantile_lines.append(f'rf4_request_phase_window_seconds{{{labels},quantile="{q}"}} {value:.6f}')
+
+            lines += quantile_lines
+            lines += ["# HELP rf4_request_bytes_total 请求传输字节数", "# TYPE rf4_request_bytes_total counter"]
+            for name, byte_totals in sorted(self._bytes.items()):
+                for kind, count in sorted(byte_totals.items()):
+                    lines.append(f'rf4_request_bytes_total{{request="{_escape_label(name)}",'
+                                 f'kind="{_escape_label(kind)}"}} {count}')
+            lines += ["# HELP rf4_requests_total 请求次数", "# TYPE rf4_requests_total counter"]
+            for name, count in sorted(self._requests.items()):
+                lines.append(f'rf4_requests_total{{request="{_escape_label(name)}"}} {count}')
+            lines += ["# HELP rf4_request_errors_total 失败请求次数", "# TYPE rf4_request_errors_total counter"]
+            for name, count in sorted(self._errors.items()):
+                lines.append(f'rf4_request_errors_total{{request="{_escape_label(name)}"}} {count}')
+            for name, values in sorted(self._gauges.items()):
+                lines.append(f"# TYPE rf4_{name} gauge")
+                for labels, value in sorted(values.items()):
+                    label_text = ",".join(f'{key}="{_escape_label(str(label))}"' for key, label in labels)
+                    lines.append(f"rf4_{name}{{{label_text}}} {value}" if label_text else f"rf4_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: Optional[str] = None) -> None:
+        """把指标写入 metrics.json 和 metrics.prom，先写临时文件再替换"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._last_export = time.monotonic()
+            if not self._dirty:
+                return
+            self._dirty = False
+        directory = directory or self.export_dir
+        outputs = {
+            "metrics.json": json.dumps(self.snapshot(), ensure_ascii=False, indent=2),
+            "metrics.prom": self.to_prometheus()
+        }
+        try:
+            for filename, content in outputs.items():
+                path = os.path.join(directory, filename)
+                with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                    f.write(content)
+                os.replace(path + '.tmp', path)
+        except OSError as e:
+            logger.error(f"导出指标失败: {e}")
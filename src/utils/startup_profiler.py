@@ -0,0 +1,46 @@
+"""启动耗时分析工具，记录从进程启动到首个窗口显示的各阶段耗时"""
+
+import time
+import logging
+from typing import List, Tuple
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class StartupProfiler:
+    """启动耗时分析器
+
+    在启动流程中依次调用 mark() 记录阶段结束点，
+    窗口显示后调用 report() 输出各阶段耗时和总耗时。
+    """
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self._last = self.start_time
+        self.reported = False
+
+    def mark(self, phase: str) -> None:
+        """记录一个阶段的结束"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def total(self) -> float:
+        """从开始到最后一个阶段的总耗时（秒）"""
+        return self._last - self.start_time
+
+    def report(self) -> str:
+        """输出启动耗时报告"""
+        lines = [f"首个窗口显示耗时: {self.total() * 1000:.1f} ms"]
+        for phase, elapsed in self.phases:
+            lines.append(f"  {phase}: {elapsed * 1000:.1f} ms")
+        text = "\n".join(lines)
+        logger.info(text)
+        self.reported = True
+        return text
+
+
+# 全局启动分析器，模块首次导入时开始计时
+startup_profiler = StartupProfiler()
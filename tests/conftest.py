@@ -0,0 +1,29 @@
+"""测试公共配置：使用临时配置目录，避免读写用户的 ~/.rf4_helper"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["RF4_CONFIG_DIR"] = tempfile.mkdtemp(prefix="rf4-test-config-")
+
+from benchmarks.stub_server import StubServer, StubSettings  # noqa: E402
+
+
+@pytest.fixture
+def stub_server():
+    """启动模拟后端的工厂，测试结束时全部关闭"""
+    servers = []
+
+    def start(**settings):
+        defaults = {"latency": 0.0, "jitter": 0.0, "payload_bytes": 1024}
+        defaults.update(settings)
+        server = StubServer(StubSettings(**defaults)).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
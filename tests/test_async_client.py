@@ -0,0 +1,108 @@
+"""AsyncRF4APIClient 对本地模拟后端的并发上限、超时和错误映射"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from src.api.async_client import AsyncRF4APIClient, DEFAULT_ASYNC_CONFIG
+from src.api.client import APIConfig
+from src.api.exceptions import APIException
+
+
+@pytest.fixture(autouse=True)
+def health_endpoint(monkeypatch):
+    monkeypatch.setitem(APIConfig().endpoints, "health", {"path": "/health", "method": "GET"})
+
+
+def make_client(base_url, **overrides):
+    config = dict(DEFAULT_ASYNC_CONFIG)
+    config.update(overrides)
+    return AsyncRF4APIClient(base_url, config)
+
+
+def run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_get_returns_json(stub_server):
+    server = stub_server()
+
+    async def main():
+        async with make_client(server.base_url) as client:
+            return await client.get("health")
+
+    assert run(main()) == {"status": "ok"}
+
+
+def test_concurrency_limited_by_semaphore(stub_server):
+    server = stub_server(latency=0.2)
+
+    async def main():
+        async with make_client(server.base_url, max_concurrency=2, max_connections_per_host=16) as client:
+            return await asyncio.gather(*(client.get("health") for _ in range(6)))
+
+    results = run(main())
+    assert len(results) == 6
+    assert server.stats.requests == 6
+    assert server.stats.max_in_flight == 2
+
+
+def test_connection_limit_per_host(stub_server):
+    server = stub_server(latency=0.2)
+
+    async def main():
+        async with make_client(server.base_url, max_concurrency=8, max_connections_per_host=3) as client:
+            await asyncio.gather(*(client.get("health") for _ in range(6)))
+
+    run(main())
+    assert server.stats.max_in_flight == 3
+
+
+def test_timeout_maps_to_api_exception(stub_server):
+    server = stub_server(latency=1.0)
+
+    async def main():
+        async with make_client(server.base_url, timeouts={"total": 0.2}) as client:
+            await client.get("health")
+
+    with pytest.raises(APIException, match="请求超时"):
+        run(main())
+
+
+def test_server_error_maps_status_and_message(stub_server):
+    server = stub_server(error_rate=1.0)
+
+    async def main():
+        async with make_client(server.base_url) as client:
+            await client.get("health")
+
+    with pytest.raises(APIException) as info:
+        run(main())
+    assert info.value.status_code == 500
+    assert "模拟服务端错误" in info.value.message
+
+
+def test_connection_refused_maps_to_api_exception(stub_server):
+    server = stub_server()
+    base_url = server.base_url
+    server.stop()
+
+    async def main():
+        async with make_client(base_url) as client:
+            await client.get("health")
+
+    with pytest.raises(APIException, match="请求失败"):
+        run(main())
+
+
+def test_unknown_endpoint(stub_server):
+    server = stub_server()
+
+    async def main():
+        async with make_client(server.base_url) as client:
+            await client.get("no_such_endpoint")
+
+    with pytest.raises(APIException, match="未找到端点配置"):
+        run(main())
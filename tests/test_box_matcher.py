@@ -0,0 +1,98 @@
+"""网格索引匹配与逐对比较的结果一致性（含边界相接和零面积框）"""
+
+import json
+import os
+
+import pytest
+
+from src.core.box_matcher import (CardGridIndex, location_to_rect, match_words_to_cards,
+                                  match_words_to_cards_naive, rects_intersect)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "box_matcher_cases.json")
+
+with open(FIXTURES, encoding="utf-8") as f:
+    CASES = json.load(f)
+
+
+class RectBox:
+    """以闭区间矩形相交作为重叠判断的参考框"""
+
+    def __init__(self, left, top, width, height, *args):
+        self.rect = (left, top, width, height)
+
+    def is_overlapping(self, other):
+        return rects_intersect(self.rect, other.rect)
+
+
+def real_bounding_box():
+    """dev 中的 BoundingBox，与 ImageProcessor 使用的是同一个类"""
+    import src.core.image_processor as image_processor
+    box = getattr(image_processor, "BoundingBox", None)
+    if box is None:
+        pytest.skip("dev 模块不可用，无法导入 BoundingBox")
+    return box
+
+
+BOX_TYPES = [pytest.param(lambda: RectBox, id="rect"), pytest.param(real_bounding_box, id="BoundingBox")]
+
+
+def build_inputs(box_type, case):
+    """按 ImageProcessor 的方式构造鱼卡和文字框"""
+    fish_cards, card_rects = [], []
+    for location in case["cards"]:
+        rect = location_to_rect(location)
+        fish_cards.append(box_type(*rect, False))
+        card_rects.append(rect)
+    words_cards = []
+    for item in case["words"]:
+        item = {"words": item["words"], "location": dict(item["location"])}
+        item["BoundingBox"] = box_type(*location_to_rect(item["location"]), False, item["words"])
+        words_cards.append(item)
+    return words_cards, fish_cards, card_rects
+
+
+@pytest.mark.parametrize("box_factory", BOX_TYPES)
+@pytest.mark.parametrize("case", CASES, ids=[case["name"] for case in CASES])
+def test_indexed_matches_naive(box_factory, case):
+    box_type = box_factory()
+    indexed_words, fish_cards, card_rects = build_inputs(box_type, case)
+    naive_words, naive_cards, _ = build_inputs(box_type, case)
+
+    assert match_words_to_cards(indexed_words, fish_cards, card_rects) == \
+        match_words_to_cards_naive(naive_words, naive_cards)
+    assert [item.get("fish_card_index") for item in indexed_words] == \
+        [item.get("fish_card_index") for item in naive_words]
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case["name"] for case in CASES])
+def test_bounding_box_overlap_implies_rect_intersection(case):
+    """网格索引以 rects_intersect 筛选候选，要求 BoundingBox 判定重叠的框必然相交"""
+    box_type = real_bounding_box()
+    words_cards, fish_cards, card_rects = build_inputs(box_type, case)
+    for item in words_cards:
+        rect = location_to_rect(item["location"])
+        for card, card_rect in zip(fish_cards, card_rects):
+            if item["BoundingBox"].is_overlapping(card):
+                assert rects_intersect(rect, card_rect), (item["words"], card_rect)
+
+
+def test_touching_edges_count_as_intersecting():
+    assert rects_intersect((0, 0, 10, 10), (10, 0, 10, 10))
+    assert rects_intersect((0, 0, 10, 10), (10, 10, 0, 0))
+    assert not rects_intersect((0, 0, 10, 10), (10.5, 0, 10, 10))
+
+
+def test_grid_candidates_sorted_and_exact():
+    rects = [location_to_rect(location) for location in CASES[-1]["cards"]]
+    index = CardGridIndex(rects)
+    for item in CASES[-1]["words"]:
+        rect = location_to_rect(item["location"])
+        expected = [i for i, card in enumerate(rects) if rects_intersect(rect, card)]
+        assert index.candidates(rect) == expected
+
+
+def test_zero_area_cards_only():
+    index = CardGridIndex([(5, 5, 0, 0)])
+    assert index.cell_size == 1.0
+    assert index.candidates((0, 0, 5, 5)) == [0]
+    assert index.candidates((6, 6, 1, 1)) == []
@@ -0,0 +1,83 @@
+"""结果缓存的LRU淘汰、TTL过期和字节预算"""
+
+import src.api.cache as cache_module
+from src.api.cache import ResultCache
+
+
+def make_cache(tmp_path, **overrides):
+    config = {"enabled": True, "max_entries": 3, "max_bytes": 10 * 1024 * 1024, "ttl_seconds": 3600}
+    config.update(overrides)
+    return ResultCache(str(tmp_path), config)
+
+
+def test_make_key_depends_on_data_and_context():
+    key = ResultCache.make_key(b"image", {"endpoint": "a"})
+    assert key == ResultCache.make_key(b"image", {"endpoint": "a"})
+    assert key != ResultCache.make_key(b"image", {"endpoint": "b"})
+    assert key != ResultCache.make_key(b"other", {"endpoint": "a"})
+
+
+def test_round_trip_with_image_bytes(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("k", {"fishes": [["新鲜", "鲤鱼", "1 кг", "10"]], "image_bytes": b"\x89PNG"})
+    result = cache.get("k")
+    assert result["fishes"] == [["新鲜", "鲤鱼", "1 кг", "10"]]
+    assert result["image_bytes"] == b"\x89PNG"
+    assert cache.get("missing") is None
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_lru_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path)
+    for key in ("a", "b", "c"):
+        cache.put(key, {"value": key})
+    # 访问a后，最久未使用的是b
+    assert cache.get("a") is not None
+    cache.put("d", {"value": "d"})
+
+    assert cache.get("b") is None
+    assert [cache.get(key)["value"] for key in ("a", "c", "d")] == ["a", "c", "d"]
+    assert cache.get_stats()["evictions"] == 1
+    assert not (tmp_path / "b.json").exists()
+
+
+def test_byte_budget(tmp_path):
+    cache = make_cache(tmp_path, max_entries=100, max_bytes=3000)
+    for key in ("a", "b", "c"):
+        cache.put(key, {"image_bytes": b"x" * 1000})
+    stats = cache.get_stats()
+    assert stats["bytes"] <= 3000
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+
+
+def test_ttl_expiry(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache.put("k", {"value": 1})
+
+    now[0] += 59
+    assert cache.get("k") == {"value": 1}
+    now[0] += 2
+    assert cache.get("k") is None
+    assert cache.get_stats()["entries"] == 0
+    assert not (tmp_path / "k.json").exists()
+
+
+def test_index_rebuilt_from_disk(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("a", {"value": "a"})
+    cache.put("b", {"value": "b"})
+
+    reopened = make_cache(tmp_path)
+    assert reopened.get_stats()["entries"] == 2
+    assert reopened.get("b") == {"value": "b"}
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = make_cache(tmp_path, enabled=False)
+    cache.put("k", {"value": 1})
+    assert cache.get("k") is None
+    assert list(tmp_path.iterdir()) == []
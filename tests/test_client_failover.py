@@ -0,0 +1,113 @@
+"""同步客户端在两个模拟后端之间的故障转移、超时和非幂等请求不重放"""
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from src.api.backends import BackendPool, DEFAULT_BACKENDS_CONFIG
+from src.api.client import APIConfig, BaseAPIClient
+from src.api.exceptions import APIException
+
+IMAGE = {"image": ("shot.png", b"\x89PNG" + b"\0" * 256, "image/png")}
+
+
+@pytest.fixture(autouse=True)
+def endpoints(monkeypatch):
+    endpoints = APIConfig().endpoints
+    monkeypatch.setitem(endpoints, "catch", {"path": "/catch_from_image", "method": "POST", "idempotent": True})
+    monkeypatch.setitem(endpoints, "upload_image", {"path": "/upload_image", "method": "POST"})
+    monkeypatch.setitem(endpoints, "health", {"path": "/health", "method": "GET"})
+
+
+def make_client(monkeypatch, *servers, **overrides):
+    """按给定顺序选择后端的客户端，不启动探测线程"""
+    config = dict(DEFAULT_BACKENDS_CONFIG, failure_threshold=100)
+    config.update(overrides)
+    pool = BackendPool([server.base_url for server in servers], config)
+    monkeypatch.setattr(pool, "start", lambda: None)
+    client = BaseAPIClient()
+    client.backends = pool
+    return client
+
+
+def stopped_server(stub_server):
+    server = stub_server()
+    server.stop()
+    return server
+
+
+def test_failover_when_backend_down(monkeypatch, stub_server):
+    down, healthy = stopped_server(stub_server), stub_server()
+    client = make_client(monkeypatch, down, healthy)
+
+    assert "fishes" in client.post("catch", files=IMAGE)
+    assert healthy.stats.requests == 1
+    stats = {item["url"]: item for item in client.backends.get_stats()}
+    assert stats[down.base_url]["failures"] == 1
+
+
+def test_failover_on_read_timeout_for_idempotent_endpoint(monkeypatch, stub_server):
+    slow, fast = stub_server(latency=1.0), stub_server()
+    client = make_client(monkeypatch, slow, fast, read_timeout=0.2)
+
+    assert "fishes" in client.post("catch", files=IMAGE)
+    assert fast.stats.requests == 1
+    assert client.backends.get_stats()[0]["last_error"]
+
+
+def test_failover_on_server_error_for_idempotent_endpoint(monkeypatch, stub_server):
+    failing, healthy = stub_server(error_rate=1.0), stub_server()
+    client = make_client(monkeypatch, failing, healthy)
+
+    assert client.get("health") == {"status": "ok"}
+    assert "fishes" in client.post("catch", files=IMAGE)
+    # 首次失败后错误率超限，第二个请求直接发往健康后端
+    assert failing.stats.requests == 1 and healthy.stats.requests == 2
+
+
+def test_upload_not_replayed_on_server_error(monkeypatch, stub_server):
+    failing, healthy = stub_server(error_rate=1.0), stub_server()
+    client = make_client(monkeypatch, failing, healthy)
+
+    with pytest.raises(APIException) as error:
+        client.post("upload_image", data={"type": "custom"}, files=IMAGE)
+    assert error.value.status_code == 500
+    assert failing.stats.requests == 1
+    assert healthy.stats.requests == 0
+
+
+def test_upload_not_replayed_on_read_timeout(monkeypatch, stub_server):
+    slow, healthy = stub_server(latency=1.0), stub_server()
+    client = make_client(monkeypatch, slow, healthy, read_timeout=0.2)
+
+    with pytest.raises(requests.Timeout):
+        client.post("upload_image", data={"type": "custom"}, files=IMAGE)
+    assert healthy.stats.requests == 0
+
+
+def test_upload_fails_over_when_backend_down(monkeypatch, stub_server):
+    # 连接失败时请求尚未送达，非幂等端点也可以换用其他后端
+    down, healthy = stopped_server(stub_server), stub_server()
+    client = make_client(monkeypatch, down, healthy)
+
+    assert client.post("upload_image", data={"type": "custom"}, files=IMAGE)["success"] is True
+    assert healthy.stats.requests == 1
+
+
+def test_upload_not_replayed_when_connection_dropped_after_body(monkeypatch, stub_server):
+    # 服务端读完整个请求体后断开连接，请求可能已被处理
+    dropping, healthy = stub_server(drop_rate=1.0), stub_server()
+    client = make_client(monkeypatch, dropping, healthy)
+
+    with pytest.raises(requests.ConnectionError):
+        client.post("upload_image", data={"type": "custom"}, files=IMAGE)
+    assert dropping.stats.requests == 1
+    assert healthy.stats.requests == 0
+
+
+def test_idempotent_replayed_when_connection_dropped_after_body(monkeypatch, stub_server):
+    dropping, healthy = stub_server(drop_rate=1.0), stub_server()
+    client = make_client(monkeypatch, dropping, healthy)
+
+    assert "fishes" in client.post("catch", files=IMAGE)
+    assert dropping.stats.requests == 1 and healthy.stats.requests == 1
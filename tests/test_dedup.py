@@ -0,0 +1,133 @@
+"""近似重复截图检测：不同的鱼护截图不能互相命中"""
+
+import io
+import random
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image, ImageDraw
+
+from src.api.dedup import DEFAULT_DEDUP_CONFIG, DuplicateDetector, dhash, hamming_distance
+from src.core.roi import RoiSelector
+
+# 1920x1080 截图中鱼护面板的位置 (left, top, right, bottom)
+PANEL = (400, 150, 1520, 950)
+CONTEXT = {"endpoint": {"path": "/catch_from_image"}, "base_urls": ["http://a/api"]}
+
+
+def keepnet(cards, sidebar=0):
+    """绘制一张鱼护截图：固定的界面框架和 4x3 鱼卡网格，cards 为每张鱼卡的内容种子"""
+    image = Image.new("RGB", (1920, 1080), (28, 34, 40))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 1920, 60), fill=(60, 70, 80))
+    draw.rectangle((0, 60, 300, 1080), fill=(45 + sidebar, 52, 60))
+    for i in range(8):
+        draw.rectangle((20, 90 + i * 60, 280, 130 + i * 60), fill=(80, 90, 100))
+    draw.rectangle(PANEL, fill=(50, 58, 66))
+    for slot in range(12):
+        left = PANEL[0] + 20 + (slot % 4) * 270
+        top = PANEL[1] + 20 + (slot // 4) * 255
+        draw.rectangle((left, top, left + 250, top + 235), outline=(120, 130, 140), width=2)
+        if slot >= len(cards):
+            continue
+        rng = random.Random(cards[slot])
+        draw.ellipse((left + 30, top + 20, left + 220, top + 110), fill=tuple(rng.randint(60, 230) for _ in range(3)))
+        for row in range(4):
+            draw.rectangle((left + 15, top + 130 + row * 24, left + 15 + rng.randint(60, 200), top + 145 + row * 24),
+                           fill=(220, 220, 220))
+    return image
+
+
+def encode(image, format="PNG", **params):
+    output = io.BytesIO()
+    image.save(output, format=format, **params)
+    return output.getvalue()
+
+
+def make_detector(roi_selector=None, **overrides):
+    config = dict(DEFAULT_DEDUP_CONFIG, enabled=True)
+    config.update(overrides)
+    return DuplicateDetector(config, roi_selector)
+
+
+def panel_selector():
+    left, top, right, bottom = PANEL
+    return RoiSelector({"enabled": True, "presets": {"1920x1080": [left, top, right - left, bottom - top]},
+                        "default": None, "margin": 0})
+
+
+def test_disabled_by_default():
+    assert DEFAULT_DEDUP_CONFIG["enabled"] is False
+    assert DuplicateDetector(DEFAULT_DEDUP_CONFIG).compute_hash(encode(keepnet([1]))) is None
+
+
+@pytest.mark.parametrize("first, second", [
+    (list(range(10)), list(range(11))),                     # 多钓到一条鱼
+    (list(range(10)), [0, 1, 2, 3, 40, 5, 6, 7, 8, 9, 10]),  # 换了一条并多了一条
+    (list(range(12)), list(range(11)) + [99]),              # 只换了最后一条
+])
+def test_different_keepnet_captures_do_not_collide(first, second):
+    detector = make_detector(panel_selector())
+    first_hash = detector.compute_hash(encode(keepnet(first)))
+    second_hash = detector.compute_hash(encode(keepnet(second)))
+    assert hamming_distance(first_hash, second_hash) > detector.max_distance
+
+    detector.add(first_hash, {"fishes": ["first"]}, CONTEXT)
+    assert detector.lookup(second_hash, CONTEXT) is None
+
+
+def test_whole_frame_hash_cannot_tell_captures_apart():
+    """整图哈希无法区分只换了一张鱼卡的截图，因此去重只对面板区域进行"""
+    first = dhash(encode(keepnet(list(range(12)))))
+    second = dhash(encode(keepnet(list(range(11)) + [99])))
+    assert hamming_distance(first, second) <= DEFAULT_DEDUP_CONFIG["max_distance"]
+
+
+def test_no_hash_without_roi_for_resolution():
+    selector = RoiSelector({"enabled": True, "presets": {"2560x1440": [0, 0, 100, 100]},
+                            "default": None, "margin": 0})
+    assert make_detector(selector).compute_hash(encode(keepnet([1]))) is None
+
+
+def test_same_capture_resaved_is_duplicate():
+    detector = make_detector(panel_selector())
+    image = keepnet(list(range(10)))
+    detector.add(detector.compute_hash(encode(image)), {"fishes": ["a"], "image_bytes": b"png"}, CONTEXT)
+
+    # 同一截图另存为其他格式，或面板上多了鼠标指针
+    resaved = encode(image, "BMP")
+    with_cursor = image.copy()
+    ImageDraw.Draw(with_cursor).polygon([(900, 500), (900, 520), (912, 514)], fill=(255, 255, 255))
+    for data in (resaved, encode(with_cursor)):
+        assert detector.lookup(detector.compute_hash(data), CONTEXT) == {"fishes": ["a"]}
+
+
+def test_roi_ignores_changes_outside_panel():
+    detector = make_detector(panel_selector())
+    detector.add(detector.compute_hash(encode(keepnet(list(range(10))))), {"fishes": ["a"]}, CONTEXT)
+    assert detector.lookup(detector.compute_hash(encode(keepnet(list(range(10)), sidebar=120))), CONTEXT) \
+        == {"fishes": ["a"]}
+
+
+def test_results_not_shared_across_contexts():
+    detector = make_detector()
+    image_hash = detector.compute_hash(encode(keepnet([1, 2, 3])))
+    detector.add(image_hash, {"fishes": ["a"]}, CONTEXT)
+
+    assert detector.lookup(image_hash, CONTEXT) == {"fishes": ["a"]}
+    assert detector.lookup(image_hash, dict(CONTEXT, endpoint={"path": "/other"})) is None
+    assert detector.lookup(image_hash) is None
+
+
+def test_capacity_evicts_oldest():
+    detector = make_detector(capacity=2)
+    for value in (0b0000, 0b1111 << 8, 0b1111 << 16, 0b1111 << 24):
+        detector.add(value, {"value": value}, CONTEXT)
+    assert detector.lookup(0b0000, CONTEXT) is None
+    assert detector.lookup(0b1111 << 24, CONTEXT) == {"value": 0b1111 << 24}
+    assert detector.get_stats()["tracked"] == 2
+
+
+def test_dhash_undecodable():
+    assert dhash(b"not an image") is None
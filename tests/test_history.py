@@ -0,0 +1,59 @@
+"""渔获历史的写入去重和汇总"""
+
+from src.core.history import CatchHistory, HistoryWriter, hash_file
+
+FISHES = [["新鲜", "鲤鱼", "1.5 кг", "120"], ["不新鲜", "鲫鱼", "300 г", "40"]]
+
+
+def make_history(tmp_path):
+    return CatchHistory(str(tmp_path / "history.db"))
+
+
+def test_same_image_recorded_once(tmp_path):
+    history = make_history(tmp_path)
+    assert history.add_catches("s1", FISHES, "a.png", "hash-a") == 2
+    # 缓存命中或重复打开同一张截图
+    assert history.add_catches("s1", FISHES, "a-copy.png", "hash-a") == 0
+    assert history.add_catches("s2", FISHES, "a.png", "hash-a") == 0
+
+    totals = {row["species"]: row for row in history.species_totals()}
+    assert totals["鲤鱼"]["count"] == 1
+    assert totals["鲤鱼"]["total_price"] == 120
+    assert [row["revenue"] for row in history.session_revenue()] == [160]
+
+
+def test_duplicates_within_one_batch(tmp_path):
+    history = make_history(tmp_path)
+    written = history.add_catches_batch([
+        ("s1", FISHES, "a.png", "hash-a", None),
+        ("s1", FISHES, "a.png", "hash-a", None),
+        ("s1", FISHES[:1], "b.png", "hash-b", None),
+    ])
+    assert written == 3
+    assert history.has_image("hash-a") and history.has_image("hash-b")
+    assert not history.has_image("hash-c")
+
+
+def test_entries_without_hash_are_kept(tmp_path):
+    history = make_history(tmp_path)
+    assert history.add_catches("s1", FISHES[:1]) == 1
+    assert history.add_catches("s1", FISHES[:1]) == 1
+    assert history.species_totals()[0]["count"] == 2
+
+
+def test_writer_skips_resubmitted_file(tmp_path):
+    image = tmp_path / "shot.png"
+    image.write_bytes(b"screenshot")
+    other = tmp_path / "other.png"
+    other.write_bytes(b"another screenshot")
+    history = make_history(tmp_path)
+
+    writer = HistoryWriter("session", history, flush_interval=0.01)
+    # 同一文件既被监控处理又被手动打开
+    writer.submit(str(image), FISHES)
+    writer.submit(str(image), FISHES)
+    writer.submit(str(other), FISHES[:1])
+    writer.close()
+
+    assert history.has_image(hash_file(str(image)))
+    assert sum(row["count"] for row in history.species_totals()) == 3
@@ -0,0 +1,93 @@
+"""渔获归一化：形近字母统一、重量单位解析和鱼种近似查找"""
+
+import pytest
+
+from src.core.normalizer import (CatchNormalizer, DEFAULT_NORMALIZER_CONFIG, QGramIndex, normalize_text,
+                                 parse_amount, parse_weight)
+
+SPECIES = {"鲤鱼": ["Карп"], "鲫鱼": ["Карась серебряный"], "白斑狗鱼": ["Щука"], "欧鳊": ["Лещ"]}
+
+
+def make_normalizer(species=SPECIES, **overrides):
+    return CatchNormalizer(species, dict(DEFAULT_NORMALIZER_CONFIG, **overrides))
+
+
+@pytest.mark.parametrize("text, expected", [
+    # OCR把西里尔字母识别成拉丁字母
+    ("Kapп", "карп"),
+    ("Щукa", "щука"),
+    ("ЛЕЩ ", "лещ"),
+    # 全角和标点
+    ("Ｃａｒｐ!", "carp"),
+    # 纯拉丁文本不转换
+    ("Pike", "pike"),
+    ("鲤 鱼", "鲤鱼"),
+])
+def test_normalize_text_folds_homoglyphs(text, expected):
+    assert normalize_text(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1.5 кг", 1.5),
+    ("1,25 kg", 1.25),
+    ("2.1 kr", 2.1),
+    ("850 г", 0.85),
+    ("1 250 г", 1.25),
+    ("300g", 0.3),
+    ("2 公斤", 2.0),
+    ("500 克", 0.5),
+    ("3.2", 3.2),
+    ("", None),
+    ("кг", None),
+])
+def test_parse_weight_units(text, expected):
+    if expected is None:
+        assert parse_weight(text) is None
+    else:
+        assert parse_weight(text) == pytest.approx(expected)
+
+
+def test_parse_amount_separators():
+    assert parse_amount("1 234,5") == 1234.5
+    assert parse_amount("价格: 40") == 40
+    assert parse_amount("无") is None
+
+
+@pytest.mark.parametrize("text, expected, distance", [
+    ("Kapп", "鲤鱼", 0),
+    ("Карл", "鲤鱼", 1),
+    ("Карась серебрянный", "鲫鱼", 1),
+    # 两个字的名称也允许一个字的误差
+    ("鲫龟", "鲫鱼", 1),
+    ("白斑狗", "白斑狗鱼", 1),
+])
+def test_near_miss_lookup(text, expected, distance):
+    assert make_normalizer().normalize_species(text) == (expected, True, distance)
+
+
+def test_unknown_species_kept_as_is():
+    normalizer = make_normalizer()
+    assert normalizer.normalize_species(" 鳄鱼龟 ") == ("鳄鱼龟", False, -1)
+    # 单个字不做近似匹配
+    assert normalizer.normalize_species("鱼") == ("鱼", False, -1)
+
+
+def test_qgram_bound_with_repeated_bigrams():
+    # 重复的二元组只计一次，下界按不同二元组数计算，不能漏掉距离为1的候选
+    index = QGramIndex(["ababab"])
+    assert index.search("ababac", 1) == ("ababab", 1)
+    assert index.search("abab", 2) == ("ababab", 2)
+    assert index.search("cdcdcd", 2) is None
+
+
+def test_normalize_record():
+    record = make_normalizer().normalize(["新鮮", "Kaрп", "1 250 г", "1 200"])
+    assert record.to_dict() == {"freshness": "新鲜", "species": "鲤鱼", "species_raw": "Kaрп", "weight": 1.25,
+                                "price": 1200.0, "matched": True, "distance": 0}
+
+
+def test_bundled_dictionary_loaded():
+    normalizer = CatchNormalizer(config=dict(DEFAULT_NORMALIZER_CONFIG))
+    assert normalizer.species_count > 20
+    assert normalizer.normalize_species("Судак")[:2] == ("梭鲈", True)
+    assert normalizer.normalize_species("Щукa")[:2] == ("白斑狗鱼", True)
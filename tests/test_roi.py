@@ -0,0 +1,59 @@
+"""ROI选择和结果坐标映射回原图"""
+
+import pytest
+
+from src.core.roi import RoiSelector, map_locations, restore_result_coordinates
+
+
+def make_selector(**overrides):
+    config = {"enabled": True, "presets": {}, "default": None, "margin": 0}
+    config.update(overrides)
+    return RoiSelector(config)
+
+
+def test_preset_with_margin_clamped_to_image():
+    selector = make_selector(presets={"2560x1440": [100, 200, 1000, 800]}, margin=16)
+    assert selector.select(2560, 1440) == (84, 184, 1116, 1016)
+    selector = make_selector(presets={"800x600": [0, 0, 700, 600]}, margin=16)
+    assert selector.select(800, 600) == (0, 0, 716, 600)
+
+
+def test_default_ratio_and_missing_preset():
+    assert make_selector().select(1920, 1080) is None
+    assert make_selector(default=[0.5, 0.25, 0.5, 0.5]).select(1920, 1080) == (960, 270, 1920, 810)
+    # 覆盖整张图时不需要裁剪
+    assert make_selector(default=[0, 0, 1, 1]).select(1920, 1080) is None
+    assert make_selector(enabled=False, default=[0.5, 0, 0.5, 1]).select(1920, 1080) is None
+
+
+def test_restore_crop_and_scale():
+    result = {
+        "fishes": [{"location": {"left": 10, "top": 20, "width": 30, "height": 40}}],
+        "cards": [[{"location": {"left": 0, "top": 0}}]],
+        "words_result": [{"words": "鲤鱼", "location": {"left": 5, "top": 5, "width": 10, "height": 10}}]
+    }
+    restore_result_coordinates(result, (100, 200, 1100, 1200), scale=0.5)
+
+    assert result["fishes"][0]["location"] == {"left": 120, "top": 240, "width": 60, "height": 80}
+    assert result["cards"][0][0]["location"] == {"left": 100, "top": 200}
+    assert result["words_result"][0]["location"] == {"left": 110, "top": 210, "width": 20, "height": 20}
+    assert result["roi"] == [100, 200, 1100, 1200]
+
+
+def test_restore_scale_only():
+    result = {"location": {"left": 50, "top": 25, "width": 10, "height": 10}}
+    restore_result_coordinates(result, None, scale=0.5)
+    assert result == {"location": {"left": 100, "top": 50, "width": 20, "height": 20}}
+
+
+def test_restore_noop_without_crop_or_scale():
+    result = {"location": {"left": 1, "top": 2}}
+    restore_result_coordinates(result, None)
+    assert result == {"location": {"left": 1, "top": 2}}
+
+
+@pytest.mark.parametrize("value", [{"location": "text"}, {"location": {"x": 1}}, ["a", 1, None]])
+def test_map_locations_ignores_other_values(value):
+    expected = repr(value)
+    map_locations(value, 10, 10, 2.0)
+    assert repr(value) == expected
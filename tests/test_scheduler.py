@@ -0,0 +1,188 @@
+"""任务调度器的优先级、保留线程和背压"""
+
+import threading
+
+import pytest
+
+from src.api.cancellation import CancelToken
+from src.api.exceptions import RequestCancelled
+from src.core.scheduler import JobScheduler, PRIORITY_BATCH, PRIORITY_INTERACTIVE, PRIORITY_WATCH
+
+
+class BlockingBackend:
+    """按调用顺序记录图片路径，gate 打开前阻塞"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.started = []
+        self._lock = threading.Lock()
+
+    def process_image(self, image_path, cancel_token=None):
+        with self._lock:
+            self.started.append(image_path)
+        self.gate.wait(5)
+        return {"path": image_path}
+
+
+def wait_until(predicate, timeout=5.0):
+    event = threading.Event()
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return True
+        event.wait(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def backend():
+    backend = BlockingBackend()
+    yield backend
+    backend.gate.set()
+
+
+def collect():
+    done = []
+    lock = threading.Lock()
+
+    def callback(job, result, error):
+        with lock:
+            done.append((job.image_path, result, error))
+
+    return done, callback
+
+
+def test_interactive_runs_before_queued_background(backend):
+    scheduler = JobScheduler(workers=1, queue_size=10, reserved_interactive=0, backend_factory=lambda: backend)
+    done, callback = collect()
+    try:
+        scheduler.submit("busy", PRIORITY_BATCH, callback)
+        assert wait_until(lambda: backend.started == ["busy"])
+        scheduler.submit("batch", PRIORITY_BATCH, callback)
+        scheduler.submit("watch", PRIORITY_WATCH, callback)
+        scheduler.submit("ui", PRIORITY_INTERACTIVE, callback)
+        backend.gate.set()
+        assert wait_until(lambda: len(done) == 4)
+        assert backend.started == ["busy", "ui", "watch", "batch"]
+    finally:
+        scheduler.shutdown()
+
+
+def test_reserved_worker_only_takes_interactive(backend):
+    scheduler = JobScheduler(workers=2, queue_size=10, reserved_interactive=1, backend_factory=lambda: backend)
+    done, callback = collect()
+    try:
+        scheduler.submit("batch-1", PRIORITY_BATCH, callback)
+        scheduler.submit("batch-2", PRIORITY_BATCH, callback)
+        assert wait_until(lambda: backend.started == ["batch-1"])
+        # 后台任务占满非保留线程，界面任务仍能立即开始
+        scheduler.submit("ui", PRIORITY_INTERACTIVE, callback)
+        assert wait_until(lambda: backend.started == ["batch-1", "ui"])
+        assert scheduler.get_stats()["queued"]["batch"] == 1
+        backend.gate.set()
+        assert wait_until(lambda: len(done) == 3)
+    finally:
+        scheduler.shutdown()
+
+
+def test_background_submit_blocks_when_queue_full(backend):
+    scheduler = JobScheduler(workers=1, queue_size=2, reserved_interactive=0, backend_factory=lambda: backend)
+    done, callback = collect()
+    try:
+        scheduler.submit("running", PRIORITY_BATCH, callback)
+        assert wait_until(lambda: backend.started == ["running"])
+        scheduler.submit("queued-1", PRIORITY_BATCH, callback)
+        scheduler.submit("queued-2", PRIORITY_WATCH, callback)
+        with pytest.raises(TimeoutError):
+            scheduler.submit("overflow", PRIORITY_BATCH, callback, timeout=0.1)
+        # 界面任务不受排队上限限制
+        scheduler.submit("ui", PRIORITY_INTERACTIVE, callback, timeout=0.1)
+
+        # 队列腾出位置后，阻塞中的提交继续
+        submitted = threading.Event()
+        threading.Thread(target=lambda: (scheduler.submit("late", PRIORITY_BATCH, callback), submitted.set()),
+                         daemon=True).start()
+        assert not submitted.wait(0.2)
+        backend.gate.set()
+        assert submitted.wait(5)
+        assert wait_until(lambda: len(done) == 5)
+    finally:
+        scheduler.shutdown()
+
+
+def test_backend_errors_reported_to_callback():
+    class FailingBackend:
+        def process_image(self, image_path, cancel_token=None):
+            raise ValueError("boom")
+
+    scheduler = JobScheduler(workers=1, queue_size=2, reserved_interactive=0, backend_factory=FailingBackend)
+    done, callback = collect()
+    try:
+        scheduler.submit("a.png", PRIORITY_INTERACTIVE, callback)
+        assert wait_until(lambda: len(done) == 1)
+        assert done[0] == ("a.png", None, "boom")
+    finally:
+        scheduler.shutdown()
+
+
+def test_backend_factory_error_sets_started_at():
+    def failing_factory():
+        raise RuntimeError("no backend")
+
+    scheduler = JobScheduler(workers=1, queue_size=2, reserved_interactive=0, backend_factory=failing_factory)
+    done = []
+    try:
+        scheduler.submit("a.png", PRIORITY_INTERACTIVE, lambda job, result, error: done.append((job, error)))
+        assert wait_until(lambda: len(done) == 1)
+        job, error = done[0]
+        assert error == "no backend"
+        # 界面任务按 started_at 记录排队耗时
+        assert job.started_at is not None and job.started_at >= job.enqueued_at
+    finally:
+        scheduler.shutdown()
+
+
+def test_blocked_submit_raises_when_cancelled(backend):
+    scheduler = JobScheduler(workers=1, queue_size=1, reserved_interactive=0, backend_factory=lambda: backend)
+    done, callback = collect()
+    try:
+        scheduler.submit("running", PRIORITY_BATCH, callback)
+        assert wait_until(lambda: backend.started == ["running"])
+        scheduler.submit("queued", PRIORITY_BATCH, callback)
+
+        token = CancelToken()
+        errors = []
+
+        def blocked_submit():
+            try:
+                scheduler.submit("blocked", PRIORITY_BATCH, callback, token)
+            except RequestCancelled as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=blocked_submit)
+        thread.start()
+        assert not wait_until(lambda: errors, timeout=0.2)
+        token.cancel()
+        thread.join(5)
+        assert not thread.is_alive() and len(errors) == 1
+        assert scheduler.get_stats()["queued"]["batch"] == 1
+    finally:
+        backend.gate.set()
+        scheduler.shutdown()
+
+
+def test_process_images_stops_when_cancelled_during_backpressure(backend):
+    scheduler = JobScheduler(workers=1, queue_size=1, reserved_interactive=0, backend_factory=lambda: backend)
+    token = CancelToken()
+    items = []
+    try:
+        thread = threading.Thread(target=lambda: items.extend(
+            scheduler.process_images(["a", "b", "c", "d"], cancel_token=token)))
+        thread.start()
+        assert wait_until(lambda: backend.started == ["a"])
+        token.cancel()
+        thread.join(5)
+        assert not thread.is_alive()
+        assert items == []
+    finally:
+        backend.gate.set()
+        scheduler.shutdown()
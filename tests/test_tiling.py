@@ -0,0 +1,127 @@
+"""分块OCR与整图OCR的一致性：用按像素值识别文字框的模拟OCR，比较合并后的文字框和鱼卡字段"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.core.box_matcher import location_to_rect, match_words_to_cards, rects_intersect
+from src.core.image_buffer import ImageBuffer
+from src.core.tiling import OcrTiler, crosses_seam, merge_tile_words, plan_tiles
+
+WIDTH, HEIGHT = 3000, 1000
+# 两个图块 [0, 1580] 和 [1420, 3000]，接缝在 x=1500
+TILING = {"enabled": True, "min_pixels": 0, "tile_size": [1600, 1600], "overlap": 160, "workers": 2}
+CARDS = [(100, 100, 600, 300), (800, 100, 400, 300), (1300, 500, 400, 300), (2200, 100, 600, 300)]
+
+
+def stub_ocr(array):
+    """模拟OCR引擎：像素值（第一个通道）非零的每个区域为一个文字框，按像素值顺序输出"""
+    words = []
+    for value in np.unique(array[..., 0]):
+        if value == 0:
+            continue
+        ys, xs = np.nonzero(array[..., 0] == value)
+        words.append({"words": f"w{value}", "location": {
+            "left": int(xs.min()), "top": int(ys.min()),
+            "width": int(xs.max() - xs.min() + 1), "height": int(ys.max() - ys.min() + 1)}})
+    return {"words_result": words}
+
+
+def draw(words):
+    """按 [(left, top, width, height)] 的顺序绘制文字框，像素值即OCR输出顺序"""
+    array = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    for value, (left, top, width, height) in enumerate(words, start=1):
+        array[top:top + height, left:left + width, 0] = value
+    return array
+
+
+def card_fields(left, top, width, height):
+    """一张鱼卡的四个字段，OCR输出顺序为 新鲜度（右上）、名称（左上）、重量（左下）、价格（右下）"""
+    right = left + width - 130
+    return [(right, top + 20, 110, 30), (left + 20, top + 20, 110, 30),
+            (left + 20, top + 200, 110, 30), (right, top + 200, 110, 30)]
+
+
+FIXTURES = {
+    "cards_apart_from_seam": [field for card in CARDS[:2] + CARDS[3:] for field in card_fields(*card)],
+    # 跨接缝的鱼卡：新鲜度和价格在第二个图块，名称和重量在第一个图块
+    "card_across_seam": card_fields(*CARDS[2]),
+    "all_cards": [field for card in CARDS for field in card_fields(*card)],
+    # 跨越接缝中线的文字框只能保留一次
+    "word_on_seam": [(1450, 20, 110, 30), (1460, 900, 80, 20)] + card_fields(*CARDS[0]),
+}
+
+
+class RectBox:
+    def __init__(self, left, top, width, height, *args):
+        self.rect = (left, top, width, height)
+
+    def is_overlapping(self, other):
+        return rects_intersect(self.rect, other.rect)
+
+
+def match(words):
+    for item in words:
+        item["BoundingBox"] = RectBox(*location_to_rect(item["location"]))
+    return match_words_to_cards(words, [RectBox(*card) for card in CARDS], list(CARDS))
+
+
+def as_tuples(words):
+    return [(item["words"], tuple(location_to_rect(item["location"]))) for item in words]
+
+
+@pytest.mark.parametrize("executor", ["thread", "serial"])
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_tiled_ocr_matches_single_pass(name, executor):
+    buffer = ImageBuffer(draw(FIXTURES[name]))
+    tiler = OcrTiler(dict(TILING, executor=executor))
+    try:
+        tiles = tiler.plan(WIDTH, HEIGHT)
+        assert len(tiles) == 2
+        tiled = tiler.run(buffer, tiles, stub_ocr)
+        tiled = tiler.refine_cards(buffer, tiles, tiled, CARDS, stub_ocr)["words_result"]
+    finally:
+        tiler.close()
+    single = stub_ocr(buffer.array)["words_result"]
+
+    assert sorted(as_tuples(tiled)) == sorted(as_tuples(single))
+    assert match(tiled) == match(single)
+
+
+def test_merge_keeps_engine_order_within_tile():
+    tiles = plan_tiles(WIDTH, HEIGHT, 1600, 1600, 160)
+    first = [{"words": word, "location": {"left": left, "top": top, "width": 100, "height": 30}}
+             for word, left, top in [("新鲜", 500, 100), ("鲤鱼", 100, 100), ("1 кг", 100, 300)]]
+    second = [{"words": "价格", "location": {"left": 2000, "top": 50, "width": 100, "height": 30}}]
+
+    merged = merge_tile_words([(tiles[0], first), (tiles[1], second)], WIDTH, HEIGHT)
+    assert [item["words"] for item in merged] == ["新鲜", "鲤鱼", "1 кг", "价格"]
+
+
+def test_truncated_fragment_returns_to_its_tile_position():
+    tiles = plan_tiles(WIDTH, HEIGHT, 1600, 1600, 160)
+    # 比重叠区还宽的文字框在两个图块中都被截断，保留较大的片段
+    first = [{"words": "a", "location": {"left": 100, "top": 10, "width": 50, "height": 20}},
+             {"words": "long-left", "location": {"left": 1300, "top": 10, "width": 280, "height": 20}},
+             {"words": "b", "location": {"left": 100, "top": 60, "width": 50, "height": 20}}]
+    second = [{"words": "long-right", "location": {"left": 1420, "top": 10, "width": 100, "height": 20}},
+              {"words": "c", "location": {"left": 2000, "top": 10, "width": 50, "height": 20}}]
+
+    merged = merge_tile_words([(tiles[0], first), (tiles[1], second)], WIDTH, HEIGHT)
+    assert [item["words"] for item in merged] == ["a", "long-left", "b", "c"]
+
+
+def test_only_cards_on_seam_are_refined():
+    tiles = plan_tiles(WIDTH, HEIGHT, 1600, 1600, 160)
+    assert [crosses_seam(card, tiles) for card in CARDS] == [False, False, True, False]
+
+
+def test_refine_restores_field_order_of_card_on_seam():
+    buffer = ImageBuffer(draw(card_fields(*CARDS[2])))
+    tiler = OcrTiler(dict(TILING, executor="serial"))
+    tiles = tiler.plan(WIDTH, HEIGHT)
+    merged = tiler.run(buffer, tiles, stub_ocr)
+    # 只按图块合并时，第二个图块中的新鲜度排到了名称和重量之后
+    assert match(list(merged["words_result"])) == [["w2", "w3", "w1", "w4"]]
+    assert match(tiler.refine_cards(buffer, tiles, merged, CARDS, stub_ocr)["words_result"]) == \
+        [["w1", "w2", "w3", "w4"]]
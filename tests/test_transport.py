@@ -0,0 +1,91 @@
+"""multipart结果解析、响应解压和请求头协商"""
+
+import gzip
+import json
+import zlib
+
+import pytest
+
+pytest.importorskip("requests")
+
+from src.api import transport
+from src.api.transport import (decode_payload, decompress, negotiation_headers, parse_multipart,
+                               result_from_multipart)
+
+BOUNDARY = "rf4-boundary"
+CONTENT_TYPE = f'multipart/mixed; boundary="{BOUNDARY}"'
+
+
+def build_multipart(parts):
+    body = b""
+    for content_type, content in parts:
+        body += f"--{BOUNDARY}\r\nContent-Type: {content_type}\r\n\r\n".encode("ascii") + content + b"\r\n"
+    return bytearray(body + f"--{BOUNDARY}--\r\n".encode("ascii"))
+
+
+def test_parse_multipart_parts_are_views():
+    image = bytes(range(256)) + b"\r\n--not-a-boundary"
+    body = build_multipart([("application/json", b'{"a": 1}'), ("image/png", image)])
+    parts = parse_multipart(body, CONTENT_TYPE)
+
+    assert [headers["content-type"] for headers, _ in parts] == ["application/json", "image/png"]
+    assert bytes(parts[1][1]) == image
+    assert isinstance(parts[1][1], memoryview)
+
+
+def test_result_from_multipart():
+    payload = {"fishes": [["新鲜", "鲤鱼", "1 кг", "10"]]}
+    body = build_multipart([("application/json; charset=utf-8", json.dumps(payload).encode("utf-8")),
+                            ("image/jpeg", b"\xff\xd8jpeg")])
+    result = result_from_multipart(body, CONTENT_TYPE)
+
+    assert result["fishes"] == payload["fishes"]
+    assert bytes(result["image_bytes"]) == b"\xff\xd8jpeg"
+    assert result["image_mime_type"] == "image/jpeg"
+
+
+def test_multipart_without_boundary():
+    with pytest.raises(ValueError):
+        parse_multipart(bytearray(b""), "multipart/mixed")
+
+
+@pytest.mark.parametrize("encoding, encode", [
+    ("gzip", gzip.compress),
+    ("deflate", zlib.compress),
+    ("deflate", lambda data: zlib.compress(data)[2:-4]),  # 不带zlib头的原始deflate
+    ("identity", lambda data: data),
+])
+def test_decompress(encoding, encode):
+    data = json.dumps({"fishes": list(range(100))}).encode("utf-8")
+    assert decompress(encode(data), encoding) == data
+
+
+def test_decompress_stacked_encodings():
+    data = b"payload" * 50
+    assert decompress(gzip.compress(zlib.compress(data)), "deflate, gzip") == data
+
+
+def test_decompress_unknown_encoding():
+    with pytest.raises(ValueError):
+        decompress(b"data", "compress")
+
+
+def test_decode_payload_json():
+    assert decode_payload(b'{"a": [1, 2]}', "application/json; charset=utf-8") == {"a": [1, 2]}
+
+
+def test_decode_payload_msgpack():
+    msgpack = pytest.importorskip("msgpack")
+    assert decode_payload(msgpack.packb({"a": "鲤鱼"}), "application/msgpack") == {"a": "鲤鱼"}
+
+
+def test_negotiation_headers_only_declare_supported(monkeypatch):
+    monkeypatch.setattr(transport, "_optional_modules", {"zstandard": None, "brotli": None, "msgpack": None})
+    headers = negotiation_headers({"compression": ["zstd", "gzip"], "response_format": "msgpack"}, binary=True)
+
+    assert headers["Accept-Encoding"] == "gzip, identity"
+    assert headers["Accept"] == "multipart/mixed, application/json;q=0.9"
+
+
+def test_negotiation_headers_without_settings():
+    assert negotiation_headers({}) == {}
@@ -0,0 +1,76 @@
+"""截图文件夹监控的停止行为"""
+
+import threading
+import time
+
+from src.core.watcher import ScreenshotWatcher
+
+CONFIG = {"extensions": [".png"], "settle_seconds": 0.05, "poll_interval": 0.05, "queue_size": 4, "workers": 1}
+
+
+class BlockingBackend:
+    """开始处理后一直阻塞，honor_cancel 为真时在取消后返回"""
+
+    def __init__(self, honor_cancel):
+        self.honor_cancel = honor_cancel
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.cancelled = threading.Event()
+
+    def process_image(self, image_path, cancel_token=None):
+        self.started.set()
+        while not self.release.wait(0.01):
+            if self.honor_cancel and cancel_token is not None and cancel_token.cancelled:
+                self.cancelled.set()
+                cancel_token.raise_if_cancelled()
+        return {"fishes": []}
+
+
+def start_watcher(tmp_path, backend, results):
+    watcher = ScreenshotWatcher(lambda *args: results.append(args), str(tmp_path), backend, CONFIG)
+    watcher.start()
+    (tmp_path / "shot.png").write_bytes(b"png")
+    assert backend.started.wait(5)
+    return watcher
+
+
+def test_stop_cancels_in_flight_job(tmp_path):
+    backend = BlockingBackend(honor_cancel=True)
+    results = []
+    watcher = start_watcher(tmp_path, backend, results)
+
+    start = time.monotonic()
+    watcher.stop(timeout=5)
+    assert time.monotonic() - start < 2
+    assert backend.cancelled.is_set()
+    assert results == []
+
+
+def test_stop_does_not_wait_for_unresponsive_backend(tmp_path):
+    backend = BlockingBackend(honor_cancel=False)
+    results = []
+    watcher = start_watcher(tmp_path, backend, results)
+    try:
+        start = time.monotonic()
+        watcher.stop(timeout=0.2)
+        assert time.monotonic() - start < 1
+    finally:
+        backend.release.set()
+    # 停止后才完成的结果不再回调
+    time.sleep(0.1)
+    assert results == []
+
+
+def test_results_delivered_while_running(tmp_path):
+    backend = BlockingBackend(honor_cancel=True)
+    backend.release.set()
+    results = []
+    watcher = start_watcher(tmp_path, backend, results)
+    try:
+        for _ in range(200):
+            if results:
+                break
+            time.sleep(0.01)
+        assert results == [(str(tmp_path / "shot.png"), {"fishes": []}, None)]
+    finally:
+        watcher.stop()